@@ -25,12 +25,22 @@ export function cancelTask(taskId) {
   return api.post(`/task/${taskId}/cancel`)
 }
 
+/** 恢复中断的任务（从检查点继续） */
+export function resumeTask(taskId) {
+  return api.post(`/task/${taskId}/resume`)
+}
+
+/** 任务耗时追踪（Chrome trace格式，可在 chrome://tracing 或 Perfetto 中打开） */
+export function getTraceUrl(taskId) {
+  return `/api/task/${taskId}/trace`
+}
+
 /** 下载链接 */
 export function getDownloadUrl(taskId, docType) {
   return `/api/download/${taskId}/${docType}`
 }
 
-/** 创建SSE连接 */
+/** 创建SSE连接（断线后浏览器自动携带Last-Event-ID重连续传） */
 export function createTaskStream(taskId, onMessage, onError) {
   const eventSource = new EventSource(`/api/task/${taskId}/stream`)
 
@@ -38,7 +48,7 @@ export function createTaskStream(taskId, onMessage, onError) {
     try {
       const data = JSON.parse(event.data)
       onMessage(data)
-      if (data.status === 'completed' || data.status === 'failed') {
+      if (data.error || ['completed', 'failed', 'cancelled'].includes(data.status)) {
         eventSource.close()
       }
     } catch (e) {
@@ -47,8 +57,10 @@ export function createTaskStream(taskId, onMessage, onError) {
   }
 
   eventSource.onerror = () => {
-    eventSource.close()
-    if (onError) onError()
+    // 连接中断时浏览器会自动重连；只有彻底关闭时才降级为轮询
+    if (eventSource.readyState === EventSource.CLOSED) {
+      if (onError) onError()
+    }
   }
 
   return eventSource
@@ -14,7 +14,18 @@ export const useGenerateStore = defineStore('generate', () => {
   const logs = ref([])
   const outputFiles = ref({})
 
+  const MAX_LOGS = 200
+
   function updateProgress(data) {
+    // 增量事件：单条日志/警告追加
+    if (data.type === 'log') {
+      logs.value = [...logs.value, data.log].slice(-MAX_LOGS)
+      return
+    }
+    if (data.type === 'warning') {
+      warnings.value = [...warnings.value, data.warning]
+      return
+    }
     if (data.task_id) taskId.value = data.task_id
     if (data.status) status.value = data.status
     if (data.current_step !== undefined) currentStep.value = data.current_step
@@ -4,6 +4,10 @@ import os
 import json
 from typing import Any
 
+from ai.http_pool import get_session, request_timeout, watch_cancel
+from ai.rate_limiter import RateLimitedError, parse_retry_after
+from utils.cancellation import CallCancelledError
+
 logger = logging.getLogger(__name__)
 
 
@@ -12,19 +16,25 @@ class TongyiAdapter:
 
     DEFAULT_BASE_URL = "https://dashscope.aliyuncs.com/api/v1/services/aigc/text-generation"
 
-    def __init__(self, api_key: str, model: str = "qwen3-max-2026-01-23"):
+    def __init__(self, api_key: str, model: str = "qwen3-max-2026-01-23", session=None):
         # 兼容官方建议的环境变量命名：DASHSCOPE_API_KEY
         self.api_key = (api_key or os.getenv("DASHSCOPE_API_KEY", "")).strip()
         self.model = model or "qwen3-max-2026-01-23"
         base_url = os.getenv("TONGYI_BASE_URL", self.DEFAULT_BASE_URL).rstrip("/")
         self.api_url = f"{base_url}/generation"
+        self._session = session
+
+    @property
+    def session(self):
+        return self._session or get_session()
+
+    def call(self, prompt: str, timeout: float | None = None, cancel_token=None, on_chunk=None) -> str:
+        """调用通义千问API（流式，timeout为两次数据块之间的最大空闲秒数）
 
-    def call(self, prompt: str, timeout: int = 60) -> str:
-        """调用通义千问API"""
-        try:
-            import requests
-        except ImportError as e:
-            raise RuntimeError("缺少requests依赖") from e
+        on_chunk(text)随每个增量文本块回调；cancel_token取消时立即关闭连接并抛出CallCancelledError。
+        """
+        if cancel_token is not None and cancel_token.cancelled:
+            raise CallCancelledError("通义调用已取消")
         if not self.api_key:
             raise RuntimeError("通义千问API Key未配置，请设置AI_PRIMARY_API_KEY或DASHSCOPE_API_KEY")
 
@@ -48,27 +58,49 @@ class TongyiAdapter:
             },
         }
 
-        response = requests.post(
+        with self.session.post(
             self.api_url,
             headers=headers,
             json=payload,
-            timeout=timeout,
+            timeout=request_timeout(timeout, stream=True),
             stream=True,
-        )
+        ) as response:
+            unwatch = watch_cancel(cancel_token, response)
+            try:
+                content = self._read_response(response, on_chunk)
+            except Exception:
+                # 取消时连接被强制关闭，读取异常统一视为取消
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise CallCancelledError("通义调用已取消") from None
+                raise
+            finally:
+                unwatch()
+            # 连接被关闭后读取可能以EOF正常结束，此时内容不完整
+            if cancel_token is not None and cancel_token.cancelled:
+                raise CallCancelledError("通义调用已取消")
+            if content:
+                return content
+
+        raise RuntimeError("通义接口未返回可解析的文本内容")
+
+    def _read_response(self, response, on_chunk=None) -> str:
+        if response.status_code == 429:
+            raise RateLimitedError(
+                f"通义接口限流(429): {response.text}",
+                parse_retry_after(response.headers.get("Retry-After")),
+            )
         if not response.ok:
             # 透传服务端错误体，便于快速定位模型名/权限/配额等问题
             raise RuntimeError(f"通义接口调用失败({response.status_code}): {response.text}")
 
         content_type = (response.headers.get("Content-Type") or "").lower()
         if "application/json" in content_type and "text/event-stream" not in content_type:
-            data = response.json()
-            return self._extract_content(data)
-
-        content = self._extract_streaming_content(response)
-        if content:
+            content = self._extract_content(response.json())
+            if on_chunk is not None:
+                on_chunk(content)
             return content
 
-        raise RuntimeError("通义接口未返回可解析的文本内容")
+        return self._extract_streaming_content(response, on_chunk)
 
     def _format_authorization(self) -> str:
         key = self.api_key
@@ -78,7 +110,7 @@ class TongyiAdapter:
             return key
         return f"Bearer {key}"
 
-    def _extract_streaming_content(self, response) -> str:
+    def _extract_streaming_content(self, response, on_chunk=None) -> str:
         text_parts: list[str] = []
         for raw_line in response.iter_lines(decode_unicode=True):
             if not raw_line:
@@ -101,6 +133,8 @@ class TongyiAdapter:
             chunk = self._extract_content(event, allow_empty=True)
             if chunk:
                 text_parts.append(chunk)
+                if on_chunk is not None:
+                    on_chunk(chunk)
 
         return "".join(text_parts).strip()
 
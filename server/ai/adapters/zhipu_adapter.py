@@ -1,6 +1,10 @@
 """智谱AI (GLM-4) 适配器"""
 import logging
 
+from ai.http_pool import get_session, request_timeout, watch_cancel
+from ai.rate_limiter import RateLimitedError, parse_retry_after
+from utils.cancellation import CallCancelledError
+
 logger = logging.getLogger(__name__)
 
 
@@ -9,17 +13,22 @@ class ZhipuAdapter:
 
     API_URL = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
 
-    def __init__(self, api_key: str, model: str = "glm-4"):
+    def __init__(self, api_key: str, model: str = "glm-4", session=None):
         self.api_key = api_key
         self.model = model
+        self._session = session
+
+    @property
+    def session(self):
+        return self._session or get_session()
 
-    def call(self, prompt: str, timeout: int = 60) -> str:
-        """调用智谱AI API"""
-        try:
-            import requests
-        except ImportError as e:
-            raise RuntimeError("缺少requests依赖") from e
+    def call(self, prompt: str, timeout: float | None = None, cancel_token=None, on_chunk=None) -> str:
+        """调用智谱AI API（非流式，on_chunk在完成后回调一次）
 
+        响应体按流读取，cancel_token取消时关闭连接；等待响应头期间无法中断，受读取超时约束。
+        """
+        if cancel_token is not None and cancel_token.cancelled:
+            raise CallCancelledError("智谱调用已取消")
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -31,7 +40,29 @@ class ZhipuAdapter:
             "max_tokens": 4096,
         }
 
-        response = requests.post(self.API_URL, headers=headers, json=payload, timeout=timeout)
-        response.raise_for_status()
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
+        with self.session.post(
+            self.API_URL,
+            headers=headers,
+            json=payload,
+            timeout=request_timeout(timeout),
+            stream=True,
+        ) as response:
+            unwatch = watch_cancel(cancel_token, response)
+            try:
+                if response.status_code == 429:
+                    raise RateLimitedError(
+                        f"智谱接口限流(429): {response.text}",
+                        parse_retry_after(response.headers.get("Retry-After")),
+                    )
+                response.raise_for_status()
+                data = response.json()
+            except Exception:
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise CallCancelledError("智谱调用已取消") from None
+                raise
+            finally:
+                unwatch()
+        content = data["choices"][0]["message"]["content"]
+        if on_chunk is not None:
+            on_chunk(content)
+        return content
@@ -1,8 +1,22 @@
 """AI API客户端 - 适配器模式，支持多模型切换"""
 import logging
+import queue
+import threading
 import time
 
+from ai.circuit_breaker import get_circuit_breaker
+from ai.hedging import get_hedge_policy
+from ai.rate_limiter import (
+    RateLimitedError,
+    RateLimitTimeoutError,
+    estimate_tokens,
+    get_rate_limiter,
+    provider_key,
+)
+from ai.response_cache import ResponseCache, get_response_cache
 from config import Config
+from utils.cancellation import CallCancelledError, CancelToken, OperationCancelledError, link_cancel
+from utils.tracing import NULL_SPAN, trace_span
 
 logger = logging.getLogger(__name__)
 
@@ -13,45 +27,342 @@ class AIClientError(Exception):
 
 
 class AIClient:
-    """AI客户端，支持主备模型自动切换"""
+    """AI客户端，支持主备模型自动切换；熔断打开的提供商直接跳过"""
 
-    def __init__(self):
+    PROBE_PROMPT = "请回复OK"
+
+    def __init__(self, cache: ResponseCache | None = None):
         self.primary = self._create_adapter(
             Config.AI_PRIMARY_PROVIDER,
             Config.AI_PRIMARY_API_KEY,
             Config.AI_PRIMARY_MODEL,
         )
+        self.primary_id = (Config.AI_PRIMARY_PROVIDER, Config.AI_PRIMARY_MODEL)
+        self.primary_limiter = get_rate_limiter(Config.AI_PRIMARY_PROVIDER, Config.AI_PRIMARY_API_KEY)
+        self.primary_breaker = self._create_breaker(
+            Config.AI_PRIMARY_PROVIDER,
+            Config.AI_PRIMARY_API_KEY,
+            Config.AI_PRIMARY_MODEL,
+            self.primary,
+            self.primary_limiter,
+        )
         self.fallback = None
+        self.fallback_id = None
+        self.fallback_limiter = None
+        self.fallback_breaker = None
         if Config.AI_FALLBACK_PROVIDER and Config.AI_FALLBACK_API_KEY:
             self.fallback = self._create_adapter(
                 Config.AI_FALLBACK_PROVIDER,
                 Config.AI_FALLBACK_API_KEY,
                 Config.AI_FALLBACK_MODEL,
             )
+            self.fallback_id = (Config.AI_FALLBACK_PROVIDER, Config.AI_FALLBACK_MODEL)
+            self.fallback_limiter = get_rate_limiter(Config.AI_FALLBACK_PROVIDER, Config.AI_FALLBACK_API_KEY)
+            self.fallback_breaker = self._create_breaker(
+                Config.AI_FALLBACK_PROVIDER,
+                Config.AI_FALLBACK_API_KEY,
+                Config.AI_FALLBACK_MODEL,
+                self.fallback,
+                self.fallback_limiter,
+            )
+        self.cache = cache if cache is not None else get_response_cache()
+        self.hedge_policy = get_hedge_policy()
 
-    def generate(self, prompt: str, max_retries=3) -> str:
-        """生成文本，带重试和降级"""
-        try:
-            return self._call_with_retry(self.primary, prompt, max_retries)
-        except AIClientError:
-            if self.fallback:
-                logger.warning("主模型失败，切换到备用模型")
-                return self._call_with_retry(self.fallback, prompt, max_retries)
-            raise
+    def generate(
+        self, prompt: str, max_retries=3, use_cache=True, kind: str | None = None, stream=None, cancel_token=None
+    ) -> str:
+        """生成文本，带响应缓存、重试和降级；use_cache=False时强制请求模型
+
+        kind为提示词类型（如features/code/page），开启对冲时按类型统计延迟。
+        stream为增量消费者（提供feed(chunk)/reset()），每次尝试前reset，随后逐块feed；
+        命中缓存时不回调。流式调用不做对冲，避免两路输出交错。
+        cancel_token取消后立即中止限流排队、重试等待和在途调用，抛出OperationCancelledError。
+        """
+        span = trace_span(
+            getattr(cancel_token, "task_id", None),
+            f"AI调用:{kind or 'text'}",
+            "ai",
+            kind=kind,
+            prompt_bytes=len(prompt.encode("utf-8")),
+        )
+        with span:
+            cache = self.cache if use_cache else None
+            if cache is not None:
+                cached = self._lookup_cache(cache, prompt)
+                if cached is not None:
+                    span.set(cached=True, response_bytes=len(cached.encode("utf-8")))
+                    return cached
+
+            result, answered_by = self._generate_with_failover(prompt, max_retries, kind, stream, cancel_token, span)
+            span.set(provider=answered_by[0], model=answered_by[1], response_bytes=len((result or "").encode("utf-8")))
+
+        if cache is not None and result:
+            cache.put(ResponseCache.make_key(*answered_by, prompt), result, *answered_by)
+        return result
+
+    def _routes(self) -> list[tuple]:
+        routes = [(self.primary, self.primary_id, self.primary_limiter, self.primary_breaker)]
+        if self.fallback:
+            routes.append((self.fallback, self.fallback_id, self.fallback_limiter, self.fallback_breaker))
+        return routes
+
+    def _generate_with_failover(
+        self, prompt: str, max_retries: int, kind: str | None = None, stream=None, cancel_token=None, span=NULL_SPAN
+    ) -> tuple[str, tuple]:
+        routes = self._routes()
+        healthy = [route for route in routes if route[3] is None or route[3].allow_request()]
+        if len(healthy) < len(routes):
+            skipped = [route[1][0] for route in routes if route not in healthy]
+            logger.warning("AI提供商熔断中，跳过: %s", ", ".join(skipped))
+        if not healthy:
+            # 全部熔断时仍按顺序尝试，避免任务直接失败
+            healthy = routes
 
-    def _call_with_retry(self, adapter, prompt: str, max_retries: int) -> str:
-        """带指数退避的重试调用"""
+        last_error = None
+        for idx, (adapter, provider_id, limiter, breaker) in enumerate(healthy):
+            if idx:
+                span.set(failover=provider_id[0])
+            try:
+                # 对冲副本可能由另一提供商应答，缓存与追踪按实际应答方记录
+                return self._call_with_retry(
+                    adapter, prompt, max_retries, limiter, breaker, kind, stream, cancel_token, span, provider_id
+                )
+            except AIClientError as e:
+                last_error = e
+                if idx + 1 < len(healthy):
+                    logger.warning("主模型失败，切换到备用模型")
+        raise last_error
+
+    def _lookup_cache(self, cache: ResponseCache, prompt: str) -> str | None:
+        for provider_id in (self.primary_id, self.fallback_id):
+            if provider_id is None:
+                continue
+            cached = cache.get(ResponseCache.make_key(*provider_id, prompt))
+            if cached is not None:
+                logger.info("命中AI响应缓存: provider=%s, model=%s", *provider_id)
+                return cached
+        return None
+
+    def _call_with_retry(
+        self,
+        adapter,
+        prompt: str,
+        max_retries: int,
+        limiter=None,
+        breaker=None,
+        kind: str | None = None,
+        stream=None,
+        cancel_token=None,
+        span=NULL_SPAN,
+        provider_id=None,
+    ) -> tuple[str, tuple]:
+        """带指数退避的重试调用；经共享限流器放行，服务端限流时按Retry-After暂停该账号
+
+        调用结果计入熔断器；重试过程中熔断打开则立即放弃，交由备用模型处理。
+        返回 (结果, 实际应答的提供商标识)。
+        """
         last_error = None
         for attempt in range(max_retries):
+            is_last = attempt + 1 >= max_retries
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            if attempt and breaker is not None and not breaker.allow_request():
+                logger.warning("AI提供商已熔断，停止重试")
+                break
+            span.set(retries=attempt)
             try:
-                return adapter.call(prompt)
+                if stream is not None:
+                    stream.reset()
+                    result = self._call_once(
+                        adapter, prompt, limiter, breaker, kind, cancel_token=cancel_token, on_chunk=stream.feed
+                    )
+                    return result, provider_id
+                delay = self.hedge_policy.delay_for(kind)
+                if delay is None:
+                    result = self._call_once(adapter, prompt, limiter, breaker, kind, cancel_token=cancel_token)
+                    return result, provider_id
+                return self._call_hedged(adapter, prompt, limiter, breaker, kind, delay, cancel_token, provider_id)
+            except OperationCancelledError:
+                raise
+            except RateLimitedError as e:
+                last_error = e
+                wait_time = e.retry_after if e.retry_after is not None else 2 ** attempt
+                if limiter is not None:
+                    # 等待由限流器统一执行，所有任务共同遵守Retry-After
+                    limiter.penalize(wait_time)
+                    logger.warning(f"AI调用被限流(第{attempt + 1}次): {e}，暂停该账号{wait_time:.1f}秒")
+                elif not is_last:
+                    logger.warning(f"AI调用被限流(第{attempt + 1}次): {e}，{wait_time:.1f}秒后重试")
+                    self._sleep(wait_time, cancel_token)
             except Exception as e:
                 last_error = e
+                if is_last:
+                    logger.warning(f"AI调用失败(第{attempt + 1}次): {e}")
+                    break
                 wait_time = 2 ** attempt
                 logger.warning(f"AI调用失败(第{attempt + 1}次): {e}，{wait_time}秒后重试")
-                time.sleep(wait_time)
+                self._sleep(wait_time, cancel_token)
+
         raise AIClientError(f"AI调用失败，已重试{max_retries}次: {last_error}")
 
+    @staticmethod
+    def _sleep(seconds: float, cancel_token=None):
+        """重试等待；取消时立即结束"""
+        if cancel_token is None:
+            time.sleep(seconds)
+        elif cancel_token.wait(seconds):
+            cancel_token.raise_if_cancelled()
+
+    def _call_once(
+        self,
+        adapter,
+        prompt: str,
+        limiter=None,
+        breaker=None,
+        kind: str | None = None,
+        cancel_token=None,
+        acquired=False,
+        on_chunk=None,
+    ) -> str:
+        """单次调用：经限流器放行，结果计入熔断器与延迟统计（被取消的调用不计入）
+
+        流式调用按首个数据块到达的时间计入熔断器：长代码生成的总耗时反映输出长度而非提供商健康度。
+        """
+        if limiter is not None and not acquired:
+            limiter.acquire(estimate_tokens(prompt), cancel_token=cancel_token)
+        result = None
+        first_chunk_at = None
+        # 排队时间不计入提供商延迟
+        started = time.monotonic()
+
+        def breaker_latency() -> float:
+            return (first_chunk_at or time.monotonic()) - started
+
+        try:
+            options = {}
+            if cancel_token is not None:
+                options["cancel_token"] = cancel_token
+            if on_chunk is not None:
+
+                def timed_chunk(chunk):
+                    nonlocal first_chunk_at
+                    if first_chunk_at is None:
+                        first_chunk_at = time.monotonic()
+                    on_chunk(chunk)
+
+                options["on_chunk"] = timed_chunk
+            result = adapter.call(prompt, **options)
+        except CallCancelledError:
+            raise
+        except RateLimitedError:
+            if breaker is not None:
+                breaker.record_ignored()
+            raise
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure(breaker_latency())
+            raise
+        finally:
+            if limiter is not None:
+                limiter.release(estimate_tokens(result) if result else 0)
+        if breaker is not None:
+            breaker.record_success(breaker_latency())
+        self.hedge_policy.record_latency(kind, time.monotonic() - started)
+        return result
+
+    def _call_hedged(
+        self, adapter, prompt: str, limiter, breaker, kind: str, delay: float, cancel_token=None, provider_id=None
+    ) -> tuple[str, tuple]:
+        """对冲调用：delay秒内未返回则向备用（或同一）提供商发副本，取先成功者并取消另一方
+
+        副本不排队：限流配额不足或超出对冲预算时只等待原调用。每路调用有独立的取消令牌，
+        任务取消时一并取消。返回 (结果, 先成功一路的提供商标识)。
+        """
+        results: queue.Queue = queue.Queue()
+        call_tokens: dict[str, CancelToken] = {}
+        route_ids: dict[str, tuple] = {}
+        unlinks = []
+
+        def launch(label: str, route_adapter, route_limiter, route_breaker, acquired: bool, route_id=None):
+            route_ids[label] = route_id or provider_id
+            call_token = call_tokens[label] = CancelToken()
+            unlinks.append(link_cancel(cancel_token, call_token))
+
+            def run():
+                try:
+                    value = self._call_once(
+                        route_adapter, prompt, route_limiter, route_breaker, kind, call_token, acquired
+                    )
+                    results.put((label, value, None))
+                except Exception as e:
+                    results.put((label, None, e))
+
+            threading.Thread(target=run, daemon=True, name=f"ai-{label}").start()
+
+        if limiter is not None:
+            limiter.acquire(estimate_tokens(prompt), cancel_token=cancel_token)
+        launch("primary", adapter, limiter, breaker, acquired=limiter is not None, route_id=provider_id)
+        try:
+            first = results.get(timeout=delay)
+        except queue.Empty:
+            first = None
+            if self._launch_hedge(launch, adapter, prompt):
+                logger.info("AI调用%.1f秒未返回，发出对冲请求: kind=%s", delay, kind)
+
+        errors: dict[str, Exception] = {}
+        try:
+            while True:
+                label, value, error = first if first is not None else results.get()
+                first = None
+                if error is None:
+                    if label == "hedge":
+                        self.hedge_policy.record_hedge_win()
+                    return value, route_ids[label]
+                errors[label] = error
+                if len(errors) == len(call_tokens):
+                    if "hedge" in errors and not isinstance(errors["hedge"], CallCancelledError):
+                        logger.warning("对冲请求失败: %s", errors["hedge"])
+                    raise errors["primary"]
+        finally:
+            for call_token in call_tokens.values():
+                call_token.cancel("对冲请求已结束")
+            for unlink in unlinks:
+                unlink()
+
+    def _launch_hedge(self, launch, adapter, prompt: str) -> bool:
+        hedge_adapter, hedge_id, hedge_limiter, hedge_breaker = self._hedge_route(adapter)
+        if not self.hedge_policy.try_spend():
+            return False
+        if hedge_limiter is not None:
+            try:
+                hedge_limiter.acquire(estimate_tokens(prompt), timeout=0)
+            except RateLimitTimeoutError:
+                self.hedge_policy.refund()
+                return False
+        launch(
+            "hedge", hedge_adapter, hedge_limiter, hedge_breaker, acquired=hedge_limiter is not None, route_id=hedge_id
+        )
+        return True
+
+    def _hedge_route(self, adapter) -> tuple:
+        """副本优先发往状态正常的另一提供商，否则发往同一提供商"""
+        for route_adapter, route_id, route_limiter, route_breaker in self._routes():
+            if route_adapter is adapter:
+                continue
+            if route_breaker is None or route_breaker.state == route_breaker.CLOSED:
+                return route_adapter, route_id, route_limiter, route_breaker
+        for route_adapter, route_id, route_limiter, route_breaker in self._routes():
+            if route_adapter is adapter:
+                return route_adapter, route_id, route_limiter, route_breaker
+        return adapter, None, None, None
+
+    def _create_breaker(self, provider: str, api_key: str, model: str, adapter, limiter):
+        def probe():
+            with limiter.slot():
+                adapter.call(self.PROBE_PROMPT, timeout=Config.AI_BREAKER_PROBE_TIMEOUT)
+
+        return get_circuit_breaker(f"{provider_key(provider, api_key)}:{model}", probe=probe)
+
     def _create_adapter(self, provider: str, api_key: str, model: str):
         """创建模型适配器"""
         normalized = (provider or '').strip()
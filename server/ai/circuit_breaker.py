@@ -0,0 +1,194 @@
+"""AI提供商熔断器 - 按滚动窗口的错误率与慢调用率在关闭/打开/半开之间切换"""
+import logging
+import threading
+import time
+from collections import deque
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """单个提供商的熔断器
+
+    closed: 正常放行，滚动窗口内错误率或慢调用率超过阈值后打开；
+    open: 拒绝调用，open_seconds后进入半开；配置了probe时由后台线程探测恢复，
+          否则半开状态放行一次真实调用作为探测；
+    half_open: 探测成功则关闭并清空窗口，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window_size: int = 20,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 60.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        probe=None,
+    ):
+        self.name = name
+        self.min_calls = max(1, min_calls)
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.probe = probe
+        self._lock = threading.Lock()
+        self._window: deque = deque(maxlen=max(self.min_calls, window_size))
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = False
+        self._probe_timer: threading.Timer | None = None
+        self._stats = {"opened": 0, "rejected": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self.probe is None and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._state = self.HALF_OPEN
+                self._half_open_in_flight = False
+            if self._state == self.HALF_OPEN and self.probe is None and not self._half_open_in_flight:
+                self._half_open_in_flight = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self, latency: float):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._close()
+                return
+            self._window.append((True, latency))
+            self._evaluate()
+
+    def record_failure(self, latency: float = 0.0):
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+            self._window.append((False, latency))
+            self._evaluate()
+
+    def record_ignored(self):
+        """调用结果不反映提供商健康度（如被限流），释放半开探测名额"""
+        with self._lock:
+            self._half_open_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            calls = len(self._window)
+            failures = sum(1 for ok, _ in self._window if not ok)
+            slow = sum(1 for _, latency in self._window if latency >= self.slow_call_seconds)
+            latencies = sorted(latency for ok, latency in self._window if ok)
+            return {
+                "name": self.name,
+                "state": self._state,
+                "window_calls": calls,
+                "error_rate": round(failures / calls, 3) if calls else 0.0,
+                "slow_call_rate": round(slow / calls, 3) if calls else 0.0,
+                "p50_latency": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                "open_for_seconds": round(time.monotonic() - self._opened_at, 1) if self._state != self.CLOSED else 0,
+                **self._stats,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._probe_timer is not None:
+                self._probe_timer.cancel()
+                self._probe_timer = None
+
+    def _evaluate(self):
+        if self._state != self.CLOSED or len(self._window) < self.min_calls:
+            return
+        calls = len(self._window)
+        failures = sum(1 for ok, _ in self._window if not ok)
+        slow = sum(1 for _, latency in self._window if latency >= self.slow_call_seconds)
+        if failures / calls >= self.error_rate or slow / calls >= self.slow_call_rate:
+            logger.warning("AI提供商[%s]熔断打开: 错误%s/%s，慢调用%s/%s", self.name, failures, calls, slow, calls)
+            self._open()
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._half_open_in_flight = False
+        self._stats["opened"] += 1
+        if self.probe is not None:
+            self._schedule_probe()
+
+    def _close(self):
+        logger.info("AI提供商[%s]已恢复，熔断关闭", self.name)
+        self._state = self.CLOSED
+        self._window.clear()
+        self._half_open_in_flight = False
+
+    def _schedule_probe(self):
+        if self._probe_timer is not None:
+            self._probe_timer.cancel()
+        self._probe_timer = threading.Timer(self.open_seconds, self._run_probe)
+        self._probe_timer.daemon = True
+        self._probe_timer.start()
+
+    def _run_probe(self):
+        with self._lock:
+            if self._state != self.OPEN:
+                return
+            self._state = self.HALF_OPEN
+            self._stats["probes"] += 1
+        started = time.monotonic()
+        try:
+            self.probe()
+        except Exception as e:
+            logger.info("AI提供商[%s]恢复探测失败: %s", self.name, e)
+            self.record_failure(time.monotonic() - started)
+            return
+        self.record_success(time.monotonic() - started)
+
+
+_breakers_lock = threading.Lock()
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str, probe=None) -> CircuitBreaker:
+    """按名称（提供商/模型/API Key哈希）获取进程共享的熔断器"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                window_size=Config.AI_BREAKER_WINDOW,
+                min_calls=Config.AI_BREAKER_MIN_CALLS,
+                error_rate=Config.AI_BREAKER_ERROR_RATE,
+                slow_call_seconds=Config.AI_BREAKER_SLOW_SECONDS,
+                slow_call_rate=Config.AI_BREAKER_SLOW_RATE,
+                open_seconds=Config.AI_BREAKER_OPEN_SECONDS,
+                probe=probe if Config.AI_BREAKER_PROBE else None,
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_snapshots() -> list[dict]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [breaker.snapshot() for breaker in breakers]
+
+
+def reset_circuit_breakers():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+        _breakers.clear()
+    for breaker in breakers:
+        breaker.shutdown()
@@ -0,0 +1,135 @@
+"""AI对冲请求 - 按提示词类型统计延迟，慢调用超过分位数后发出一次副本请求"""
+import logging
+import math
+import threading
+from collections import deque
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """按提示词类型保存最近window次成功调用的耗时"""
+
+    def __init__(self, window: int = 200):
+        self.window = max(1, window)
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque] = {}
+
+    def record(self, kind: str, latency: float):
+        with self._lock:
+            samples = self._samples.get(kind)
+            if samples is None:
+                samples = self._samples[kind] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def percentile(self, kind: str, q: float, min_samples: int = 1) -> float | None:
+        """返回第q分位（0~1）的耗时；样本不足时返回None"""
+        with self._lock:
+            samples = sorted(self._samples.get(kind) or ())
+        if not samples or len(samples) < min_samples:
+            return None
+        idx = min(len(samples) - 1, max(0, math.ceil(q * len(samples)) - 1))
+        return samples[idx]
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return {kind: len(samples) for kind, samples in self._samples.items()}
+
+
+class HedgePolicy:
+    """对冲策略：何时发副本请求，以及额外调用的预算
+
+    每次可对冲的调用积累max_rate个额度，发出一次副本消耗1个额度，
+    长期额外调用比例不超过max_rate；额度上限允许短时集中对冲。
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        min_delay: float = 1.0,
+        max_rate: float = 0.1,
+        window: int = 200,
+    ):
+        self.enabled = enabled
+        self.percentile = min(max(percentile, 0.5), 0.999)
+        self.min_samples = max(1, min_samples)
+        self.min_delay = max(0.0, min_delay)
+        self.max_rate = max(0.0, max_rate)
+        self.tracker = LatencyTracker(window)
+        self._lock = threading.Lock()
+        self._credit_cap = max(1.0, self.max_rate * window)
+        self._credits = 0.0
+        self._stats = {"calls": 0, "hedged": 0, "hedge_wins": 0, "over_budget": 0}
+
+    def delay_for(self, kind: str | None) -> float | None:
+        """返回发出副本前的等待秒数；None表示本次不对冲"""
+        if not self.enabled or not kind or self.max_rate <= 0:
+            return None
+        with self._lock:
+            self._stats["calls"] += 1
+            self._credits = min(self._credit_cap, self._credits + self.max_rate)
+        threshold = self.tracker.percentile(kind, self.percentile, self.min_samples)
+        if threshold is None:
+            return None
+        return max(self.min_delay, threshold)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._credits < 1:
+                self._stats["over_budget"] += 1
+                return False
+            self._credits -= 1
+            self._stats["hedged"] += 1
+            return True
+
+    def refund(self):
+        """副本未能发出（如限流配额不足）时退回额度"""
+        with self._lock:
+            self._credits = min(self._credit_cap, self._credits + 1)
+            self._stats["hedged"] -= 1
+
+    def record_latency(self, kind: str | None, latency: float):
+        if kind:
+            self.tracker.record(kind, latency)
+
+    def record_hedge_win(self):
+        with self._lock:
+            self._stats["hedge_wins"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats, enabled=self.enabled, credits=round(self._credits, 2))
+        stats["thresholds"] = {
+            kind: self.tracker.percentile(kind, self.percentile, self.min_samples)
+            for kind in self.tracker.counts()
+        }
+        return stats
+
+
+_policy_lock = threading.Lock()
+_policy: HedgePolicy | None = None
+
+
+def get_hedge_policy() -> HedgePolicy:
+    """进程共享的对冲策略（延迟统计在所有任务间共享）"""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = HedgePolicy(
+                enabled=Config.AI_HEDGE_ENABLED,
+                percentile=Config.AI_HEDGE_PERCENTILE,
+                min_samples=Config.AI_HEDGE_MIN_SAMPLES,
+                min_delay=Config.AI_HEDGE_MIN_DELAY,
+                max_rate=Config.AI_HEDGE_MAX_RATE,
+            )
+        return _policy
+
+
+def reset_hedge_policy():
+    global _policy
+    with _policy_lock:
+        _policy = None
@@ -0,0 +1,96 @@
+"""AI接口HTTP连接池 - 进程内共享的requests.Session"""
+import logging
+import socket
+import threading
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_session = None
+
+
+def get_session():
+    """获取进程共享的长连接Session（线程安全，首次使用时创建）"""
+    global _session
+    if _session is not None:
+        return _session
+    with _lock:
+        if _session is None:
+            _session = _create_session()
+    return _session
+
+
+def reset_session():
+    """关闭并丢弃共享Session（测试或配置变更后使用）"""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def request_timeout(timeout: float | None = None, stream: bool = False) -> tuple[float, float]:
+    """返回 (连接超时, 读取超时)；流式请求的读取超时即两次数据块之间的最大空闲时间"""
+    read_timeout = Config.AI_STREAM_IDLE_TIMEOUT if stream else Config.AI_READ_TIMEOUT
+    if timeout is not None:
+        read_timeout = timeout
+    return Config.AI_CONNECT_TIMEOUT, read_timeout
+
+
+def watch_cancel(cancel_token, response):
+    """取消时中断响应读取，返回注销函数；cancel_token为None时不做任何事"""
+    if cancel_token is None:
+        return lambda: None
+    return cancel_token.on_cancel(lambda: abort_response(response))
+
+
+def abort_response(response):
+    """关闭响应的底层连接；先shutdown socket，才能唤醒其他线程中阻塞的读取"""
+    try:
+        sock = _response_socket(response)
+        if sock is not None:
+            sock.shutdown(socket.SHUT_RDWR)
+    except Exception:
+        pass
+    try:
+        response.close()
+    except Exception:
+        pass
+
+
+def _response_socket(response):
+    """取响应正在读取的socket；服务端声明关闭连接时连接对象已释放sock，只能从响应体文件上取"""
+    raw = getattr(response, "raw", None)
+    sock = getattr(getattr(raw, "connection", None), "sock", None)
+    if sock is not None:
+        return sock
+    fp = getattr(getattr(raw, "_fp", None), "fp", None)
+    return getattr(getattr(fp, "raw", None), "_sock", None)
+
+
+def _create_session():
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter
+    except ImportError as e:
+        raise RuntimeError("缺少requests依赖") from e
+
+    session = requests.Session()
+    # 重试由AIClient统一控制，连接池层不做自动重试
+    adapter = HTTPAdapter(
+        pool_connections=Config.AI_HTTP_POOL_CONNECTIONS,
+        pool_maxsize=Config.AI_HTTP_POOL_SIZE,
+        max_retries=0,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if not Config.AI_HTTP_KEEPALIVE:
+        session.headers["Connection"] = "close"
+    logger.info(
+        "AI HTTP连接池已创建: pool_size=%s, keepalive=%s",
+        Config.AI_HTTP_POOL_SIZE,
+        Config.AI_HTTP_KEEPALIVE,
+    )
+    return session
@@ -1,4 +1,5 @@
 """提示词构建器。"""
+import json
 
 from config import Config
 
@@ -81,3 +82,15 @@ def build_page_prompt(feature_name: str, feature_description: str, page_type: st
             "page_type": page_type,
         },
     )
+
+
+def build_page_batch_prompt(features: list[dict]) -> str:
+    """features每项包含key/name/description/page_type"""
+    template = _load_prompt_template(
+        "page_batch_gen.txt",
+        (
+            "请为每个功能输出页面内容，JSON对象包含pages数组，每项有key及"
+            "title/subtitle/menus/fields/table_columns/sample_rows/chart_title/chart_summary。功能：{features}"
+        ),
+    )
+    return _fill_template(template, {"features": json.dumps(features, ensure_ascii=False, indent=2)})
@@ -0,0 +1,217 @@
+"""AI调用限流 - 按提供商+API Key共享的令牌桶、并发上限与可选TPM配额"""
+import email.utils
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitedError(RuntimeError):
+    """服务端限流（429等）；retry_after为服务端建议的等待秒数"""
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitTimeoutError(RuntimeError):
+    """等待限流配额超时"""
+
+
+def parse_retry_after(value) -> float | None:
+    """解析Retry-After头：秒数或HTTP日期"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(text)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def estimate_tokens(text: str) -> int:
+    # 中文为主的提示词粗略按2字符/token估算
+    return max(1, len(text or "") // 2)
+
+
+class ProviderRateLimiter:
+    """单个提供商账号的限流器
+
+    等待者按到达顺序排队（FIFO），只有队首检查配额，避免高频任务抢占其他任务的调用机会。
+    rps / max_in_flight / tokens_per_minute 为0表示不限制。
+    """
+
+    def __init__(self, rps: float = 0, max_in_flight: int = 0, tokens_per_minute: int = 0, burst: int = 0):
+        self.rps = max(0.0, rps)
+        self.max_in_flight = max(0, max_in_flight)
+        self.tokens_per_minute = max(0, tokens_per_minute)
+        self.capacity = float(max(1, burst or int(self.rps) or 1))
+        self._cond = threading.Condition()
+        self._bucket = self.capacity
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._blocked_until = 0.0
+        self._token_window: deque = deque()
+        self._window_tokens = 0
+        self._tickets = itertools.count()
+        self._waiting: deque = deque()
+        self._stats = {"acquired": 0, "throttled": 0, "waited_seconds": 0.0}
+
+    @contextmanager
+    def slot(self, estimated_tokens: int = 0, timeout: float | None = None):
+        self.acquire(estimated_tokens, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self, estimated_tokens: int = 0, timeout: float | None = None, cancel_token=None):
+        """排队获取调用配额；cancel_token取消时立即退出排队"""
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        unwatch = cancel_token.on_cancel(self._wake) if cancel_token is not None else None
+        with self._cond:
+            ticket = next(self._tickets)
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    now = time.monotonic()
+                    wait = self._wait_seconds(now, estimated_tokens) if self._waiting[0] == ticket else None
+                    if wait == 0:
+                        break
+                    if deadline is not None and now >= deadline:
+                        raise RateLimitTimeoutError("等待AI调用配额超时")
+                    if wait is not None and deadline is not None:
+                        wait = min(wait, deadline - now)
+                    elif wait is None and deadline is not None:
+                        wait = deadline - now
+                    self._cond.wait(wait)
+                self._take(now, estimated_tokens)
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+                if unwatch is not None:
+                    unwatch()
+            waited = time.monotonic() - started
+            self._stats["acquired"] += 1
+            self._stats["waited_seconds"] += waited
+        if waited > 1:
+            logger.info("AI调用限流等待%.1f秒", waited)
+
+    def release(self, used_tokens: int = 0):
+        """释放并发槽位；used_tokens为响应消耗的额外token（计入TPM窗口）"""
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            if used_tokens and self.tokens_per_minute:
+                self._record_tokens(time.monotonic(), used_tokens)
+            self._cond.notify_all()
+
+    def penalize(self, retry_after: float):
+        """服务端限流后暂停该账号的所有调用retry_after秒"""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + max(0.0, retry_after))
+            self._stats["throttled"] += 1
+            self._cond.notify_all()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(
+                in_flight=self._in_flight,
+                waiting=len(self._waiting),
+                blocked_seconds=max(0.0, round(self._blocked_until - time.monotonic(), 2)),
+            )
+        return stats
+
+    def _wait_seconds(self, now: float, estimated_tokens: int) -> float | None:
+        """返回还需等待的秒数；0表示可立即放行，None表示需等待其他调用释放"""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if self.max_in_flight and self._in_flight >= self.max_in_flight:
+            return None
+        if self.rps:
+            self._refill(now)
+            if self._bucket < 1:
+                return (1 - self._bucket) / self.rps
+        if self.tokens_per_minute and estimated_tokens:
+            self._expire_tokens(now)
+            # 单次请求超过整分钟配额时只要求窗口为空，避免永久阻塞
+            if self._window_tokens and self._window_tokens + estimated_tokens > self.tokens_per_minute:
+                return max(0.01, self._token_window[0][0] + 60 - now)
+        return 0
+
+    def _take(self, now: float, estimated_tokens: int):
+        if self.rps:
+            self._bucket -= 1
+        self._in_flight += 1
+        if self.tokens_per_minute and estimated_tokens:
+            self._record_tokens(now, estimated_tokens)
+
+    def _refill(self, now: float):
+        self._bucket = min(self.capacity, self._bucket + (now - self._refilled_at) * self.rps)
+        self._refilled_at = now
+
+    def _record_tokens(self, now: float, tokens: int):
+        self._token_window.append((now, tokens))
+        self._window_tokens += tokens
+
+    def _expire_tokens(self, now: float):
+        while self._token_window and now - self._token_window[0][0] >= 60:
+            self._window_tokens -= self._token_window.popleft()[1]
+
+
+_limiters_lock = threading.Lock()
+_limiters: dict[str, ProviderRateLimiter] = {}
+
+
+def provider_key(provider: str, api_key: str) -> str:
+    """提供商账号标识：提供商名 + API Key哈希（不暴露原始Key）"""
+    key_hash = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:12]
+    return f"{(provider or '').strip()}:{key_hash}"
+
+
+def get_rate_limiter(provider: str, api_key: str) -> ProviderRateLimiter:
+    """按 提供商 + API Key哈希 获取进程共享的限流器"""
+    limiter_key = provider_key(provider, api_key)
+    with _limiters_lock:
+        limiter = _limiters.get(limiter_key)
+        if limiter is None:
+            limiter = ProviderRateLimiter(
+                rps=Config.AI_RATE_LIMIT_RPS,
+                max_in_flight=Config.AI_MAX_IN_FLIGHT,
+                tokens_per_minute=Config.AI_TOKENS_PER_MINUTE,
+                burst=Config.AI_RATE_LIMIT_BURST,
+            )
+            _limiters[limiter_key] = limiter
+        return limiter
+
+
+def limiter_stats() -> dict[str, dict]:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {key: limiter.stats() for key, limiter in limiters.items()}
+
+
+def reset_rate_limiters():
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,197 @@
+"""AI响应缓存 - 内存LRU前置 + 磁盘内容寻址存储（按TTL与容量淘汰）"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """按 provider + model + prompt哈希 缓存模型输出"""
+
+    EVICT_EVERY_WRITES = 32
+
+    def __init__(
+        self,
+        cache_dir: str | Path,
+        ttl_seconds: float = 72 * 3600,
+        max_entries: int = 2000,
+        max_bytes: int = 200 * 1024 * 1024,
+        memory_entries: int = 128,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.memory_entries = max(0, memory_entries)
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self._stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "writes": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str) -> str:
+        digest = hashlib.sha256()
+        for part in (provider or "", model or "", prompt):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item and now - item[0] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self._stats["hits"] += 1
+                self._stats["memory_hits"] += 1
+                return item[1]
+            if item:
+                self._memory.pop(key, None)
+
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            created_at = float(data["created_at"])
+            response = data["response"]
+        except FileNotFoundError:
+            return self._miss()
+        except Exception:
+            path.unlink(missing_ok=True)
+            return self._miss()
+
+        if now - created_at > self.ttl_seconds:
+            path.unlink(missing_ok=True)
+            return self._miss()
+
+        try:
+            # 以mtime记录最近访问时间，作为磁盘LRU淘汰依据
+            os.utime(path, None)
+        except OSError:
+            pass
+        with self._lock:
+            self._remember(key, created_at, response)
+            self._stats["hits"] += 1
+            self._stats["disk_hits"] += 1
+        return response
+
+    def put(self, key: str, response: str, provider: str = "", model: str = ""):
+        created_at = time.time()
+        path = self._path(key)
+        payload = {
+            "created_at": created_at,
+            "provider": provider,
+            "model": model,
+            "response": response,
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning("写入AI响应缓存失败: %s", e)
+            return
+
+        with self._lock:
+            self._remember(key, created_at, response)
+            self._stats["writes"] += 1
+            self._writes_since_evict += 1
+            need_evict = self._writes_since_evict >= self.EVICT_EVERY_WRITES
+            if need_evict:
+                self._writes_since_evict = 0
+        if need_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """删除过期条目，并按最近访问时间淘汰超出容量的条目"""
+        if not self.cache_dir.exists():
+            return 0
+        now = time.time()
+        entries: list[tuple[float, int, Path]] = []
+        removed = 0
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            # 过期判断用mtime近似：mtime不早于创建时间，未过期条目不会被误删
+            if now - stat.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                removed += 1
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort(key=lambda item: item[0])
+        total_bytes = sum(item[1] for item in entries)
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+            removed += 1
+
+        with self._lock:
+            self._stats["evictions"] += removed
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        for path in self.cache_dir.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+
+    def _miss(self):
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def _remember(self, key: str, created_at: float, response: str):
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+
+_cache_lock = threading.Lock()
+_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache | None:
+    """按配置返回进程共享的响应缓存；未启用时返回None"""
+    global _cache
+    if not Config.AI_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                cache_dir=Config.TASK_DATA_DIR / "ai_cache",
+                ttl_seconds=Config.AI_CACHE_TTL_HOURS * 3600,
+                max_entries=Config.AI_CACHE_MAX_ENTRIES,
+                max_bytes=Config.AI_CACHE_MAX_MB * 1024 * 1024,
+                memory_entries=Config.AI_CACHE_MEMORY_ENTRIES,
+            )
+        return _cache
+
+
+def reset_response_cache():
+    global _cache
+    with _cache_lock:
+        _cache = None
@@ -0,0 +1,114 @@
+"""AI输出的JSON解析 - 流式提取files[]中已完整接收的条目"""
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def loads_first_object(text: str):
+    """解析文本中第一个完整的JSON对象，忽略前后的说明文字或Markdown围栏"""
+    start = text.find("{")
+    if start < 0:
+        raise json.JSONDecodeError("未找到JSON对象", text, 0)
+    data, _ = json.JSONDecoder().raw_decode(text, start)
+    return data
+
+
+class StreamingFilesParser:
+    """增量解析 {"files": [{...}, ...]} 结构
+
+    逐块feed模型输出，files数组中每个条目的右括号一到即解析并回调on_file(item)；
+    响应被截断时，files属性仍保留已完整接收的条目。只扫描一遍输入，不回溯。
+    """
+
+    def __init__(self, key: str = "files", on_file=None):
+        self.key = key
+        self.on_file = on_file
+        self.files: list[dict] = []
+        self.reset()
+
+    def reset(self):
+        """丢弃未完成的扫描状态（如重试前）；已解析的条目保留"""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # 根对象层的字符串（键名）内容
+        self._root_string: list[str] | None = None
+        self._last_root_string = None
+        self._pending_key = None
+        self._array_depth = None
+        self._item: list[str] | None = None
+
+    def feed(self, chunk: str):
+        for ch in chunk:
+            if self._item is not None:
+                self._item.append(ch)
+            if self._in_string:
+                self._scan_string(ch)
+                continue
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._root_string = []
+            elif ch == ":":
+                if self._depth == 1:
+                    self._pending_key = self._last_root_string
+            elif ch in "{[":
+                self._open(ch)
+            elif ch in "}]":
+                self._close()
+            elif ch == "," and self._depth == 1:
+                self._pending_key = None
+
+    def close(self) -> list[dict]:
+        if self._item is not None:
+            logger.warning("AI响应在files条目中途结束，保留已完整接收的%s个条目", len(self.files))
+        return self.files
+
+    def _scan_string(self, ch: str):
+        if self._escape:
+            self._escape = False
+        elif ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            self._in_string = False
+            if self._root_string is not None:
+                self._last_root_string = "".join(self._root_string)
+                self._root_string = None
+            return
+        if self._root_string is not None:
+            self._root_string.append(ch)
+
+    def _open(self, ch: str):
+        self._depth += 1
+        if ch == "[" and self._depth == 2 and self._pending_key == self.key:
+            self._array_depth = self._depth
+        elif ch == "{" and self._array_depth is not None and self._depth == self._array_depth + 1:
+            self._item = ["{"]
+
+    def _close(self):
+        if self._item is not None and self._depth == self._array_depth + 1:
+            self._emit("".join(self._item))
+            self._item = None
+        elif self._array_depth is not None and self._depth == self._array_depth:
+            self._array_depth = None
+        self._depth = max(0, self._depth - 1)
+
+    def _emit(self, text: str):
+        try:
+            item = json.loads(text)
+        except json.JSONDecodeError as e:
+            logger.debug("跳过无法解析的files条目: %s", e)
+            return
+        if not isinstance(item, dict):
+            return
+        self.files.append(item)
+        if self.on_file is not None:
+            self.on_file(item)
+
+
+def parse_files_prefix(text: str, key: str = "files") -> list[dict]:
+    """从可能被截断的完整文本中取出已完整的files条目"""
+    parser = StreamingFilesParser(key)
+    parser.feed(text)
+    return parser.close()
@@ -1,11 +1,10 @@
 """文件下载API"""
 import logging
-import zipfile
-from io import BytesIO
 from pathlib import Path
 from flask import Blueprint, send_file, jsonify
 
 from config import Config
+from generators.bundle_builder import BundleBuilder
 
 logger = logging.getLogger(__name__)
 download_bp = Blueprint('download', __name__)
@@ -51,6 +50,9 @@ def download_file(task_id, doc_type):
         filepath,
         as_attachment=True,
         download_name=filepath.name,
+        conditional=True,
+        etag=True,
+        max_age=0,
     )
 
 
@@ -76,17 +78,20 @@ def download_all(task_id):
         return jsonify(resp), 404
 
     # 获取软著名称用于ZIP文件名
-    software_name = state.get('context', {}).get('software_name', '软著材料')
+    software_name = state.get('software_name')
+    if not software_name:
+        # 旧任务记录未冗余软件名时，才按需读取上下文
+        software_name = (task_manager.get_task_context(task_id) or {}).get('software_name') or '软著材料'
 
-    # 创建内存ZIP
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for doc_type, filepath_str in output_files.items():
-            filepath = Path(filepath_str)
-            if filepath.exists():
-                zf.write(filepath, filepath.name)
+    # 步骤7已生成的下载包直接发送；旧任务或文件更新后按需重建
+    try:
+        bundle_path = BundleBuilder().ensure(task_id, output_files)
+    except Exception as e:
+        logger.exception("构建下载包失败: %s", task_id)
+        resp = {"error": f"打包失败: {e}"}
+        logger.warning("接口出参 /download/%s/all: status=500, body=%s", task_id, resp)
+        return jsonify(resp), 500
 
-    zip_buffer.seek(0)
     logger.info(
         "接口出参 /download/%s/all: status=200, zip_name=%s_软著材料.zip, file_count=%s",
         task_id,
@@ -94,8 +99,11 @@ def download_all(task_id):
         len(output_files),
     )
     return send_file(
-        zip_buffer,
+        bundle_path,
         mimetype='application/zip',
         as_attachment=True,
         download_name=f'{software_name}_软著材料.zip',
+        conditional=True,
+        etag=True,
+        max_age=0,
     )
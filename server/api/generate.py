@@ -76,11 +76,9 @@ def create_generate_task():
     )
 
     # 提交任务
-    from app import task_manager
-    from generators.orchestrator import Orchestrator
+    from app import new_task_runner, task_manager
 
-    orchestrator = Orchestrator(task_manager)
-    task_id = task_manager.submit_task(orchestrator.run, context)
+    task_id = task_manager.submit_task(new_task_runner(), context)
 
     resp = {"task_id": task_id}
     logger.info("接口出参 /generate: status=201, body=%s", resp)
@@ -0,0 +1,26 @@
+"""服务状态API"""
+import logging
+from flask import Blueprint, jsonify
+
+from ai.circuit_breaker import breaker_snapshots
+from ai.hedging import get_hedge_policy
+from ai.rate_limiter import limiter_stats
+from ai.response_cache import get_response_cache
+
+logger = logging.getLogger(__name__)
+status_bp = Blueprint('status', __name__)
+
+
+@status_bp.route('/status/ai', methods=['GET'])
+def ai_status():
+    """AI提供商熔断、限流、对冲与响应缓存状态"""
+    logger.info("接口入参 /status/ai: 查询AI调用状态")
+    cache = get_response_cache()
+    resp = {
+        "breakers": breaker_snapshots(),
+        "rate_limiters": limiter_stats(),
+        "hedging": get_hedge_policy().stats(),
+        "response_cache": cache.stats() if cache is not None else None,
+    }
+    logger.info("接口出参 /status/ai: status=200, breakers=%s", [(b['name'], b['state']) for b in resp['breakers']])
+    return jsonify(resp)
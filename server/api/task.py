@@ -1,8 +1,7 @@
 """任务状态API + SSE进度推送"""
 import json
-import time
 import logging
-from flask import Blueprint, Response, jsonify
+from flask import Blueprint, Response, jsonify, request, send_file
 
 logger = logging.getLogger(__name__)
 task_bp = Blueprint('task', __name__)
@@ -18,54 +17,33 @@ def get_task_state(task_id):
         resp = {"error": "任务不存在"}
         logger.warning("接口出参 /task/%s: status=404, body=%s", task_id, resp)
         return jsonify(resp), 404
-    # 返回时排除context中的大字段（generated_code等）
-    safe_state = {k: v for k, v in state.items() if k != 'context'}
+    # 进度记录不含context大字段，可直接返回
     logger.info(
         "接口出参 /task/%s: status=200, task_status=%s, progress=%s",
         task_id,
-        safe_state.get("status"),
-        safe_state.get("progress"),
+        state.get("status"),
+        state.get("progress"),
     )
-    return jsonify(safe_state)
+    return jsonify(state)
 
 
 @task_bp.route('/task/<task_id>/stream', methods=['GET'])
 def task_stream(task_id):
-    """SSE实时进度推送"""
-    logger.info("接口入参 /task/%s/stream: 建立SSE连接", task_id)
+    """SSE实时进度推送（事件广播 + Last-Event-ID断线续传）"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    logger.info("接口入参 /task/%s/stream: 建立SSE连接, last_event_id=%s", task_id, last_event_id)
     from app import task_manager
 
+    if not task_manager.get_task_state(task_id):
+        logger.warning("接口出参 /task/%s/stream: 任务不存在，结束推送", task_id)
+        body = f"data: {json.dumps({'error': '任务不存在'}, ensure_ascii=False)}\n\n"
+        return Response(body, mimetype='text/event-stream')
+
     def event_stream():
-        while True:
-            state = task_manager.get_task_state(task_id)
-            if not state:
-                logger.warning("接口出参 /task/%s/stream: 任务不存在，结束推送", task_id)
-                yield f"data: {json.dumps({'error': '任务不存在'}, ensure_ascii=False)}\n\n"
-                break
-
-            # 只推送关键状态字段
-            push_data = {
-                "task_id": state["task_id"],
-                "status": state["status"],
-                "current_step": state["current_step"],
-                "total_steps": state.get("total_steps", 7),
-                "step_name": state["step_name"],
-                "progress": state["progress"],
-                "message": state["message"],
-                "warnings": state.get("warnings", []),
-                "logs": state.get("logs", [])[-20:],  # 只推最近20条日志
-                "output_files": state.get("output_files", {}),
-            }
-            yield f"data: {json.dumps(push_data, ensure_ascii=False)}\n\n"
-
-            if state['status'] in ('completed', 'failed', 'cancelled'):
-                logger.info(
-                    "接口出参 /task/%s/stream: 任务结束，status=%s",
-                    task_id,
-                    state['status'],
-                )
-                break
-            time.sleep(1)
+        # 首帧告知客户端重连间隔
+        yield "retry: 3000\n\n"
+        yield from task_manager.subscribe_events(task_id, last_event_id)
+        logger.info("接口出参 /task/%s/stream: 推送结束", task_id)
 
     return Response(
         event_stream(),
@@ -91,3 +69,94 @@ def cancel_task(task_id):
     resp = {"error": "无法取消任务（可能已完成或不存在）"}
     logger.warning("接口出参 /task/%s/cancel: status=400, body=%s", task_id, resp)
     return jsonify(resp), 400
+
+
+@task_bp.route('/task/<task_id>/resume', methods=['POST'])
+def resume_task(task_id):
+    """恢复中断的任务（从检查点继续）"""
+    logger.info("接口入参 /task/%s/resume: 请求恢复任务", task_id)
+    from app import task_manager, task_recovery
+    if not task_manager.get_task_state(task_id):
+        resp = {"error": "任务不存在"}
+        logger.warning("接口出参 /task/%s/resume: status=404, body=%s", task_id, resp)
+        return jsonify(resp), 404
+    accepted, message = task_recovery.resume(task_id)
+    if accepted:
+        resp = {"message": message}
+        logger.info("接口出参 /task/%s/resume: status=202, body=%s", task_id, resp)
+        return jsonify(resp), 202
+    resp = {"error": message}
+    logger.warning("接口出参 /task/%s/resume: status=409, body=%s", task_id, resp)
+    return jsonify(resp), 409
+
+
+@task_bp.route('/task/<task_id>/trace', methods=['GET'])
+def get_task_trace(task_id):
+    """任务耗时追踪（Chrome trace格式）；执行中的任务返回当前已记录的区间"""
+    logger.info("接口入参 /task/%s/trace: 无", task_id)
+    from app import task_manager
+    from utils.tracing import get_tracer, trace_path
+
+    if not task_manager.get_task_state(task_id):
+        resp = {"error": "任务不存在"}
+        logger.warning("接口出参 /task/%s/trace: status=404, body=%s", task_id, resp)
+        return jsonify(resp), 404
+    tracer = get_tracer(task_id)
+    if tracer is not None:
+        trace = tracer.to_chrome()
+        logger.info("接口出参 /task/%s/trace: status=200, events=%s", task_id, len(trace["traceEvents"]))
+        return jsonify(trace)
+    path = trace_path(task_id)
+    if not path.exists():
+        resp = {"error": "追踪文件不存在"}
+        logger.warning("接口出参 /task/%s/trace: status=404, body=%s", task_id, resp)
+        return jsonify(resp), 404
+    logger.info("接口出参 /task/%s/trace: status=200, file=%s", task_id, path)
+    return send_file(path, mimetype='application/json', download_name=f"{task_id}_trace.json")
+
+
+@task_bp.route('/task/<task_id>/features/<feature_id>', methods=['PATCH'])
+def update_feature(task_id, feature_id):
+    """修改单个功能，只重做依赖该功能的步骤"""
+    data = request.get_json(silent=True)
+    logger.info("接口入参 /task/%s/features/%s: %s", task_id, feature_id, data)
+    from app import new_task_runner, task_manager
+    from generators.orchestrator import Orchestrator
+
+    if not isinstance(data, dict) or not data:
+        resp = {"error": "请求体需包含要修改的字段: " + "/".join(Orchestrator.FEATURE_FIELD_NODES)}
+        logger.warning("接口出参 /task/%s/features/%s: status=400, body=%s", task_id, feature_id, resp)
+        return jsonify(resp), 400
+    if not task_manager.get_task_state(task_id):
+        resp = {"error": "任务不存在"}
+        logger.warning("接口出参 /task/%s/features/%s: status=404, body=%s", task_id, feature_id, resp)
+        return jsonify(resp), 404
+    # 先占用重新执行权再写入修改，避免修改被执行中的任务覆盖或在拒绝后仍被保存
+    if not task_manager.claim_rerun(task_id):
+        resp = {"error": "任务尚未结束，无法修改功能"}
+        logger.warning("接口出参 /task/%s/features/%s: status=409, body=%s", task_id, feature_id, resp)
+        return jsonify(resp), 409
+
+    try:
+        try:
+            context, stale = Orchestrator(task_manager).update_feature(task_id, feature_id, data)
+        except LookupError as e:
+            resp = {"error": str(e)}
+            logger.warning("接口出参 /task/%s/features/%s: status=404, body=%s", task_id, feature_id, resp)
+            return jsonify(resp), 404
+        except ValueError as e:
+            resp = {"error": str(e)}
+            logger.warning("接口出参 /task/%s/features/%s: status=400, body=%s", task_id, feature_id, resp)
+            return jsonify(resp), 400
+        if not stale:
+            resp = {"task_id": task_id, "message": "功能内容无变化", "rerun_steps": []}
+            logger.info("接口出参 /task/%s/features/%s: status=200, body=%s", task_id, feature_id, resp)
+            return jsonify(resp)
+
+        task_manager.save_task_context(task_id, context)
+        task_manager.rerun_task(task_id, new_task_runner(), context, f"功能{feature_id}已修改，重新生成受影响的产物...")
+    finally:
+        task_manager.release_rerun(task_id)
+    resp = {"task_id": task_id, "message": "已开始增量重新生成", "rerun_steps": stale}
+    logger.info("接口出参 /task/%s/features/%s: status=202, body=%s", task_id, feature_id, resp)
+    return jsonify(resp), 202
@@ -3,34 +3,76 @@ from flask import Flask
 from flask_cors import CORS
 
 from config import Config
+from task.event_hub import TaskEventHub
+from task.recovery import TaskRecovery
 from task.task_manager import TaskManager
 from utils.file_manager import FileCleanupWorker, FileManager
 
 # 全局任务管理器实例
 task_manager = TaskManager(
     max_workers=Config.MAX_CONCURRENT_TASKS,
-    data_dir=str(Config.TASK_DATA_DIR)
+    data_dir=str(Config.TASK_DATA_DIR),
+    store_backend=Config.TASK_STORE_BACKEND,
+    event_hub=TaskEventHub(heartbeat_seconds=Config.SSE_HEARTBEAT_SECONDS),
+)
+
+
+def new_task_runner():
+    """每个任务使用独立的编排器实例"""
+    from generators.orchestrator import Orchestrator
+
+    return Orchestrator(task_manager).run
+
+
+# 中断任务恢复队列
+task_recovery = TaskRecovery(
+    task_manager,
+    run_factory=new_task_runner,
+    max_concurrent=Config.TASK_RESUME_MAX_CONCURRENT,
+    max_attempts=Config.TASK_RESUME_MAX_ATTEMPTS,
 )
 
 
 def create_app():
     app = Flask(__name__)
+    app.config['USE_X_SENDFILE'] = Config.USE_X_SENDFILE
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
     # 注册蓝图
     from api.generate import generate_bp
     from api.task import task_bp
     from api.download import download_bp
+    from api.status import status_bp
 
     app.register_blueprint(generate_bp, url_prefix='/api')
     app.register_blueprint(task_bp, url_prefix='/api')
     app.register_blueprint(download_bp, url_prefix='/api')
+    app.register_blueprint(status_bp, url_prefix='/api')
 
     # 确保输出目录存在
     Config.OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     Config.SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
     Config.TASK_DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+    # 子进程须在主进程只有一个线程时fork：先截图进程（不在主进程留下线程），再文档渲染进程池，
+    # 之后才启动预热、清理与任务恢复等后台线程；浏览器预热在截图子进程内进行
+    if Config.SCREENSHOT_WORKER_MODE == 'process':
+        from generators.screenshot_process import get_screenshot_process_worker
+
+        screenshot_worker = get_screenshot_process_worker()
+        if screenshot_worker.is_available():
+            screenshot_worker.start()
+
+    from generators.doc_render_service import get_doc_render_service
+
+    get_doc_render_service().start()
+
+    # 预热常驻截图浏览器，避免首个任务承担冷启动
+    if Config.SCREENSHOT_WORKER_MODE != 'process' and Config.SCREENSHOT_WARM_START:
+        from generators.browser_pool import get_browser_worker
+
+        get_browser_worker().warm_up()
+
     # 启动后台文件清理线程（默认开启）
     if Config.ENABLE_FILE_CLEANUP:
         file_manager = FileManager(
@@ -38,6 +80,7 @@ def create_app():
             screenshot_dir=Config.SCREENSHOT_DIR,
             task_data_dir=Config.TASK_DATA_DIR,
             retention_hours=Config.FILE_RETENTION_HOURS,
+            task_store=task_manager.store,
         )
         cleanup_worker = FileCleanupWorker(
             file_manager=file_manager,
@@ -46,6 +89,10 @@ def create_app():
         cleanup_worker.start()
         app.extensions["file_cleanup_worker"] = cleanup_worker
 
+    # 恢复上次进程退出时中断的任务，需在渲染/截图进程创建之后
+    if Config.TASK_AUTO_RESUME:
+        task_recovery.resume_interrupted()
+
     return app
 
 
@@ -25,16 +25,81 @@ class Config:
     AI_FALLBACK_API_KEY = os.getenv('AI_FALLBACK_API_KEY', '')
     AI_FALLBACK_MODEL = os.getenv('AI_FALLBACK_MODEL', '')
 
+    # AI接口HTTP连接池与超时（秒）
+    AI_HTTP_POOL_SIZE = int(os.getenv('AI_HTTP_POOL_SIZE', '16'))
+    AI_HTTP_POOL_CONNECTIONS = int(os.getenv('AI_HTTP_POOL_CONNECTIONS', '4'))
+    AI_HTTP_KEEPALIVE = os.getenv('AI_HTTP_KEEPALIVE', 'true').lower() in ('1', 'true', 'yes', 'on')
+    AI_CONNECT_TIMEOUT = float(os.getenv('AI_CONNECT_TIMEOUT', '10'))
+    AI_READ_TIMEOUT = float(os.getenv('AI_READ_TIMEOUT', '60'))
+    AI_STREAM_IDLE_TIMEOUT = float(os.getenv('AI_STREAM_IDLE_TIMEOUT', '60'))
+
+    # AI调用限流（按提供商+API Key进程内共享，0为不限制）：每秒请求数、突发容量、并发调用数、每分钟token数
+    AI_RATE_LIMIT_RPS = float(os.getenv('AI_RATE_LIMIT_RPS', '2'))
+    AI_RATE_LIMIT_BURST = int(os.getenv('AI_RATE_LIMIT_BURST', '0'))
+    AI_MAX_IN_FLIGHT = int(os.getenv('AI_MAX_IN_FLIGHT', '4'))
+    AI_TOKENS_PER_MINUTE = int(os.getenv('AI_TOKENS_PER_MINUTE', '0'))
+
+    # AI提供商熔断：最近N次调用中错误率或慢调用率超过阈值即熔断，直接切换到另一提供商
+    AI_BREAKER_WINDOW = int(os.getenv('AI_BREAKER_WINDOW', '20'))
+    AI_BREAKER_MIN_CALLS = int(os.getenv('AI_BREAKER_MIN_CALLS', '5'))
+    AI_BREAKER_ERROR_RATE = float(os.getenv('AI_BREAKER_ERROR_RATE', '0.5'))
+    # 慢调用阈值：非流式调用按总耗时，流式调用按首个数据块到达时间
+    AI_BREAKER_SLOW_SECONDS = float(os.getenv('AI_BREAKER_SLOW_SECONDS', '60'))
+    AI_BREAKER_SLOW_RATE = float(os.getenv('AI_BREAKER_SLOW_RATE', '0.8'))
+    AI_BREAKER_OPEN_SECONDS = float(os.getenv('AI_BREAKER_OPEN_SECONDS', '30'))
+    AI_BREAKER_PROBE = os.getenv('AI_BREAKER_PROBE', 'true').lower() in ('1', 'true', 'yes', 'on')
+    AI_BREAKER_PROBE_TIMEOUT = float(os.getenv('AI_BREAKER_PROBE_TIMEOUT', '15'))
+
+    # AI对冲请求（默认关闭）：调用耗时超过同类提示词的延迟分位数后，向备用（或同一）提供商发副本，取先返回者
+    AI_HEDGE_ENABLED = os.getenv('AI_HEDGE_ENABLED', 'false').lower() in ('1', 'true', 'yes', 'on')
+    AI_HEDGE_PERCENTILE = float(os.getenv('AI_HEDGE_PERCENTILE', '0.95'))
+    AI_HEDGE_MIN_SAMPLES = int(os.getenv('AI_HEDGE_MIN_SAMPLES', '20'))
+    AI_HEDGE_MIN_DELAY = float(os.getenv('AI_HEDGE_MIN_DELAY', '2'))
+    AI_HEDGE_MAX_RATE = float(os.getenv('AI_HEDGE_MAX_RATE', '0.1'))
+
+    # AI响应缓存（默认关闭；缓存目录位于TASK_DATA_DIR/ai_cache）
+    AI_CACHE_ENABLED = os.getenv('AI_CACHE_ENABLED', 'false').lower() in ('1', 'true', 'yes', 'on')
+    AI_CACHE_TTL_HOURS = float(os.getenv('AI_CACHE_TTL_HOURS', '72'))
+    AI_CACHE_MAX_ENTRIES = int(os.getenv('AI_CACHE_MAX_ENTRIES', '2000'))
+    AI_CACHE_MAX_MB = int(os.getenv('AI_CACHE_MAX_MB', '200'))
+    AI_CACHE_MEMORY_ENTRIES = int(os.getenv('AI_CACHE_MEMORY_ENTRIES', '128'))
+
     # 文件存储路径
     OUTPUT_DIR = Path(os.getenv('OUTPUT_DIR', str(BASE_DIR / 'output')))
+    # 由前置Web服务器（nginx/Apache）通过X-Sendfile发送下载文件
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() in ('1', 'true', 'yes', 'on')
     SCREENSHOT_DIR = Path(os.getenv('SCREENSHOT_DIR', str(BASE_DIR / 'screenshots')))
     TASK_DATA_DIR = Path(os.getenv('TASK_DATA_DIR', str(BASE_DIR / 'data' / 'tasks')))
 
     # 任务配置
+    TASK_STORE_BACKEND = os.getenv('TASK_STORE_BACKEND', 'sqlite')  # sqlite / json
     MAX_CONCURRENT_TASKS = int(os.getenv('MAX_CONCURRENT_TASKS', '2'))
+    # 启动时自动恢复中断任务（从检查点继续）；同时恢复的任务数与单个任务的自动恢复次数上限
+    TASK_AUTO_RESUME = os.getenv('TASK_AUTO_RESUME', 'true').lower() in ('1', 'true', 'yes', 'on')
+    TASK_RESUME_MAX_CONCURRENT = int(os.getenv('TASK_RESUME_MAX_CONCURRENT', '1'))
+    TASK_RESUME_MAX_ATTEMPTS = int(os.getenv('TASK_RESUME_MAX_ATTEMPTS', '3'))
+    # 记录步骤/AI调用/截图/文档/排队耗时，导出为 output/<task_id>/trace.json（Chrome trace格式）；单任务事件数上限
+    TASK_TRACE_ENABLED = os.getenv('TASK_TRACE_ENABLED', 'true').lower() in ('1', 'true', 'yes', 'on')
+    TASK_TRACE_MAX_EVENTS = int(os.getenv('TASK_TRACE_MAX_EVENTS', '20000'))
     FILE_RETENTION_HOURS = int(os.getenv('FILE_RETENTION_HOURS', '24'))
     ENABLE_FILE_CLEANUP = os.getenv('ENABLE_FILE_CLEANUP', 'true').lower() in ('1', 'true', 'yes', 'on')
     FILE_CLEANUP_INTERVAL_MINUTES = int(os.getenv('FILE_CLEANUP_INTERVAL_MINUTES', '60'))
+    # 编排器可同时执行的无依赖步骤数（1为按七步顺序串行）
+    ORCHESTRATOR_MAX_PARALLEL_STEPS = int(os.getenv('ORCHESTRATOR_MAX_PARALLEL_STEPS', '3'))
+    # Word文档渲染进程数（0为在任务线程内生成）与单文档超时秒数
+    DOC_RENDER_WORKERS = int(os.getenv('DOC_RENDER_WORKERS', '2'))
+    DOC_RENDER_TIMEOUT_SECONDS = int(os.getenv('DOC_RENDER_TIMEOUT_SECONDS', '120'))
+    # 步骤2按功能并发生成代码的最大并发数（1为串行）
+    CODE_GEN_CONCURRENCY = int(os.getenv('CODE_GEN_CONCURRENCY', '4'))
+    # 步骤3每次请求合并生成的页面数（1为逐个功能请求）；合并结果缺失的功能单独补请求
+    PAGE_BATCH_SIZE = int(os.getenv('PAGE_BATCH_SIZE', '12'))
+    # 截图：常驻浏览器的全局并发页面上限，是否在应用启动时预热浏览器
+    SCREENSHOT_MAX_PAGES = int(os.getenv('SCREENSHOT_MAX_PAGES', '4'))
+    SCREENSHOT_PAGE_CONCURRENCY = int(os.getenv('SCREENSHOT_PAGE_CONCURRENCY', '4'))
+    SCREENSHOT_WARM_START = os.getenv('SCREENSHOT_WARM_START', 'false').lower() in ('1', 'true', 'yes', 'on')
+    # 截图运行方式：thread（API进程内常驻浏览器线程）或 process（独立截图进程）
+    SCREENSHOT_WORKER_MODE = os.getenv('SCREENSHOT_WORKER_MODE', 'thread').lower()
+    SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
 
     # 技术栈配置目录
     TECH_STACKS_DIR = BASE_DIR / 'tech_stacks'
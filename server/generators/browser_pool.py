@@ -0,0 +1,186 @@
+"""常驻无头浏览器 - 单独事件循环线程持有热浏览器，按任务分配隔离上下文"""
+import asyncio
+import atexit
+import importlib.util
+import logging
+import threading
+from concurrent.futures import CancelledError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from config import Config
+from utils.cancellation import OperationCancelledError
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserUnavailableError(RuntimeError):
+    """浏览器不可用（未安装Playwright或启动失败）"""
+
+
+class BrowserWorker:
+    """线程安全的浏览器工作者
+
+    submit() 可在任意线程调用：任务在工作线程的事件循环中执行，
+    每次获得独立的BrowserContext，页面数受全局信号量限制。
+    浏览器断开或崩溃后在下一次提交时自动重启。
+    """
+
+    def __init__(self, max_pages: int = 4, launch_timeout: float = 60.0):
+        self.max_pages = max(1, max_pages)
+        self.launch_timeout = launch_timeout
+        self._start_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._playwright = None
+        self._browser = None
+        self._browser_lock: asyncio.Lock | None = None
+        self._page_slots: asyncio.Semaphore | None = None
+        self.restart_count = 0
+
+    @staticmethod
+    def is_available() -> bool:
+        return importlib.util.find_spec("playwright") is not None
+
+    def start(self):
+        """启动事件循环线程（幂等）"""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run_loop, daemon=True, name="browser-worker")
+            self._thread.start()
+        self._ready.wait(5)
+
+    def warm_up(self):
+        """后台预热浏览器，不阻塞调用方"""
+        if not self.is_available():
+            return
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._ensure_browser(), self._loop)
+        future.add_done_callback(self._log_warm_up_result)
+
+    def submit(self, job, context_options: dict | None = None, timeout: float | None = None, cancel_token=None):
+        """在隔离的浏览器上下文中执行 job(context, page_slots)，阻塞等待结果
+
+        cancel_token取消时立即取消事件循环中的任务（页面与上下文在循环内关闭），抛出OperationCancelledError。
+        """
+        if not self.is_available():
+            raise BrowserUnavailableError("未安装Playwright")
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(self._run_job(job, context_options or {}), self._loop)
+        unwatch = cancel_token.on_cancel(future.cancel) if cancel_token is not None else None
+        try:
+            return future.result(timeout)
+        except (FutureTimeoutError, TimeoutError):
+            # Python 3.10及以前concurrent.futures.TimeoutError不是内置TimeoutError
+            future.cancel()
+            raise
+        except CancelledError:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise OperationCancelledError(cancel_token.reason or "任务已取消") from None
+            raise
+        finally:
+            if unwatch is not None:
+                unwatch()
+
+    def health_check(self) -> dict:
+        browser = self._browser
+        return {
+            "thread_alive": bool(self._thread and self._thread.is_alive()),
+            "browser_connected": bool(browser and browser.is_connected()),
+            "restart_count": self.restart_count,
+            "max_pages": self.max_pages,
+        }
+
+    def stop(self, timeout: float = 10.0):
+        loop = self._loop
+        if not loop or not loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_browser(), loop).result(timeout)
+        except Exception as e:
+            logger.warning("关闭浏览器失败: %s", e)
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run_loop(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._browser_lock = asyncio.Lock()
+        self._page_slots = asyncio.Semaphore(self.max_pages)
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    async def _run_job(self, job, context_options: dict):
+        browser = await self._ensure_browser()
+        context = await browser.new_context(**context_options)
+        try:
+            return await job(context, self._page_slots)
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def _ensure_browser(self):
+        async with self._browser_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                logger.warning("浏览器已断开，正在重启")
+                self.restart_count += 1
+            await self._close_browser()
+            try:
+                self._browser = await asyncio.wait_for(self._launch_browser(), timeout=self.launch_timeout)
+            except Exception as e:
+                await self._close_browser()
+                raise BrowserUnavailableError(f"浏览器启动失败: {e}") from e
+            logger.info("无头浏览器已启动")
+            return self._browser
+
+    async def _launch_browser(self):
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        return await self._playwright.chromium.launch(headless=True)
+
+    async def _close_browser(self):
+        browser, self._browser = self._browser, None
+        playwright, self._playwright = self._playwright, None
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        if playwright is not None:
+            try:
+                await playwright.stop()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _log_warm_up_result(future):
+        try:
+            future.result()
+        except Exception as e:
+            logger.warning("浏览器预热失败: %s", e)
+
+
+_worker_lock = threading.Lock()
+_worker: BrowserWorker | None = None
+
+
+def get_browser_worker() -> BrowserWorker:
+    """进程共享的浏览器工作者（首次使用时创建）"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = BrowserWorker(max_pages=Config.SCREENSHOT_MAX_PAGES)
+            atexit.register(_worker.stop)
+        return _worker
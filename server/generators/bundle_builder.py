@@ -0,0 +1,69 @@
+"""下载包构建 - 一次生成ZIP并落盘，供下载接口直接发送"""
+import logging
+import os
+import threading
+import zipfile
+from pathlib import Path
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class BundleBuilder:
+    """把任务输出文件打成 OUTPUT_DIR/<task_id>/bundle.zip"""
+
+    BUNDLE_NAME = "bundle.zip"
+    # 本身已压缩的格式直接存储，避免重复deflate
+    STORED_SUFFIXES = {".docx", ".xlsx", ".pptx", ".zip", ".png", ".jpg", ".jpeg", ".gif", ".webp"}
+
+    # 按任务ID分段加锁，避免同一任务并发重复构建
+    _build_locks = [threading.Lock() for _ in range(16)]
+
+    def bundle_path(self, task_id: str) -> Path:
+        return Config.OUTPUT_DIR / task_id / self.BUNDLE_NAME
+
+    def build(self, task_id: str, output_files: dict) -> Path:
+        """生成下载包（原子替换），返回路径"""
+        path = self.bundle_path(task_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with zipfile.ZipFile(tmp_path, "w") as zf:
+                for filepath in self._source_files(output_files):
+                    compress_type = zipfile.ZIP_STORED if filepath.suffix.lower() in self.STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+                    zf.write(filepath, filepath.name, compress_type=compress_type)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return path
+
+    def ensure(self, task_id: str, output_files: dict) -> Path:
+        """返回最新的下载包；缺失或早于任一输出文件时重新构建（兼容旧任务）"""
+        path = self.bundle_path(task_id)
+        if self.is_fresh(path, output_files):
+            return path
+        with self._lock_for(task_id):
+            if self.is_fresh(path, output_files):
+                return path
+            logger.info("按需构建下载包: %s", task_id)
+            return self.build(task_id, output_files)
+
+    def is_fresh(self, path: Path, output_files: dict) -> bool:
+        try:
+            bundle_mtime = path.stat().st_mtime
+        except OSError:
+            return False
+        return all(filepath.stat().st_mtime <= bundle_mtime for filepath in self._source_files(output_files))
+
+    def _source_files(self, output_files: dict) -> list[Path]:
+        files = []
+        for filepath_str in output_files.values():
+            filepath = Path(filepath_str)
+            if filepath.exists() and filepath.name != self.BUNDLE_NAME:
+                files.append(filepath)
+        return files
+
+    @classmethod
+    def _lock_for(cls, task_id: str) -> threading.Lock:
+        return cls._build_locks[hash(task_id) % len(cls._build_locks)]
@@ -2,32 +2,97 @@
 import json
 import logging
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from ai.prompt_builder import build_code_prompt
+from ai.stream_json import StreamingFilesParser, loads_first_object, parse_files_prefix
 from config import BASE_DIR, Config
 from generators.code_checker import CodeChecker
 from generators.models import ProjectContext
+from generators.unit_checkpoint import UnitCheckpoint, unit_key
+from utils.artifact_store import get_artifact_store
+from utils.cancellation import OperationCancelledError, get_task_token
 
 logger = logging.getLogger(__name__)
 
 
+class _StreamedCodeWriter:
+    """流式接收的文件先行落盘并统计行数，最终落盘时跳过内容未变的文件"""
+
+    def __init__(self, base: Path):
+        self.base = base
+        self.written: dict[str, str] = {}
+        self.lines = 0
+        self._lock = threading.Lock()
+
+    def write(self, path: str, content: str):
+        out = self.base / path
+        # 并发生成的功能可能产出同一路径（如__init__.py），落盘与记录须一起完成，
+        # 否则磁盘内容可能与written不一致，而最终落盘会跳过"未变"的文件
+        with self._lock:
+            out.parent.mkdir(parents=True, exist_ok=True)
+            out.write_text(content, encoding="utf-8")
+            self.written[path] = content
+            self.lines += content.count("\n") + 1
+
+
 class CodeGenerator:
     def __init__(self):
         self.checker = CodeChecker()
         self.ai_client = None
+        self.concurrency = Config.CODE_GEN_CONCURRENCY
 
-    def generate(self, task_id: str, context: ProjectContext) -> dict[str, str]:
+    def generate(self, task_id: str, context: ProjectContext, cancel_token=None) -> dict[str, str]:
+        """cancel_token默认取任务的取消令牌；编排器传入步骤图级令牌，其他步骤失败时一并中止"""
         code: dict[str, str] = {}
+        writer = _StreamedCodeWriter(self._code_dir(task_id))
+        cancel_token = cancel_token or get_task_token(task_id)
+        # 每个功能的AI产出完成即记入子检查点，恢复时只补生成未完成的功能
+        # 子检查点只记录文件内容的哈希清单，内容存于共享产物存储
+        units = UnitCheckpoint(task_id, "code")
+        done_units = units.load()
+        store = get_artifact_store()
+        if done_units:
+            logger.info("[%s] 从子检查点恢复功能代码%s个", task_id, len(done_units))
+
+        def feature_files_for(feature, existing_files: list[str]) -> dict[str, str]:
+            key = unit_key(feature.name, feature.description, context.tech_stack_id)
+            if key in done_units:
+                files = store.get_texts(done_units[key])
+                if files is not None:
+                    return files
+            files = self._feature_files_by_ai(
+                context,
+                feature.name,
+                feature.description,
+                existing_files,
+                on_file=writer.write,
+                cancel_token=cancel_token,
+            )
+            # AI失败时不记录，恢复后重新请求而不是沿用兜底模板
+            if files:
+                units.record(key, store.put_texts(files))
+            return files
 
         code.update(self._base_files(context))
-        for feature in context.feature_list:
-            existing_files = list(code.keys())
-            feature_files = self._feature_files_by_ai(context, feature.name, feature.description, existing_files)
-            if not feature_files:
-                feature_files = self._feature_files(context, feature.name)
-            feature.code_files = list(feature_files.keys())
-            code.update(feature_files)
+        if self.concurrency > 1 and len(context.feature_list) > 1:
+            self._generate_features_concurrently(context, code, feature_files_for)
+        else:
+            for feature in context.feature_list:
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                # 子检查点恢复的文件未经已有文件过滤，同名路径保留先生成的功能
+                feature_files = {
+                    path: content
+                    for path, content in feature_files_for(feature, list(code.keys())).items()
+                    if path not in code
+                }
+                if not feature_files:
+                    feature_files = self._feature_files(context, feature.name)
+                feature.code_files = list(feature_files.keys())
+                code.update(feature_files)
 
         code = self._expand_to_target(code, context.target_lines)
 
@@ -35,9 +100,34 @@ class CodeGenerator:
         context.total_lines = stats.total_lines
         context.generated_code = code
 
-        self._persist_code(task_id, code)
+        if writer.written:
+            logger.info("AI代码流式落盘: 文件%s个，%s行", len(writer.written), writer.lines)
+        self._persist_code(task_id, code, writer.written)
         return code
 
+    def _generate_features_concurrently(self, context: ProjectContext, code: dict[str, str], feature_files_for):
+        """并发请求各功能代码，按功能顺序合并；提示词中的已有文件仅含基础骨架"""
+        base_files = list(code.keys())
+        if self.ai_client is None:
+            # 提前创建共享客户端，避免各线程重复懒加载
+            try:
+                from ai.ai_client import AIClient
+
+                self.ai_client = AIClient()
+            except Exception as e:
+                logger.warning("AI客户端初始化失败，功能代码将使用兜底模板: %s", e)
+        workers = min(self.concurrency, len(context.feature_list))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="code-gen") as executor:
+            results = list(executor.map(lambda f: feature_files_for(f, base_files), context.feature_list))
+
+        for feature, ai_files in zip(context.feature_list, results):
+            # 与串行模式一致：先生成的功能占用路径，后续功能的同名文件被丢弃
+            feature_files = {path: content for path, content in ai_files.items() if path not in code}
+            if not feature_files:
+                feature_files = self._feature_files(context, feature.name)
+            feature.code_files = list(feature_files.keys())
+            code.update(feature_files)
+
     def _base_files(self, context: ProjectContext) -> dict[str, str]:
         files = self._base_files_from_templates(context)
         if files:
@@ -138,41 +228,64 @@ class CodeGenerator:
         feature_name: str,
         feature_desc: str,
         existing_files: list[str],
+        on_file=None,
+        cancel_token=None,
     ) -> dict[str, str]:
+        """请求AI生成功能代码；on_file(path, content)在每个文件完整接收后立即回调"""
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
         logger.info("触发功能代码生成: feature=%s", feature_name)
         prompt = build_code_prompt(
             feature={"name": feature_name, "description": feature_desc},
             tech_stack=context.tech_config,
             existing_files=existing_files,
         )
+        existed = set(existing_files)
+        streamed: set[str] = set()
+
+        def handle_file(item: dict):
+            path, content = self._file_entry(item)
+            if on_file is None or not path or not content or path in existed or path in streamed:
+                return
+            streamed.add(path)
+            on_file(path, content)
+
         try:
             if self.ai_client is None:
                 from ai.ai_client import AIClient
 
                 self.ai_client = AIClient()
-            raw = self.ai_client.generate(prompt, max_retries=1)
+            raw = self.ai_client.generate(
+                prompt,
+                max_retries=1,
+                kind="code",
+                stream=StreamingFilesParser(on_file=handle_file),
+                cancel_token=cancel_token,
+            )
             return self._parse_ai_files(raw, existing_files)
+        except OperationCancelledError:
+            raise
         except Exception as e:
             logger.warning("AI功能代码生成失败，使用兜底模板: feature=%s, err=%s", feature_name, e)
             return {}
 
     def _parse_ai_files(self, raw: str, existing_files: list[str]) -> dict[str, str]:
-        text = raw.strip()
-        object_match = re.search(r"\{[\s\S]*\}", text)
-        if object_match:
-            text = object_match.group(0)
-        data = json.loads(text)
-        files = data.get("files", [])
+        try:
+            data = loads_first_object(raw)
+            files = data.get("files", []) if isinstance(data, dict) else []
+        except json.JSONDecodeError:
+            # 响应被截断时保留已完整的文件条目
+            files = parse_files_prefix(raw)
+            if not files:
+                raise
+            logger.warning("AI代码响应不完整，保留已完整接收的%s个文件", len(files))
         if not isinstance(files, list):
             return {}
 
         existed = set(existing_files)
         result: dict[str, str] = {}
         for item in files:
-            if not isinstance(item, dict):
-                continue
-            path = str(item.get("path", "")).strip().lstrip("./")
-            content = str(item.get("content", ""))
+            path, content = self._file_entry(item)
             if not path or not content:
                 continue
             if path in existed or path in result:
@@ -180,6 +293,12 @@ class CodeGenerator:
             result[path] = content
         return result
 
+    @staticmethod
+    def _file_entry(item) -> tuple[str, str]:
+        if not isinstance(item, dict):
+            return "", ""
+        return str(item.get("path", "")).strip().lstrip("./"), str(item.get("content", ""))
+
     def _expand_to_target(self, code: dict[str, str], target_lines: int) -> dict[str, str]:
         current = sum(c.count("\n") + 1 for c in code.values())
         min_lines = int(target_lines * 0.8)
@@ -213,9 +332,18 @@ class CodeGenerator:
             rendered = rendered.replace(f"{{{{{key}}}}}", str(value))
         return rendered
 
-    def _persist_code(self, task_id: str, generated_code: dict[str, str]):
-        base = Config.OUTPUT_DIR / task_id / "work" / "code"
+    def _code_dir(self, task_id: str) -> Path:
+        return Config.OUTPUT_DIR / task_id / "work" / "code"
+
+    def _persist_code(self, task_id: str, generated_code: dict[str, str], written: dict[str, str] | None = None):
+        base = self._code_dir(task_id)
+        written = written or {}
+        # 流式落盘后又被丢弃的文件（路径冲突、整体回退模板）
+        for path in written.keys() - generated_code.keys():
+            (base / path).unlink(missing_ok=True)
         for path, content in generated_code.items():
+            if written.get(path) == content:
+                continue
             out = base / path
             out.parent.mkdir(parents=True, exist_ok=True)
             out.write_text(content, encoding="utf-8")
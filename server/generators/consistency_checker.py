@@ -11,6 +11,11 @@ class ConsistencyReport:
     warnings: list[str] = field(default_factory=list)
     errors: list[str] = field(default_factory=list)
     score: int = 100
+    # 未通过规则涉及的功能名 {rule_id: [功能名]}，供质量重试只修复受影响的功能
+    feature_failures: dict[str, list[str]] = field(default_factory=dict)
+
+    def failed_features(self, rule_id: str) -> list[str]:
+        return list(self.feature_failures.get(rule_id, []))
 
 
 class ConsistencyChecker:
@@ -68,9 +73,9 @@ class ConsistencyChecker:
             if not feature.code_files:
                 self._add_check(report, "BASE-001", "warning", False, f"功能'{feature.name}'缺少对应代码")
             if feature.page_type and not feature.screenshot_path:
-                self._add_check(report, "BASE-002", "warning", False, f"功能'{feature.name}'缺少截图")
+                self._add_check(report, "BASE-002", "warning", False, f"功能'{feature.name}'缺少截图", [feature.name])
             if feature.screenshot_path and "placeholder" in feature.screenshot_path:
-                self._add_check(report, "BASE-003", "warning", False, f"功能'{feature.name}'使用了占位截图")
+                self._add_check(report, "BASE-003", "warning", False, f"功能'{feature.name}'使用了占位截图", [feature.name])
 
         min_lines = int(context.target_lines * 0.8)
         if context.total_lines < min_lines:
@@ -137,7 +142,7 @@ class ConsistencyChecker:
             self._add_check(report, "MAN-001", "error", False, "说明文档核心章节不完整")
 
         if missing:
-            self._add_check(report, "MAN-002", "error", False, f"主要功能截图缺失: {', '.join(missing)}")
+            self._add_check(report, "MAN-002", "error", False, f"主要功能截图缺失: {', '.join(missing)}", missing)
         else:
             self._add_check(report, "MAN-002", "error", True, "主要功能截图覆盖完整")
 
@@ -157,15 +162,17 @@ class ConsistencyChecker:
         manual_trace = context.doc_metrics.get("manual", {}).get("traceability", {})
         feature_to_files = source_trace.get("feature_to_files", {})
         missing_refs: list[str] = []
+        missing_names: list[str] = []
         for idx, feature in enumerate(context.feature_list, start=1):
             fid = feature.feature_id or f"F{idx:02d}"
             has_manual = bool(manual_trace.get(fid, {}).get("manual_section"))
             has_source = bool(feature_to_files.get(fid))
             if not (has_manual and has_source):
                 missing_refs.append(fid)
+                missing_names.append(feature.name)
 
         if missing_refs:
-            self._add_check(report, "TRACE-001", "error", False, f"功能点关联不完整: {', '.join(missing_refs)}")
+            self._add_check(report, "TRACE-001", "error", False, f"功能点关联不完整: {', '.join(missing_refs)}", missing_names)
         else:
             self._add_check(report, "TRACE-001", "error", True, "功能点关联完整（代码文档<->说明文档）")
 
@@ -205,31 +212,16 @@ class ConsistencyChecker:
 
     def _check_screenshot_artifacts(self, context: ProjectContext, report: ConsistencyReport):
         risk_items: list[str] = []
+        risk_features: list[str] = []
         for idx, feature in enumerate(context.feature_list, start=1):
             fid = feature.feature_id or f"F{idx:02d}"
-            shot = feature.screenshot_path or ""
-            if not shot:
-                continue
-            shot_path = Path(shot)
-            name_lc = shot_path.name.lower()
-            if "placeholder" in name_lc:
-                risk_items.append(f"{fid}:占位图")
-                continue
-            if not shot_path.exists():
-                risk_items.append(f"{fid}:文件不存在")
-                continue
-            try:
-                from PIL import Image
-
-                with Image.open(shot_path) as image:
-                    width, height = image.size
-                    if width < 360 or height < 640:
-                        risk_items.append(f"{fid}:分辨率过低({width}x{height})")
-            except Exception:
-                risk_items.append(f"{fid}:图片不可读")
+            risk = self._screenshot_risk(feature.screenshot_path or "")
+            if risk:
+                risk_items.append(f"{fid}:{risk}")
+                risk_features.append(feature.name)
 
         if risk_items:
-            self._add_check(report, "SHOT-001", "warning", False, f"截图存在潜在异常痕迹: {', '.join(risk_items[:8])}")
+            self._add_check(report, "SHOT-001", "warning", False, f"截图存在潜在异常痕迹: {', '.join(risk_items[:8])}", risk_features)
         else:
             self._add_check(report, "SHOT-001", "warning", True, "截图未发现明显异常痕迹")
 
@@ -241,6 +233,25 @@ class ConsistencyChecker:
         else:
             self._add_check(report, "SHOT-002", "warning", True, "截图平台识别结果可用")
 
+    def _screenshot_risk(self, shot: str) -> str:
+        if not shot:
+            return ""
+        shot_path = Path(shot)
+        if "placeholder" in shot_path.name.lower():
+            return "占位图"
+        if not shot_path.exists():
+            return "文件不存在"
+        try:
+            from PIL import Image
+
+            with Image.open(shot_path) as image:
+                width, height = image.size
+                if width < 360 or height < 640:
+                    return f"分辨率过低({width}x{height})"
+        except Exception:
+            return "图片不可读"
+        return ""
+
     def _build_suggestions(self, context: ProjectContext, report: ConsistencyReport) -> list[str]:
         suggestions: list[str] = []
         if any("截图缺失" in err for err in report.errors):
@@ -257,17 +268,29 @@ class ConsistencyChecker:
             suggestions.append("请根据错误项逐条修复后重试。")
         return suggestions
 
-    def _add_check(self, report: ConsistencyReport, rule_id: str, level: str, passed: bool, message: str):
-        report.checks.append(
-            {
-                "rule_id": rule_id,
-                "level": level,
-                "passed": passed,
-                "message": message,
-            }
-        )
+    def _add_check(
+        self,
+        report: ConsistencyReport,
+        rule_id: str,
+        level: str,
+        passed: bool,
+        message: str,
+        features: list[str] | None = None,
+    ):
+        check = {
+            "rule_id": rule_id,
+            "level": level,
+            "passed": passed,
+            "message": message,
+        }
+        if features:
+            check["features"] = list(features)
+        report.checks.append(check)
         if passed:
             return
+        if features:
+            failed = report.feature_failures.setdefault(rule_id, [])
+            failed.extend(name for name in features if name not in failed)
         if level == "error":
             report.errors.append(f"[{rule_id}] {message}")
         else:
@@ -0,0 +1,146 @@
+"""文档渲染服务 - 在独立进程中生成Word文档，绕开GIL并限制单文档耗时"""
+import atexit
+import logging
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from config import Config
+from generators.models import ProjectContext
+
+logger = logging.getLogger(__name__)
+
+
+class DocRenderTimeoutError(RuntimeError):
+    """单个文档渲染超时"""
+
+
+def _generator_for(kind: str):
+    if kind == "source":
+        from generators.source_doc_generator import SourceDocGenerator
+
+        return SourceDocGenerator()
+    if kind == "manual":
+        from generators.manual_doc_generator import ManualDocGenerator
+
+        return ManualDocGenerator()
+    if kind == "application":
+        from generators.application_doc_generator import ApplicationDocGenerator
+
+        return ApplicationDocGenerator()
+    raise ValueError(f"未知文档类型: {kind}")
+
+
+def render_document(kind: str, task_id: str, context_data: dict, output_dir: str) -> tuple[str, dict]:
+    """子进程入口：返回 (文档路径, 本次新增或变更的doc_metrics)"""
+    Config.OUTPUT_DIR = Path(output_dir)
+    context = ProjectContext.from_dict(context_data)
+    before = dict(context.doc_metrics)
+    path = _generator_for(kind).generate(task_id, context)
+    metrics = {k: v for k, v in context.doc_metrics.items() if before.get(k) != v}
+    return path, metrics
+
+
+class DocRenderService:
+    """进程池文档渲染
+
+    orchestrator传入序列化的上下文，子进程生成文档后回传路径和指标。
+    进程池只在应用启动时（业务线程启动前）fork创建；未启动、超时或进程池损坏后
+    不在多线程的API进程中重建，之后的文档改为当前线程渲染。
+    """
+
+    def __init__(self, workers: int = 2, timeout: float = 120.0):
+        self.workers = max(0, workers)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def enabled(self) -> bool:
+        # spawn方式会在子进程重新导入主模块（含全局TaskManager），仅在支持fork的平台启用
+        return self.workers > 0 and "fork" in multiprocessing.get_all_start_methods()
+
+    def start(self):
+        """创建工作进程（幂等）；须在业务线程启动前调用，避免fork继承其他线程持有的锁"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("fork"),
+            )
+            executor = self._executor
+        for _ in range(self.workers):
+            executor.submit(int)
+
+    def render(self, kind: str, task_id: str, context: ProjectContext, fallback_generator=None) -> str:
+        """生成指定文档并把doc_metrics写回context，返回文档路径"""
+        with self._lock:
+            executor = self._executor
+        if executor is None:
+            return self._render_in_thread(kind, task_id, context, fallback_generator)
+
+        try:
+            future = executor.submit(render_document, kind, task_id, context.to_dict(), str(Config.OUTPUT_DIR))
+        except Exception as e:
+            logger.warning("文档渲染进程池不可用，改为线程内生成[%s]: %s", kind, e)
+            self._discard_executor(executor)
+            return self._render_in_thread(kind, task_id, context, fallback_generator)
+
+        try:
+            path, metrics = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            logger.error("文档渲染超时[%s]，停用进程池", kind)
+            self._discard_executor(executor, terminate=True)
+            raise DocRenderTimeoutError(f"文档生成超时（{self.timeout:.0f}秒）")
+        except (BrokenProcessPool, pickle.PicklingError) as e:
+            logger.warning("文档渲染进程调用失败，改为线程内生成[%s]: %s", kind, e)
+            self._discard_executor(executor)
+            return self._render_in_thread(kind, task_id, context, fallback_generator)
+
+        context.doc_metrics.update(metrics)
+        return path
+
+    def shutdown(self):
+        self._discard_executor(self._executor, terminate=True)
+
+    def _render_in_thread(self, kind: str, task_id: str, context: ProjectContext, generator=None) -> str:
+        return (generator or _generator_for(kind)).generate(task_id, context)
+
+    def _discard_executor(self, executor: ProcessPoolExecutor | None, terminate: bool = False):
+        """停用出错的进程池，之后的文档在当前线程渲染"""
+        if executor is None:
+            return
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                logger.warning("文档渲染进程池已停用，后续文档改为线程内生成")
+        if terminate:
+            # ProcessPoolExecutor无法取消执行中的任务，只能结束子进程
+            for process in list((getattr(executor, "_processes", None) or {}).values()):
+                if process.is_alive():
+                    process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+_service_lock = threading.Lock()
+_service: DocRenderService | None = None
+
+
+def get_doc_render_service() -> DocRenderService:
+    """进程共享的文档渲染服务（首次使用时创建）"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = DocRenderService(
+                workers=Config.DOC_RENDER_WORKERS,
+                timeout=Config.DOC_RENDER_TIMEOUT_SECONDS,
+            )
+            atexit.register(_service.shutdown)
+        return _service
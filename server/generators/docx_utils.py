@@ -1,4 +1,9 @@
 """Word 文档公共工具。"""
+import re
+from xml.sax.saxutils import escape
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_INVALID_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
 
 
 def add_word_field(paragraph, field_name: str):
@@ -31,3 +36,51 @@ def apply_standard_header(doc, software_name: str, software_version: str):
         paragraph.add_run(f"{software_name} {software_version} 第")
         add_word_field(paragraph, "PAGE")
         paragraph.add_run("页")
+
+
+def ensure_paragraph_style(doc, style_name: str, font_name: str, font_size_pt: float) -> str:
+    """确保段落样式存在（字体、字号只定义一次），返回样式ID。"""
+    from docx.enum.style import WD_STYLE_TYPE
+    from docx.shared import Pt
+
+    styles = doc.styles
+    if style_name in [s.name for s in styles]:
+        return styles[style_name].style_id
+    style = styles.add_style(style_name, WD_STYLE_TYPE.PARAGRAPH)
+    style.base_style = styles["Normal"]
+    style.font.name = font_name
+    style.font.size = Pt(font_size_pt)
+    return style.style_id
+
+
+def paragraph_xml(text: str, style_id: str = "") -> str:
+    """构造单个段落的XML片段，制表符按Word规则转为<w:tab/>。"""
+    ppr = f'<w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>' if style_id else ""
+    if not text:
+        return f"<w:p>{ppr}</w:p>"
+    parts = []
+    for idx, chunk in enumerate(_INVALID_XML_CHARS.sub("", text).split("\t")):
+        if idx:
+            parts.append("<w:tab/>")
+        if chunk:
+            parts.append(f'<w:t xml:space="preserve">{escape(chunk)}</w:t>')
+    return f"<w:p>{ppr}<w:r>{''.join(parts)}</w:r></w:p>"
+
+
+PAGE_BREAK_XML = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+def append_body_xml(doc, fragments: list[str]):
+    """批量解析段落XML并追加到正文末尾（节属性之前）。"""
+    from docx.oxml import parse_xml
+
+    if not fragments:
+        return
+    container = parse_xml(f'<w:body xmlns:w="{W_NS}">{"".join(fragments)}</w:body>')
+    body = doc.element.body
+    anchor = body.sectPr
+    for element in list(container):
+        if anchor is not None:
+            anchor.addprevious(element)
+        else:
+            body.append(element)
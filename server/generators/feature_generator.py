@@ -5,6 +5,7 @@ import re
 
 from ai.prompt_builder import build_feature_prompt
 from generators.models import Feature
+from utils.cancellation import OperationCancelledError
 
 logger = logging.getLogger(__name__)
 
@@ -17,17 +18,19 @@ class FeatureGenerator:
     def __init__(self):
         self.ai_client = None
 
-    def generate(self, software_name: str, description: str) -> list[Feature]:
+    def generate(self, software_name: str, description: str, cancel_token=None) -> list[Feature]:
         prompt = self._build_prompt(software_name, description)
         try:
             if self.ai_client is None:
                 from ai.ai_client import AIClient
 
                 self.ai_client = AIClient()
-            raw = self.ai_client.generate(prompt)
+            raw = self.ai_client.generate(prompt, kind="features", cancel_token=cancel_token)
             features = self._parse_ai_result(raw)
             if features:
                 return features
+        except OperationCancelledError:
+            raise
         except Exception as e:
             logger.warning("AI生成功能清单失败，使用默认清单: %s", e)
         return self._default_features(description)
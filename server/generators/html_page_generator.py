@@ -1,26 +1,61 @@
 """HTML页面生成器"""
 import html
 import json
+import logging
 import re
 
-from ai.prompt_builder import build_page_prompt
+from ai.prompt_builder import build_page_batch_prompt, build_page_prompt
+from ai.stream_json import loads_first_object, parse_files_prefix
 from config import Config
 from generators.models import ProjectContext
+from generators.unit_checkpoint import UnitCheckpoint, unit_key
+from utils.cancellation import OperationCancelledError, get_task_token
+
+logger = logging.getLogger(__name__)
 
 
 class HtmlPageGenerator:
     def __init__(self):
         self.ai_client = None
+        self.batch_size = Config.PAGE_BATCH_SIZE
 
-    def generate(self, task_id: str, context: ProjectContext) -> dict[str, str]:
+    def generate(self, task_id: str, context: ProjectContext, cancel_token=None) -> dict[str, str]:
         output: dict[str, str] = {}
         base_dir = Config.OUTPUT_DIR / task_id / "work" / "html"
         base_dir.mkdir(parents=True, exist_ok=True)
 
+        cancel_token = cancel_token or get_task_token(task_id)
+        # 页面内容按功能记入子检查点，恢复时跳过已生成内容的功能
+        units = UnitCheckpoint(task_id, "page")
+        done_units = units.load()
+        keys = {
+            idx: unit_key(f.name, f.description, f.page_type)
+            for idx, f in enumerate(context.feature_list, start=1)
+        }
+        payloads = {idx: done_units[key] for idx, key in keys.items() if key in done_units}
+        if payloads:
+            logger.info("[%s] 从子检查点恢复页面内容%s个", task_id, len(payloads))
+
+        def record(batch: dict[int, dict]):
+            for idx, payload in batch.items():
+                units.record(keys[idx], payload)
+
+        pending = [(idx, f) for idx, f in enumerate(context.feature_list, start=1) if idx not in payloads]
+        if self.batch_size > 1 and pending:
+            payloads.update(self._build_page_payloads(pending, cancel_token, on_batch=record))
         for idx, feature in enumerate(context.feature_list, start=1):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
             filename = f"{idx:02d}_{self._slug(feature.name)}.html"
             path = base_dir / filename
-            page_payload = self._build_page_payload(feature.name, feature.description, feature.page_type)
+            page_payload = payloads.get(idx)
+            if page_payload is None:
+                page_payload = self._build_page_payload(
+                    feature.name, feature.description, feature.page_type, cancel_token=cancel_token
+                )
+                # 兜底内容不记录，恢复后重新请求
+                if page_payload != self._fallback_payload(feature.name, feature.description):
+                    record({idx: page_payload})
             html_page = self._build_page(
                 software_name=context.software_name,
                 page_type=feature.page_type,
@@ -47,26 +82,87 @@ class HtmlPageGenerator:
         rendered = rendered.replace("{{chart_summary}}", html.escape(str(payload.get("chart_summary", ""))))
         return rendered
 
-    def _build_page_payload(self, feature_name: str, feature_desc: str, page_type: str) -> dict:
+    def _build_page_payloads(self, numbered: list, cancel_token=None, on_batch=None) -> dict[int, dict]:
+        """按批合并请求 [(功能序号, 功能)] 的页面内容，返回 {功能序号: payload}
+
+        失败或缺失的功能不在结果中；on_batch(payloads)在每批返回后回调。
+        """
+        payloads: dict[int, dict] = {}
+        for start in range(0, len(numbered), self.batch_size):
+            batch = numbered[start:start + self.batch_size]
+            if len(batch) < 2:
+                continue
+            prompt = build_page_batch_prompt(
+                [
+                    {"key": str(idx), "name": f.name, "description": f.description, "page_type": f.page_type}
+                    for idx, f in batch
+                ]
+            )
+            try:
+                if self.ai_client is None:
+                    from ai.ai_client import AIClient
+
+                    self.ai_client = AIClient()
+                raw = self.ai_client.generate(prompt, max_retries=1, kind="page_batch", cancel_token=cancel_token)
+                parsed = self._parse_batch_payloads(raw, dict(batch))
+                payloads.update(parsed)
+                if on_batch is not None and parsed:
+                    on_batch(parsed)
+            except OperationCancelledError:
+                raise
+            except Exception as e:
+                logger.warning("批量生成页面内容失败，改为逐个功能请求: %s", e)
+        missing = len(numbered) - len(payloads)
+        if missing and payloads:
+            logger.info("批量页面内容缺少%s个功能，单独补请求", missing)
+        return payloads
+
+    def _parse_batch_payloads(self, raw: str, features: dict) -> dict[int, dict]:
+        try:
+            data = loads_first_object(raw)
+            items = data.get("pages", []) if isinstance(data, dict) else []
+        except json.JSONDecodeError:
+            # 响应被截断时保留已完整的页面
+            items = parse_files_prefix(raw, key="pages")
+        if not isinstance(items, list):
+            return {}
+
+        result: dict[int, dict] = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            try:
+                idx = int(str(item.get("key", "")).strip())
+            except ValueError:
+                continue
+            feature = features.get(idx)
+            if feature is None or idx in result:
+                continue
+            payload = {k: v for k, v in item.items() if k != "key"}
+            result[idx] = self._merge_payload(payload, feature.name, feature.description)
+        return result
+
+    def _build_page_payload(self, feature_name: str, feature_desc: str, page_type: str, cancel_token=None) -> dict:
         prompt = build_page_prompt(feature_name, feature_desc, page_type)
         try:
             if self.ai_client is None:
                 from ai.ai_client import AIClient
 
                 self.ai_client = AIClient()
-            raw = self.ai_client.generate(prompt, max_retries=1)
+            raw = self.ai_client.generate(prompt, max_retries=1, kind="page", cancel_token=cancel_token)
             return self._parse_payload(raw, feature_name, feature_desc)
+        except OperationCancelledError:
+            raise
         except Exception:
             return self._fallback_payload(feature_name, feature_desc)
 
     def _parse_payload(self, raw: str, feature_name: str, feature_desc: str) -> dict:
-        text = raw.strip()
-        match = re.search(r"\{[\s\S]*\}", text)
-        if match:
-            text = match.group(0)
-        data = json.loads(text)
+        data = loads_first_object(raw)
         if not isinstance(data, dict):
             return self._fallback_payload(feature_name, feature_desc)
+        return self._merge_payload(data, feature_name, feature_desc)
+
+    def _merge_payload(self, data: dict, feature_name: str, feature_desc: str) -> dict:
         fallback = self._fallback_payload(feature_name, feature_desc)
         fallback.update(data)
         return fallback
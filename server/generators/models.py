@@ -61,24 +61,25 @@ class ProjectContext:
     doc_metrics: dict = field(default_factory=dict)
 
     def to_dict(self) -> dict:
+        # 顶层字典浅拷贝，序列化期间其他线程写入新键不影响本次结果
         return {
             "software_name": self.software_name,
             "short_name": self.short_name,
             "description": self.description,
             "tech_stack_id": self.tech_stack_id,
             "software_version": self.software_version,
-            "tech_config": self.tech_config,
+            "tech_config": dict(self.tech_config),
             "target_lines": self.target_lines,
             "completion_date": self.completion_date,
             "copyright_owner": self.copyright_owner,
             "feature_list": [f.to_dict() if isinstance(f, Feature) else f for f in self.feature_list],
-            "generated_code": self.generated_code,
-            "generated_html_pages": self.generated_html_pages,
-            "screenshots": self.screenshots,
-            "output_files": self.output_files,
+            "generated_code": dict(self.generated_code),
+            "generated_html_pages": dict(self.generated_html_pages),
+            "screenshots": dict(self.screenshots),
+            "output_files": dict(self.output_files),
             "total_lines": self.total_lines,
             "feature_summary": self.feature_summary,
-            "doc_metrics": self.doc_metrics,
+            "doc_metrics": dict(self.doc_metrics),
         }
 
     def to_json(self) -> str:
@@ -1,17 +1,29 @@
 """生成编排器 - 核心协调模块"""
 import json
 import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
 
 from config import Config
 from generators.application_doc_generator import ApplicationDocGenerator
+from generators.bundle_builder import BundleBuilder
 from generators.code_generator import CodeGenerator
 from generators.consistency_checker import ConsistencyChecker
+from generators.doc_render_service import DocRenderTimeoutError, get_doc_render_service
 from generators.feature_generator import FeatureGenerator
 from generators.html_page_generator import HtmlPageGenerator
 from generators.manual_doc_generator import ManualDocGenerator
 from generators.models import ProjectContext
 from generators.screenshot_service import ScreenshotService
 from generators.source_doc_generator import SourceDocGenerator
+from generators.unit_checkpoint import UnitCheckpoint, file_digest, unit_key
+from utils.artifact_store import get_artifact_store
+from utils.cancellation import CancelToken, OperationCancelledError, get_task_token, link_cancel, token_for_task
+from utils.tracing import trace_span, write_trace
 
 logger = logging.getLogger(__name__)
 
@@ -24,14 +36,47 @@ class StepWarningError(Exception):
     """警告错误 - 当前步骤部分失败，但可以继续后续步骤"""
 
 
-class TaskCancelledError(Exception):
+class TaskCancelledError(OperationCancelledError):
     """任务被取消"""
 
 
+@dataclass(frozen=True)
+class StepNode:
+    """依赖图节点；step为其所属的七步视图编号"""
+
+    key: str
+    step: int
+    name: str
+    func: Callable
+    deps: tuple = ()
+
+
 class Orchestrator:
-    """七步生成流程编排器"""
+    """七步生成流程编排器
+
+    步骤按依赖图调度：依赖已满足的节点并发执行，检查点按节点记录，
+    进度仍以七步视图上报（当前步骤为最早未完成的步骤）。
+    """
     QUALITY_RETRY_LIMIT = 1
     RECOVERABLE_QUALITY_RULES = {"MAN-002", "MAN-000", "CODE-000"}
+    STEP_NAMES = {
+        1: "生成功能清单",
+        2: "生成源代码",
+        3: "生成HTML页面",
+        4: "页面截图",
+        5: "生成文档",
+        6: "文档规范检查",
+        7: "打包下载",
+    }
+    DOC_KEYS = ("source", "manual", "application")
+    # 可单独修改的功能字段 -> 直接受影响的节点，其下游节点一并重做
+    FEATURE_FIELD_NODES = {
+        "name": ("code", "html"),
+        "description": ("code", "html"),
+        "page_type": ("html",),
+        "operation_steps": ("doc_manual",),
+    }
+    FEATURE_FIELD_LIMITS = {"name": 30, "description": 120, "operation_steps": 300}
 
     def __init__(self, task_manager):
         self.task_manager = task_manager
@@ -43,8 +88,92 @@ class Orchestrator:
         self.manual_doc_generator = ManualDocGenerator()
         self.application_doc_generator = ApplicationDocGenerator()
         self.consistency_checker = ConsistencyChecker()
+        self.bundle_builder = BundleBuilder()
+        self.doc_render_service = get_doc_render_service()
+        self.max_parallel_steps = max(1, Config.ORCHESTRATOR_MAX_PARALLEL_STEPS)
+        self._state_lock = threading.RLock()
+        self._remaining: dict[int, set[str]] | None = None
+        self._started_steps: set[int] = set()
+        self._step_totals: dict[int, int] = {}
+        # 步骤图级取消令牌：任一节点失败时中止其他在途节点；随任务令牌一并取消
+        self._graph_token: CancelToken | None = None
+
+    def build_graph(self) -> list[StepNode]:
+        """步骤依赖图，列表顺序即串行执行时的顺序"""
+        return [
+            StepNode("features", 1, "生成功能清单", self._step1_generate_features),
+            StepNode("code", 2, "生成源代码", self._step2_generate_code, ("features",)),
+            StepNode("html", 3, "生成HTML页面", self._step3_generate_html, ("features",)),
+            StepNode("screenshots", 4, "页面截图", self._step4_take_screenshots, ("html",)),
+            StepNode("doc_source", 5, "源程序文档", self._step5_source_doc, ("code",)),
+            StepNode("doc_manual", 5, "操作手册", self._step5_manual_doc, ("code", "screenshots")),
+            StepNode("doc_application", 5, "申请表", self._step5_application_doc, ("code",)),
+            StepNode("quality", 6, "文档规范检查", self._step6_quality_gate, ("doc_source", "doc_manual", "doc_application")),
+            StepNode("package", 7, "打包下载", self._step7_package, ("quality",)),
+        ]
+
+    def update_feature(self, task_id: str, feature_id: str, changes: dict) -> tuple[ProjectContext, list[str]]:
+        """修改检查点中的单个功能并回退受影响的节点，返回 (新上下文, 需重做的节点)
+
+        未变化功能的代码、页面与截图经子检查点命中，重新执行时只重新生成被修改的功能。
+        任务或功能不存在时抛LookupError，字段不合法时抛ValueError。
+        """
+        checkpoint = self._load_checkpoint(task_id)
+        if not checkpoint.get("context"):
+            raise LookupError("任务检查点不存在，无法增量更新")
+        context = ProjectContext.from_dict(checkpoint["context"])
+        feature = next((f for f in context.feature_list if f.feature_id == feature_id), None)
+        if feature is None:
+            raise LookupError(f"功能不存在: {feature_id}")
+
+        changed = {}
+        for field, value in changes.items():
+            if field not in self.FEATURE_FIELD_NODES:
+                raise ValueError(f"不支持修改的字段: {field}")
+            value = str(value or "").strip()
+            if field == "page_type":
+                value = value.lower()
+                if value not in FeatureGenerator.PAGE_TYPES:
+                    raise ValueError(f"page_type必须为: {'/'.join(FeatureGenerator.PAGE_TYPES)}")
+            elif field in ("name", "description") and not value:
+                raise ValueError(f"{field}不能为空")
+            limit = self.FEATURE_FIELD_LIMITS.get(field)
+            if limit and len(value) > limit:
+                raise ValueError(f"{field}长度不能超过{limit}")
+            if value != getattr(feature, field):
+                changed[field] = value
+        if "name" in changed and any(f.name == changed["name"] for f in context.feature_list if f is not feature):
+            raise ValueError(f"功能名称重复: {changed['name']}")
+        if not changed:
+            return context, []
+
+        for field, value in changed.items():
+            setattr(feature, field, value)
+        context.feature_summary = "、".join(f.name for f in context.feature_list)
+
+        nodes = self.build_graph()
+        stale = {key for field in changed for key in self.FEATURE_FIELD_NODES[field]}
+        for node in nodes:
+            if stale & set(node.deps):
+                stale.add(node.key)
+        done = self._completed_nodes(checkpoint, nodes) - stale
+        self._save_checkpoint(task_id, nodes, done, context)
+        self._log(task_id, f"功能{feature_id}已修改({'、'.join(changed)})，待重做: {'、'.join(n.name for n in nodes if n.key in stale)}")
+        return context, [node.key for node in nodes if node.key in stale]
 
     def run(self, task_id: str, context: ProjectContext):
+        try:
+            with trace_span(task_id, "任务执行", "task"):
+                self._run(task_id, context)
+        finally:
+            # 成功、失败或取消都导出耗时追踪，与质量报告同目录
+            write_trace(task_id)
+
+    def _run(self, task_id: str, context: ProjectContext):
+        # 取消请求经令牌即时传到AI调用与截图，不必等当前步骤结束
+        cancel_token = token_for_task(task_id)
+        if self.task_manager.is_cancel_requested(task_id):
+            cancel_token.cancel()
         checkpoint = self._load_checkpoint(task_id)
         if checkpoint.get("context"):
             try:
@@ -52,51 +181,152 @@ class Orchestrator:
             except Exception:
                 pass
 
-        start_step = checkpoint.get("completed_step", 0) + 1
-        steps = [
-            (1, "生成功能清单", self._step1_generate_features),
-            (2, "生成源代码", self._step2_generate_code),
-            (3, "生成HTML页面", self._step3_generate_html),
-            (4, "页面截图", self._step4_take_screenshots),
-            (5, "生成文档", self._step5_generate_docs),
-            (6, "文档规范检查", self._step6_quality_gate),
-            (7, "打包下载", self._step7_package),
-        ]
-
-        for step_num, step_name, step_func in steps:
-            self._check_cancel(task_id, f"步骤{step_num}开始前收到取消请求")
-            if step_num < start_step:
+        nodes = self.build_graph()
+        done = self._completed_nodes(checkpoint, nodes)
+        self._remaining = {}
+        self._started_steps = set()
+        self._step_totals = {}
+        for node in nodes:
+            self._step_totals[node.step] = self._step_totals.get(node.step, 0) + 1
+            if node.key not in done:
+                self._remaining.setdefault(node.step, set()).add(node.key)
+        for step_num, step_name in self.STEP_NAMES.items():
+            if step_num not in self._remaining:
                 self._log(task_id, f"跳过已完成步骤: {step_name}")
-                continue
-
-            try:
-                self._update_progress(task_id, step_num, step_name, 5, f"开始步骤{step_num}: {step_name}")
-                step_func(task_id, context)
-                self._check_cancel(task_id, f"步骤{step_num}执行后收到取消请求")
-                self._save_checkpoint(task_id, step_num, context)
-                self._log(task_id, f"步骤{step_num}完成: {step_name}")
-            except TaskCancelledError as e:
-                self._log(task_id, f"任务取消: {e}")
-                self.task_manager.mark_cancelled(task_id, str(e))
+        for node in nodes:
+            if node.key in done and node.step in self._remaining:
+                self._log(task_id, f"跳过已完成节点: {node.name}")
+
+        failure = self._execute_graph(task_id, context, nodes, done)
+        if failure is not None:
+            node, error = failure
+            if isinstance(error, TaskCancelledError):
+                self._log(task_id, f"任务取消: {error}")
+                self.task_manager.mark_cancelled(task_id, str(error))
                 return
-            except StepFatalError as e:
-                self._log(task_id, f"步骤{step_num}致命错误: {e}")
-                self.task_manager.fail_task(task_id, f"步骤{step_num} {step_name} 失败: {e}")
-                raise
-            except StepWarningError as e:
-                self._log(task_id, f"步骤{step_num}部分失败: {e}")
-                self.task_manager.add_warning(task_id, str(e))
-                self._save_checkpoint(task_id, step_num, context)
-            except Exception as e:
-                self._log(task_id, f"步骤{step_num}未预期错误: {e}")
-                self.task_manager.fail_task(task_id, f"步骤{step_num} {step_name} 异常: {e}")
-                raise
+            step_name = self.STEP_NAMES[node.step]
+            if isinstance(error, StepFatalError):
+                self._log(task_id, f"步骤{node.step}致命错误: {error}")
+                self.task_manager.fail_task(task_id, f"步骤{node.step} {step_name} 失败: {error}")
+            else:
+                self._log(task_id, f"步骤{node.step}未预期错误: {error}")
+                self.task_manager.fail_task(task_id, f"步骤{node.step} {step_name} 异常: {error}")
+            raise error
 
         self._log(task_id, "所有步骤完成")
 
+    def _execute_graph(self, task_id: str, context: ProjectContext, nodes: list[StepNode], done: set[str]):
+        """执行依赖已满足的节点；出错后不再启动新节点并通知在途节点中止，等其结束后返回 (节点, 异常)"""
+        pending = [node for node in nodes if node.key not in done]
+        running = {}
+        failure = None
+        graph_token = CancelToken(task_id)
+        unlink = link_cancel(get_task_token(task_id), graph_token)
+        self._graph_token = graph_token
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_parallel_steps, thread_name_prefix="step") as executor:
+                while pending or running:
+                    if failure is None:
+                        for node in [n for n in pending if set(n.deps) <= done]:
+                            if len(running) >= self.max_parallel_steps:
+                                break
+                            if self.task_manager.is_cancel_requested(task_id):
+                                failure = (node, TaskCancelledError(f"步骤{node.step}开始前收到取消请求"))
+                                break
+                            pending.remove(node)
+                            self._on_node_start(task_id, node)
+                            running[executor.submit(self._run_node, task_id, context, node)] = node
+                    if not running:
+                        if failure is None and pending:
+                            failure = (pending[0], StepFatalError("步骤依赖无法满足"))
+                        break
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        node = running.pop(future)
+                        try:
+                            future.result()
+                        except StepWarningError as e:
+                            self._log(task_id, f"步骤{node.step}部分失败: {e}")
+                            self.task_manager.add_warning(task_id, str(e))
+                        except Exception as e:
+                            if failure is None or isinstance(failure[1], TaskCancelledError):
+                                failure = (node, e)
+                            if running and not graph_token.cancelled:
+                                # 在途节点（如截图）随即中止，不必等其完整执行后才结束任务
+                                self._log(task_id, f"步骤{node.step}失败，中止其他执行中的步骤")
+                                graph_token.cancel(f"步骤{node.step}失败")
+                            continue
+                        done.add(node.key)
+                        self._save_checkpoint(task_id, nodes, done, context)
+                        self._on_node_done(task_id, node)
+        finally:
+            unlink()
+            self._graph_token = None
+        return failure
+
+    def _run_node(self, task_id: str, context: ProjectContext, node: StepNode):
+        try:
+            with trace_span(task_id, node.name, "step", node=node.key, step=node.step):
+                node.func(task_id, context)
+        except TaskCancelledError:
+            raise
+        except OperationCancelledError as e:
+            raise TaskCancelledError(f"步骤{node.step}执行中收到取消请求") from e
+        self._check_cancel(task_id, f"步骤{node.step}执行后收到取消请求")
+
+    def _on_node_start(self, task_id: str, node: StepNode):
+        with self._state_lock:
+            first_start = node.step not in self._started_steps
+            self._started_steps.add(node.step)
+        if first_start:
+            step_name = self.STEP_NAMES[node.step]
+            self._update_progress(task_id, node.step, step_name, 5, f"开始步骤{node.step}: {step_name}")
+
+    def _on_node_done(self, task_id: str, node: StepNode):
+        with self._state_lock:
+            before = self._frontier_step()
+            remaining = self._remaining.get(node.step, set())
+            remaining.discard(node.key)
+            total = self._step_totals.get(node.step, 1)
+            finished_count = total - len(remaining)
+            if not remaining:
+                self._remaining.pop(node.step, None)
+            after = self._frontier_step()
+            frontier_started = after in self._started_steps
+
+        step_name = self.STEP_NAMES[node.step]
+        if total > 1:
+            self._log(task_id, f"步骤{node.step}子任务完成: {node.name}")
+            self._update_progress(task_id, node.step, step_name, finished_count * 100 // total, f"{node.name}完成（{finished_count}/{total}）")
+        if not remaining:
+            self._log(task_id, f"步骤{node.step}完成: {step_name}")
+        # 七步视图前移：补报已在后台完成的步骤，再切换到已在后台运行的步骤
+        for skipped in range(before + 1, min(after, len(self.STEP_NAMES) + 1)):
+            skipped_name = self.STEP_NAMES[skipped]
+            self._update_progress(task_id, skipped, skipped_name, 100, f"{skipped_name}已完成")
+        if after != before and after in self.STEP_NAMES and frontier_started:
+            next_name = self.STEP_NAMES[after]
+            self._update_progress(task_id, after, next_name, 5, f"开始步骤{after}: {next_name}")
+
+    def _frontier_step(self) -> int:
+        if not self._remaining:
+            return len(self.STEP_NAMES) + 1
+        return min(self._remaining)
+
+    def _completed_nodes(self, checkpoint: dict, nodes: list[StepNode]) -> set[str]:
+        keys = {node.key for node in nodes}
+        if "completed_nodes" in checkpoint:
+            return {key for key in checkpoint["completed_nodes"] if key in keys}
+        # 兼容旧检查点：只记录了最后完成的步骤号
+        completed_step = checkpoint.get("completed_step", 0)
+        return {node.key for node in nodes if node.step <= completed_step}
+
     def _step1_generate_features(self, task_id: str, context: ProjectContext):
         self._log(task_id, "正在分析项目需求，生成功能清单...")
-        context.feature_list = self.feature_generator.generate(context.software_name, context.description)
+        context.feature_list = self.feature_generator.generate(
+            context.software_name, context.description, cancel_token=self._cancel_token(task_id)
+        )
         for idx, feature in enumerate(context.feature_list, start=1):
             if not feature.feature_id:
                 feature.feature_id = f"F{idx:02d}"
@@ -107,35 +337,84 @@ class Orchestrator:
 
     def _step2_generate_code(self, task_id: str, context: ProjectContext):
         self._log(task_id, "正在生成源代码...")
-        generated_code = self.code_generator.generate(task_id, context)
+        generated_code = self.code_generator.generate(task_id, context, cancel_token=self._cancel_token(task_id))
         self._update_progress(task_id, 2, "生成源代码", 100, f"源代码生成完成，文件数: {len(generated_code)}，总行数: {context.total_lines}")
 
     def _step3_generate_html(self, task_id: str, context: ProjectContext):
         self._log(task_id, "正在生成HTML页面...")
-        html_files = self.html_generator.generate(task_id, context)
+        html_files = self.html_generator.generate(task_id, context, cancel_token=self._cancel_token(task_id))
         self._update_progress(task_id, 3, "生成HTML页面", 100, f"HTML页面生成完成，共{len(html_files)}个页面")
 
     def _step4_take_screenshots(self, task_id: str, context: ProjectContext):
         self._log(task_id, "正在截图...")
-        shots = self.screenshot_service.take_screenshots(task_id, context.generated_html_pages)
+        html_pages = context.generated_html_pages
+        done_units, keys, record = self._screenshot_units(task_id, html_pages)
+        shots = {
+            name: done_units[key]
+            for name, key in keys.items()
+            if key in done_units and Path(str(done_units[key])).exists()
+        }
+        if shots:
+            self._log(task_id, f"从子检查点恢复截图{len(shots)}张")
+
+        pending = {name: path for name, path in html_pages.items() if name not in shots}
+        if pending:
+            shots.update(
+                self.screenshot_service.take_screenshots(
+                    task_id, pending, on_page=record, cancel_token=self._cancel_token(task_id)
+                )
+            )
+        shots = {name: shots[name] for name in html_pages if name in shots}
         context.screenshots = shots
         for feature in context.feature_list:
             feature.screenshot_path = shots.get(feature.name, "")
         self._update_progress(task_id, 4, "页面截图", 100, f"截图完成，共{len(shots)}张")
 
-    def _step5_generate_docs(self, task_id: str, context: ProjectContext):
-        self._log(task_id, "正在生成Word文档...")
+    def _screenshot_units(self, task_id: str, html_pages: dict[str, str]):
+        """截图子检查点：返回 (已完成单元, {页面名: 单元键}, 按页记录真实截图的回调)
 
-        source_path = self.source_doc_generator.generate(task_id, context)
-        manual_path = self.manual_doc_generator.generate(task_id, context)
-        app_path = self.application_doc_generator.generate(task_id, context)
+        以页面内容摘要为键：页面重新生成后旧截图自动失效。
+        """
+        units = UnitCheckpoint(task_id, "screenshot")
+        keys = {name: unit_key(name, file_digest(path)) for name, path in html_pages.items()}
 
-        context.output_files = {
-            "source": source_path,
-            "manual": manual_path,
-            "application": app_path,
-        }
-        self._update_progress(task_id, 5, "生成文档", 100, "三份文档生成完成")
+        def record(name: str, path: str):
+            if name in keys and not self.screenshot_service.is_placeholder(path):
+                units.record(keys[name], path)
+
+        return units.load(), keys, record
+
+    def _step5_source_doc(self, task_id: str, context: ProjectContext):
+        self._log(task_id, "正在生成源程序文档...")
+        self._set_output_file(context, "source", self._render_document(task_id, context, "source", self.source_doc_generator))
+
+    def _step5_manual_doc(self, task_id: str, context: ProjectContext):
+        self._log(task_id, "正在生成操作手册...")
+        self._set_output_file(context, "manual", self._render_document(task_id, context, "manual", self.manual_doc_generator))
+
+    def _step5_application_doc(self, task_id: str, context: ProjectContext):
+        self._log(task_id, "正在生成申请表...")
+        self._set_output_file(
+            context,
+            "application",
+            self._render_document(task_id, context, "application", self.application_doc_generator),
+        )
+
+    def _render_document(self, task_id: str, context: ProjectContext, kind: str, generator) -> str:
+        try:
+            with trace_span(task_id, f"文档生成:{kind}", "doc", kind=kind):
+                return self.doc_render_service.render(kind, task_id, context, generator)
+        except DocRenderTimeoutError as e:
+            raise StepFatalError(str(e)) from e
+
+    def _set_output_file(self, context: ProjectContext, key: str, path: str):
+        """并发节点写入输出文件；整体替换字典并保持三份文档的固定顺序"""
+        with self._state_lock:
+            files = dict(context.output_files)
+            files[key] = path
+            ordered = {k: files[k] for k in self.DOC_KEYS if k in files}
+            ordered.update((k, v) for k, v in files.items() if k not in ordered)
+            context.output_files = ordered
 
     def _step6_quality_gate(self, task_id: str, context: ProjectContext):
         self._log(task_id, "执行文档规范检查...")
@@ -145,7 +424,7 @@ class Orchestrator:
             if self._can_retry_quality_gate(rule_ids):
                 self._log(task_id, f"质量检查未通过，触发自动重试1次。规则: {', '.join(sorted(rule_ids))}")
                 self._update_progress(task_id, 6, "文档规范检查", 60, "首次检查未通过，正在自动重试...")
-                self._run_quality_remediation(task_id, context, rule_ids)
+                self._run_quality_remediation(task_id, context, rule_ids, report)
                 report = self.consistency_checker.check(context)
 
         for warning in report.warnings:
@@ -171,32 +450,82 @@ class Orchestrator:
         output_files = context.output_files
         if not output_files:
             raise StepFatalError("未生成可下载文件")
+        try:
+            bundle = self.bundle_builder.build(task_id, output_files)
+            self._log(task_id, f"下载包已生成: {bundle.name}")
+        except Exception as e:
+            # 下载接口会按需重建，不影响任务完成
+            self._log(task_id, f"下载包生成失败，将在下载时重试: {e}")
         self._update_progress(task_id, 7, "打包下载", 100, "打包完成")
         self.task_manager.complete_task(task_id, output_files)
 
     def _update_progress(self, task_id: str, step: int, name: str, progress=0, message=""):
         msg = message or f"正在执行: {name}"
+        with self._state_lock:
+            # 后续步骤提前并发执行时，其进度暂不上报，避免七步视图来回跳动
+            if self._remaining is not None and step > self._frontier_step():
+                logger.info("[%s] 步骤%s进度(后台): %s", task_id, step, msg)
+                return
         self.task_manager.update_progress(task_id, step, name, progress, msg)
 
     def _log(self, task_id: str, message: str):
         logger.info("[%s] %s", task_id, message)
         self.task_manager.add_log(task_id, message)
 
-    def _save_checkpoint(self, task_id: str, step: int, context: ProjectContext):
+    def _save_checkpoint(self, task_id: str, nodes: list[StepNode], done: set[str], context: ProjectContext):
         checkpoint_dir = Config.TASK_DATA_DIR / "checkpoints"
         checkpoint_dir.mkdir(parents=True, exist_ok=True)
-        checkpoint = {"completed_step": step, "context": context.to_dict()}
+        completed_step = 0
+        for step_num in sorted(self.STEP_NAMES):
+            if any(node.step == step_num and node.key not in done for node in nodes):
+                break
+            completed_step = step_num
+        with self._state_lock:
+            data = context.to_dict()
+        # 代码与产出文件写入内容寻址存储，检查点只保存哈希清单
+        store = get_artifact_store()
+        code = data.pop("generated_code", {})
+        files = [*data["generated_html_pages"].values(), *data["screenshots"].values(), *data["output_files"].values()]
+        checkpoint = {
+            "completed_step": completed_step,
+            "completed_nodes": [node.key for node in nodes if node.key in done],
+            "context": data,
+            "artifacts": {
+                "generated_code": store.put_texts(code),
+                "files": store.put_files(dict.fromkeys(files)),
+            },
+        }
         filepath = checkpoint_dir / f"{task_id}_checkpoint.json"
-        filepath.write_text(json.dumps(checkpoint, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp = filepath.with_suffix(".tmp")
+        tmp.write_text(json.dumps(checkpoint, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, filepath)
 
     def _load_checkpoint(self, task_id: str) -> dict:
         filepath = Config.TASK_DATA_DIR / "checkpoints" / f"{task_id}_checkpoint.json"
-        if filepath.exists():
-            try:
-                return json.loads(filepath.read_text(encoding="utf-8"))
-            except Exception:
-                pass
-        return {}
+        if not filepath.exists():
+            return {}
+        try:
+            checkpoint = json.loads(filepath.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+        artifacts = checkpoint.pop("artifacts", None)
+        if artifacts is None or not checkpoint.get("context"):
+            # 旧检查点：上下文中直接内嵌了全部代码
+            return checkpoint
+        store = get_artifact_store()
+        code = store.get_texts(artifacts.get("generated_code", {}))
+        if code is None:
+            logger.warning("[%s] 检查点引用的代码产物缺失，从头执行", task_id)
+            return {}
+        checkpoint["context"]["generated_code"] = code
+        restored = store.restore_files(artifacts.get("files", {}))
+        if restored:
+            logger.info("[%s] 从产物存储还原文件%s个", task_id, restored)
+        return checkpoint
+
+    def _cancel_token(self, task_id: str) -> CancelToken | None:
+        """步骤内使用的取消令牌：执行步骤图时为图级令牌，否则为任务令牌"""
+        return self._graph_token or get_task_token(task_id)
 
     def _check_cancel(self, task_id: str, message: str):
         if self.task_manager.is_cancel_requested(task_id):
@@ -224,15 +553,26 @@ class Orchestrator:
             return False
         return rule_ids.issubset(self.RECOVERABLE_QUALITY_RULES)
 
-    def _run_quality_remediation(self, task_id: str, context: ProjectContext, rule_ids: set[str]):
+    def _run_quality_remediation(self, task_id: str, context: ProjectContext, rule_ids: set[str], report=None):
         if "MAN-002" in rule_ids and context.generated_html_pages:
-            self._log(task_id, "执行重试修复：重新截图并刷新说明文档。")
-            shots = self.screenshot_service.take_screenshots(task_id, context.generated_html_pages)
-            context.screenshots = shots
-            for feature in context.feature_list:
-                feature.screenshot_path = shots.get(feature.name, feature.screenshot_path)
-            manual_path = self.manual_doc_generator.generate(task_id, context)
-            context.output_files["manual"] = manual_path
+            # 只重截缺图的功能页面；报告未给出功能明细时退回全部页面
+            failed = report.failed_features("MAN-002") if report is not None else []
+            pages = {name: path for name, path in context.generated_html_pages.items() if name in failed}
+            if not failed:
+                pages = dict(context.generated_html_pages)
+            if pages:
+                self._log(task_id, f"执行重试修复：重新截图{len(pages)}个页面并刷新说明文档。")
+                _, _, record = self._screenshot_units(task_id, pages)
+                shots = self.screenshot_service.take_screenshots(
+                    task_id, pages, on_page=record, cancel_token=self._cancel_token(task_id)
+                )
+                context.screenshots = {**context.screenshots, **shots}
+                for feature in context.feature_list:
+                    feature.screenshot_path = shots.get(feature.name, feature.screenshot_path)
+            else:
+                self._log(task_id, "执行重试修复：缺图功能无对应页面，仅刷新说明文档。")
+            # 说明文档由上下文在本进程内直接排版，不涉及AI调用，整体重建即可
+            context.output_files["manual"] = self.manual_doc_generator.generate(task_id, context)
 
         if "MAN-000" in rule_ids:
             self._log(task_id, "执行重试修复：重建说明文档。")
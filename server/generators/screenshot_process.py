@@ -0,0 +1,268 @@
+"""独立截图进程 - 子进程持有唯一的事件循环与浏览器，经本地队列接收截图任务"""
+import atexit
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from config import Config
+from utils.cancellation import CancelToken, OperationCancelledError
+
+logger = logging.getLogger(__name__)
+
+
+class ScreenshotProcessError(RuntimeError):
+    """截图进程不可用或任务执行失败"""
+
+
+def _worker_main(request_queue, result_queue, settings: dict):
+    """子进程入口：逐条读取 (job_id, task_id, html_files) 或 ("cancel", job_id)，按页回传结果"""
+    from generators.browser_pool import BrowserWorker
+    from generators.screenshot_service import ScreenshotService
+
+    Config.SCREENSHOT_DIR = Path(settings["screenshot_dir"])
+    browser = BrowserWorker(max_pages=settings["max_pages"])
+    service = ScreenshotService(
+        browser_worker=browser,
+        page_concurrency=settings["page_concurrency"],
+        worker_mode="thread",
+    )
+    if settings.get("warm_start"):
+        browser.warm_up()
+
+    tokens: dict[str, CancelToken] = {}
+
+    def run_job(job_id: str, task_id: str, html_files: dict):
+        try:
+            shots = service.take_screenshots(
+                task_id,
+                html_files,
+                on_page=lambda name, path: result_queue.put((job_id, "page", name, path)),
+                cancel_token=tokens[job_id],
+            )
+            result_queue.put((job_id, "done", shots))
+        except Exception as e:
+            result_queue.put((job_id, "error", str(e)))
+        finally:
+            tokens.pop(job_id, None)
+
+    with ThreadPoolExecutor(max_workers=settings["max_jobs"], thread_name_prefix="shot-job") as executor:
+        while True:
+            message = request_queue.get()
+            if message is None:
+                break
+            if message[0] == "cancel":
+                token = tokens.get(message[1])
+                if token is not None:
+                    token.cancel()
+                continue
+            tokens[message[0]] = CancelToken()
+            executor.submit(run_job, *message)
+    browser.stop()
+
+
+class ScreenshotProcessWorker:
+    """主进程侧的截图进程客户端
+
+    capture() 可在任意线程并发调用；结果由读取线程按job_id分发，读取线程在首次提交任务时启动，
+    使start()不在主进程留下线程，随后创建的文档渲染进程池同样在单线程状态下fork。
+    子进程只在应用启动时（业务线程启动前）fork一次；退出后在途任务立即失败，
+    运行期间不再从多线程的API进程中重新fork，调用方改用进程内截图。
+    """
+
+    def __init__(self, max_pages: int = 4, page_concurrency: int = 4, max_jobs: int = 4):
+        self.settings = {
+            "max_pages": max(1, max_pages),
+            "page_concurrency": max(1, page_concurrency),
+            "max_jobs": max(1, max_jobs),
+            "screenshot_dir": str(Config.SCREENSHOT_DIR),
+            "warm_start": Config.SCREENSHOT_WARM_START,
+        }
+        self._lock = threading.Lock()
+        self._process = None
+        self._requests = None
+        self._results = None
+        self._jobs: dict[str, queue.Queue] = {}
+        self._dispatcher: threading.Thread | None = None
+        self.exited = False
+
+    @staticmethod
+    def is_available() -> bool:
+        # spawn会在子进程重新导入主模块（含全局TaskManager），仅在支持fork的平台使用
+        return "fork" in multiprocessing.get_all_start_methods()
+
+    def start(self):
+        """启动截图进程（幂等）；须在任何后台线程（含文档渲染进程池）启动前调用"""
+        if not self.is_available():
+            raise ScreenshotProcessError("当前平台不支持fork，无法启动截图进程")
+        with self._lock:
+            if self._process is not None or self.exited:
+                return
+
+            ctx = multiprocessing.get_context("fork")
+            self._requests = ctx.Queue()
+            self._results = ctx.Queue()
+            self._process = ctx.Process(
+                target=_worker_main,
+                args=(self._requests, self._results, self.settings),
+                daemon=True,
+                name="screenshot-worker",
+            )
+            self._process.start()
+            logger.info("截图进程已启动: pid=%s", self._process.pid)
+
+    def is_running(self) -> bool:
+        """子进程是否可接收任务；发现子进程已退出时废弃其队列并使在途任务失败"""
+        with self._lock:
+            if self._process is None:
+                return False
+            if self._process.is_alive():
+                return True
+            logger.warning("截图进程已退出(exitcode=%s)，后续截图改为进程内执行", self._process.exitcode)
+            self.exited = True
+            self._process = None
+            self._fail_pending_jobs("截图进程异常退出")
+            self._retire_queues()
+            return False
+
+    def capture(
+        self, task_id: str, html_files: dict[str, str], timeout: float, on_page=None, cancel_token=None
+    ) -> dict[str, str]:
+        """提交截图任务并等待完成；on_page(name, path) 随页面完成逐个回调
+
+        cancel_token取消时立即返回（抛出OperationCancelledError），并通知子进程中止该任务。
+        子进程未启动或已退出时抛出ScreenshotProcessError。
+        """
+        if not self.is_running():
+            raise ScreenshotProcessError("截图进程未运行")
+        job_id = uuid.uuid4().hex
+        inbox: queue.Queue = queue.Queue()
+        with self._lock:
+            if self._process is None:
+                raise ScreenshotProcessError("截图进程未运行")
+            self._ensure_dispatcher()
+            self._jobs[job_id] = inbox
+            requests, process = self._requests, self._process
+        unwatch = None
+        if cancel_token is not None:
+            unwatch = cancel_token.on_cancel(lambda: inbox.put(("cancelled", cancel_token.reason)))
+        try:
+            requests.put((job_id, task_id, dict(html_files)))
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"截图进程超时（{timeout:.0f}秒）")
+                try:
+                    kind, *payload = inbox.get(timeout=min(remaining, 1.0))
+                except queue.Empty:
+                    if not process.is_alive():
+                        self.is_running()
+                        raise ScreenshotProcessError("截图进程异常退出")
+                    continue
+                if kind == "page":
+                    if on_page:
+                        on_page(*payload)
+                elif kind == "done":
+                    return payload[0]
+                elif kind == "cancelled":
+                    self._cancel_job(requests, job_id)
+                    raise OperationCancelledError(payload[0] or "任务已取消")
+                else:
+                    raise ScreenshotProcessError(payload[0])
+        finally:
+            if unwatch is not None:
+                unwatch()
+            with self._lock:
+                self._jobs.pop(job_id, None)
+
+    @staticmethod
+    def _cancel_job(requests, job_id: str):
+        try:
+            requests.put(("cancel", job_id))
+        except Exception as e:
+            logger.debug("通知截图进程取消任务失败: %s", e)
+
+    def health_check(self) -> dict:
+        process = self._process
+        return {
+            "process_alive": bool(process and process.is_alive()),
+            "pid": process.pid if process else None,
+            "pending_jobs": len(self._jobs),
+            "exited": self.exited,
+        }
+
+    def stop(self, timeout: float = 10.0):
+        with self._lock:
+            process, requests = self._process, self._requests
+            self._process = None
+            self._fail_pending_jobs("截图进程已停止")
+            if process is None:
+                return
+            self._retire_queues()
+        try:
+            requests.put(None)
+            process.join(timeout)
+        except Exception:
+            pass
+        if process.is_alive():
+            process.terminate()
+
+    def _retire_queues(self):
+        """废弃当前队列：子进程被杀时可能持有队列内部锁，不能再向其写入或等待其刷新"""
+        for q in (self._requests, self._results):
+            if q is not None:
+                q.cancel_join_thread()
+        self._results = None
+
+    def _ensure_dispatcher(self):
+        """启动结果读取线程（调用方持有self._lock）"""
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_results,
+                args=(self._results,),
+                daemon=True,
+                name="screenshot-results",
+            )
+            self._dispatcher.start()
+
+    def _dispatch_results(self, results):
+        # 轮询读取，队列被废弃（进程退出或停止）后退出
+        while results is self._results:
+            try:
+                message = results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            job_id, *payload = message
+            with self._lock:
+                inbox = self._jobs.get(job_id)
+            if inbox is not None:
+                inbox.put(tuple(payload))
+
+    def _fail_pending_jobs(self, reason: str):
+        for inbox in self._jobs.values():
+            inbox.put(("error", reason))
+
+
+_worker_lock = threading.Lock()
+_worker: ScreenshotProcessWorker | None = None
+
+
+def get_screenshot_process_worker() -> ScreenshotProcessWorker:
+    """进程共享的截图进程客户端（首次使用时创建）"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = ScreenshotProcessWorker(
+                max_pages=Config.SCREENSHOT_MAX_PAGES,
+                page_concurrency=Config.SCREENSHOT_PAGE_CONCURRENCY,
+                max_jobs=Config.MAX_CONCURRENT_TASKS,
+            )
+            atexit.register(_worker.stop)
+        return _worker
@@ -1,53 +1,216 @@
 """截图服务 - Playwright优先，失败降级占位图"""
 import asyncio
 import logging
+import time
 from pathlib import Path
 
 from config import Config
+from generators.browser_pool import BrowserWorker, get_browser_worker
+from utils.cancellation import OperationCancelledError, get_task_token
+from utils.tracing import get_tracer
 
 logger = logging.getLogger(__name__)
 
 
 class ScreenshotService:
     VIEWPORT = {"width": 1280, "height": 800}
+    PAGE_TIMEOUT_MS = 15000
 
-    def take_screenshots(self, task_id: str, html_files: dict[str, str]) -> dict[str, str]:
+    def __init__(
+        self,
+        browser_worker: BrowserWorker | None = None,
+        page_concurrency: int | None = None,
+        worker_mode: str | None = None,
+    ):
+        self._browser_worker = browser_worker
+        self.page_concurrency = max(1, page_concurrency or Config.SCREENSHOT_PAGE_CONCURRENCY)
+        # thread: 本进程内的常驻浏览器线程；process: 独立截图进程（浏览器崩溃不影响API进程）
+        self.worker_mode = (worker_mode or Config.SCREENSHOT_WORKER_MODE).lower()
+
+    @property
+    def browser_worker(self) -> BrowserWorker:
+        return self._browser_worker or get_browser_worker()
+
+    def take_screenshots(
+        self, task_id: str, html_files: dict[str, str], on_page=None, cancel_token=None
+    ) -> dict[str, str]:
+        """截图并返回 {页面名: 图片路径}；on_page(name, path) 在每页完成时回调
+
+        cancel_token默认取任务的取消令牌；取消时中止在途页面并抛出OperationCancelledError。
+        """
+        if not html_files:
+            return {}
+        cancel_token = cancel_token or get_task_token(task_id)
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        if self.worker_mode == "process":
+            return self._take_in_process(task_id, html_files, on_page, cancel_token)
+        return self._take_in_thread(task_id, html_files, on_page, cancel_token)
+
+    def _take_in_thread(
+        self, task_id: str, html_files: dict[str, str], on_page=None, cancel_token=None
+    ) -> dict[str, str]:
+        worker = self.browser_worker
+        if not worker.is_available():
+            return {name: self._create_placeholder_image(task_id, name) for name in html_files}
+        received: dict[str, str] = {}
+
+        def collect(name: str, path: str):
+            received[name] = path
+            if on_page:
+                on_page(name, path)
+
+        # 超时在事件循环内从获得全局页面名额起计，等待名额的任务不会超时
+        timeout = self._capture_timeout(len(html_files))
         try:
-            return asyncio.run(self._take_screenshots(task_id, html_files))
+            return worker.submit(
+                lambda context, page_slots: self._capture_pages(
+                    task_id, html_files, context, page_slots, collect, timeout=timeout
+                ),
+                context_options={"viewport": self.VIEWPORT},
+                cancel_token=cancel_token,
+            )
+        except OperationCancelledError:
+            raise
         except Exception as e:
-            logger.warning("截图服务降级为占位图: %s", e)
-            return {name: self._create_placeholder_image(task_id, name) for name in html_files}
+            logger.warning("截图任务失败，已完成%s页，其余降级为占位图: %s", len(received), e)
+        # 保留已完成的页面，步骤4与质量重试只需补截缺失的页面
+        return {name: received.get(name) or self._create_placeholder_image(task_id, name) for name in html_files}
+
+    def _take_in_process(
+        self, task_id: str, html_files: dict[str, str], on_page=None, cancel_token=None
+    ) -> dict[str, str]:
+        from generators.screenshot_process import ScreenshotProcessError, get_screenshot_process_worker
+
+        process_worker = get_screenshot_process_worker()
+        if not process_worker.is_running():
+            # 子进程退出后不在多线程的API进程中重新fork，改用进程内浏览器线程
+            return self._take_in_thread(task_id, html_files, on_page, cancel_token)
+
+        received: dict[str, str] = {}
+        tracer = get_tracer(task_id)
+        last_done = time.perf_counter()
+
+        def collect(name: str, path: str):
+            nonlocal last_done
+            received[name] = path
+            if tracer is not None:
+                # 截图进程只回传完成时间，区间取自上一页完成时刻
+                now = time.perf_counter()
+                tracer.add_span(
+                    f"截图:{name}", "screenshot", last_done, now, page=name, mode="process",
+                    placeholder=self.is_placeholder(path),
+                )
+                last_done = now
+            if on_page:
+                on_page(name, path)
 
-    async def _take_screenshots(self, task_id: str, html_files: dict[str, str]) -> dict[str, str]:
         try:
-            from playwright.async_api import async_playwright
-        except Exception:
-            return {name: self._create_placeholder_image(task_id, name) for name in html_files}
+            received.update(
+                process_worker.capture(
+                    task_id,
+                    html_files,
+                    timeout=self._job_timeout(len(html_files)),
+                    on_page=collect,
+                    cancel_token=cancel_token,
+                )
+            )
+        except OperationCancelledError:
+            raise
+        except ScreenshotProcessError as e:
+            if process_worker.is_running():
+                logger.warning("截图进程任务失败，未完成页面降级为占位图: %s", e)
+            else:
+                # 进程退出：保留已回传的页面，其余改为进程内截图
+                logger.warning("截图进程已退出，未完成页面改为进程内截图: %s", e)
+                missing = {name: path for name, path in html_files.items() if name not in received}
+                if missing:
+                    received.update(self._take_in_thread(task_id, missing, on_page, cancel_token))
+        except Exception as e:
+            logger.warning("截图进程执行失败，未完成页面降级为占位图: %s", e)
+        # 超时时保留已回传的页面
+        return {name: received.get(name) or self._create_placeholder_image(task_id, name) for name in html_files}
+
+    async def _capture_pages(
+        self, task_id: str, html_files: dict[str, str], context, page_slots, on_page=None, timeout: float | None = None
+    ) -> dict[str, str]:
+        """同一任务的页面并发截图；task_slots限制单任务并发，page_slots限制全局页面数
+
+        timeout从首个页面获得全局名额时起计，超时抛出TimeoutError（已完成页面已经on_page回传）。
+        """
+        task_slots = asyncio.Semaphore(self.page_concurrency)
+        tracer = get_tracer(task_id)
+        slot_acquired = asyncio.Event()
 
-        results: dict[str, str] = {}
-        async with async_playwright() as p:
-            browser = None
+        async def capture(name: str, html_path: str) -> str:
+            queued = time.perf_counter()
+            async with task_slots, page_slots:
+                slot_acquired.set()
+                started = time.perf_counter()
+                path = await self._capture_page(task_id, name, html_path, context)
+            if tracer is not None:
+                # 同一浏览器线程上的页面并发执行，按异步事件记录
+                tracer.add_span(
+                    f"截图:{name}",
+                    "screenshot",
+                    started,
+                    time.perf_counter(),
+                    overlap=True,
+                    page=name,
+                    wait_ms=int((started - queued) * 1000),
+                    placeholder=self.is_placeholder(path),
+                )
+            if on_page:
+                on_page(name, path)
+            return path
+
+        names = list(html_files)
+        pages = asyncio.gather(*(capture(name, html_files[name]) for name in names))
+        if timeout is None:
+            shots = await pages
+        else:
+            waiter = asyncio.ensure_future(slot_acquired.wait())
+            await asyncio.wait({waiter, pages}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
             try:
-                browser = await p.chromium.launch(headless=True)
-                context = await browser.new_context(viewport=self.VIEWPORT)
-                for name, html_path in html_files.items():
-                    page = await context.new_page()
-                    try:
-                        await page.goto(Path(html_path).as_uri(), wait_until="networkidle", timeout=15000)
-                        await page.wait_for_timeout(400)
-                        shot_path = self._screenshot_path(task_id, name)
-                        await page.screenshot(path=str(shot_path), full_page=False)
-                        results[name] = str(shot_path)
-                    except Exception as e:
-                        logger.warning("截图失败[%s]: %s", name, e)
-                        results[name] = self._create_placeholder_image(task_id, name)
-                    finally:
-                        await page.close()
-                await context.close()
-            finally:
-                if browser:
-                    await browser.close()
-        return results
+                shots = await asyncio.wait_for(pages, timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"截图任务超时（{timeout:.0f}秒）") from None
+        return dict(zip(names, shots))
+
+    async def _capture_page(self, task_id: str, name: str, html_path: str, context) -> str:
+        page = None
+        try:
+            page = await context.new_page()
+            # 单页总耗时上限，卡死页面只影响自身，降级为占位图
+            await asyncio.wait_for(self._render_page(task_id, name, html_path, page), timeout=self._page_budget())
+            return str(self._screenshot_path(task_id, name))
+        except Exception as e:
+            logger.warning("截图失败[%s]: %s", name, e)
+            return self._create_placeholder_image(task_id, name)
+        finally:
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+
+    async def _render_page(self, task_id: str, name: str, html_path: str, page):
+        await page.goto(Path(html_path).as_uri(), wait_until="networkidle", timeout=self.PAGE_TIMEOUT_MS)
+        await page.wait_for_timeout(400)
+        await page.screenshot(path=str(self._screenshot_path(task_id, name)), full_page=False)
+
+    def _page_budget(self) -> float:
+        return self.PAGE_TIMEOUT_MS / 1000 + 5
+
+    def _capture_timeout(self, page_count: int) -> float:
+        # 按并发批次估算的页面耗时
+        batches = -(-page_count // self.page_concurrency)
+        return batches * self._page_budget()
+
+    def _job_timeout(self, page_count: int) -> float:
+        # 截图进程任务：浏览器冷启动 + 页面耗时
+        return 60 + self._capture_timeout(page_count)
 
     def _screenshot_path(self, task_id: str, feature_name: str) -> Path:
         safe = "".join(ch if ch.isalnum() else "_" for ch in feature_name).strip("_") or "feature"
@@ -55,6 +218,11 @@ class ScreenshotService:
         out.mkdir(parents=True, exist_ok=True)
         return out / f"{safe}.png"
 
+    @staticmethod
+    def is_placeholder(path: str) -> bool:
+        """是否为截图失败时生成的占位图"""
+        return Path(path).name.startswith("placeholder_")
+
     def _create_placeholder_image(self, task_id: str, feature_name: str) -> str:
         path = self._screenshot_path(task_id, f"placeholder_{feature_name}")
         try:
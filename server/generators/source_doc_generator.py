@@ -2,7 +2,13 @@
 import re
 
 from config import Config
-from generators.docx_utils import apply_standard_header
+from generators.docx_utils import (
+    PAGE_BREAK_XML,
+    append_body_xml,
+    apply_standard_header,
+    ensure_paragraph_style,
+    paragraph_xml,
+)
 from generators.models import ProjectContext
 
 
@@ -12,12 +18,16 @@ class SourceDocGenerator:
     FULL_DUMP_THRESHOLD = 3000
     HEADER_FILE_COUNT = 2
     TAIL_FILE_COUNT = 2
+    CODE_STYLE_NAME = "Source Code"
+    CODE_FONT = "Courier New"
+    CODE_FONT_SIZE = 10.5
+    # 每批解析的段落数，限制单次拼接的XML字符串大小
+    FLUSH_PARAGRAPHS = 1000
 
     def generate(self, task_id: str, context: ProjectContext) -> str:
         try:
             from docx import Document
-            from docx.enum.text import WD_BREAK
-            from docx.shared import Cm, Pt
+            from docx.shared import Cm
         except ImportError:
             return self._fallback_text(task_id, context)
 
@@ -33,23 +43,7 @@ class SourceDocGenerator:
 
         all_files = self._build_file_blocks(context)
         selected_files, strategy = self._select_files(context, all_files)
-        page_line_count = 0
-        for item in selected_files:
-            line_no = 1
-            link_mark = self._feature_link_mark(context, item["path"])
-            heading = item["path"] if not link_mark else f"{item['path']}（关联功能点：{link_mark}）"
-            doc.add_heading(heading, level=2)
-            for line in item["lines"]:
-                if page_line_count == self.LINES_PER_PAGE:
-                    page_break_p = doc.add_paragraph("")
-                    page_break_p.add_run().add_break(WD_BREAK.PAGE)
-                    page_line_count = 0
-                p = doc.add_paragraph(f"{line_no:04d}  {line}")
-                for run in p.runs:
-                    run.font.name = "Courier New"
-                    run.font.size = Pt(10.5)
-                line_no += 1
-                page_line_count += 1
+        self._write_code_listing(doc, context, selected_files)
 
         selected_line_count = sum(item["line_count"] for item in selected_files)
         feature_to_files, file_to_features = self._build_traceability(context, selected_files)
@@ -75,6 +69,26 @@ class SourceDocGenerator:
         doc.save(path)
         return str(path)
 
+    def _write_code_listing(self, doc, context: ProjectContext, selected_files: list[dict]):
+        """代码行使用共享样式，段落XML批量拼接解析，避免逐行创建python-docx对象"""
+        style_id = ensure_paragraph_style(doc, self.CODE_STYLE_NAME, self.CODE_FONT, self.CODE_FONT_SIZE)
+        page_line_count = 0
+        for item in selected_files:
+            link_mark = self._feature_link_mark(context, item["path"])
+            heading = item["path"] if not link_mark else f"{item['path']}（关联功能点：{link_mark}）"
+            doc.add_heading(heading, level=2)
+            fragments: list[str] = []
+            for line_no, line in enumerate(item["lines"], start=1):
+                if page_line_count == self.LINES_PER_PAGE:
+                    fragments.append(PAGE_BREAK_XML)
+                    page_line_count = 0
+                fragments.append(paragraph_xml(f"{line_no:04d}  {line}", style_id))
+                page_line_count += 1
+                if len(fragments) >= self.FLUSH_PARAGRAPHS:
+                    append_body_xml(doc, fragments)
+                    fragments = []
+            append_body_xml(doc, fragments)
+
     def _build_file_blocks(self, context: ProjectContext) -> list[dict]:
         blocks: list[dict] = []
         for path in sorted(context.generated_code.keys()):
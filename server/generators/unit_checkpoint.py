@@ -0,0 +1,63 @@
+"""步骤内子检查点 - 按功能记录已完成的代码/页面/截图，恢复时跳过"""
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def unit_key(*parts) -> str:
+    """由影响产出的输入计算子任务键；输入变化（如功能描述被修改）后旧记录自然失效"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class UnitCheckpoint:
+    """追加写的JSONL记录，每完成一个子任务写一行
+
+    与产出文件一起放在任务工作目录下；进程中途退出时最后一行可能不完整，加载时跳过。
+    """
+
+    def __init__(self, task_id: str, step: str):
+        self.path = Config.OUTPUT_DIR / task_id / "work" / "units" / f"{step}.jsonl"
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, object]:
+        """返回 {子任务键: 数据}，同一键以最后一次记录为准"""
+        records: dict[str, object] = {}
+        if not self.path.exists():
+            return records
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except OSError as e:
+            logger.warning("读取子检查点失败: %s, %s", self.path, e)
+            return records
+        for line in lines:
+            try:
+                item = json.loads(line)
+                records[item["key"]] = item["data"]
+            except (ValueError, KeyError, TypeError):
+                continue
+        return records
+
+    def record(self, key: str, data):
+        line = json.dumps({"key": key, "data": data}, ensure_ascii=False)
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                # 子检查点只影响恢复耗时，写入失败不中断生成
+                logger.warning("写入子检查点失败: %s, %s", self.path, e)
+
+
+def file_digest(path: str | Path) -> str:
+    try:
+        return hashlib.sha1(Path(path).read_bytes()).hexdigest()[:16]
+    except OSError:
+        return ""
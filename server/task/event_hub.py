@@ -0,0 +1,145 @@
+"""任务事件广播中心 - 进度变更推送给所有SSE订阅者"""
+import json
+import threading
+from collections import deque
+
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+class _Channel:
+    def __init__(self, lock, history_size: int, base_version: int):
+        self.cond = threading.Condition(lock)
+        self.events: deque = deque()
+        self.history_size = history_size
+        # base_version之后发布的本任务事件，除已淘汰部分外都在events中
+        self.version = base_version
+        self.evicted_version = base_version
+        self.terminal_version = 0
+        self.subscribers = 0
+
+    def append(self, version: int, encoded: str):
+        self.events.append((version, encoded))
+        self.version = version
+        while len(self.events) > self.history_size:
+            self.evicted_version = self.events.popleft()[0]
+
+
+class TaskEventHub:
+    """进程内广播中心
+
+    每个任务一个频道；事件带全局递增版本号，只序列化一次后供所有订阅者共享，
+    并保留最近若干条用于断线重连时按Last-Event-ID补发。
+    """
+
+    def __init__(self, history_size: int = 200, heartbeat_seconds: float = 15.0):
+        self.history_size = history_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self._lock = threading.Lock()
+        self._version = 0
+        self._channels: dict[str, _Channel] = {}
+
+    def publish(self, task_id: str, payload: dict) -> int:
+        """发布增量事件，返回事件版本号"""
+        data = json.dumps(payload, ensure_ascii=False)
+        with self._lock:
+            channel = self._channel(task_id)
+            self._version += 1
+            version = self._version
+            channel.append(version, f"id: {version}\ndata: {data}\n\n")
+            if payload.get("status") in TERMINAL_STATUSES:
+                channel.terminal_version = version
+            elif payload.get("status"):
+                # 任务被重新执行（如恢复）后不再视为结束
+                channel.terminal_version = 0
+            channel.cond.notify_all()
+        return version
+
+    def current_version(self, task_id: str) -> int:
+        """快照对应的版本号：之后发布的事件版本都大于它"""
+        with self._lock:
+            channel = self._channels.get(task_id)
+            return channel.version if channel else self._version
+
+    def subscribe(self, task_id: str, snapshot_func, last_event_id: str | None = None):
+        """订阅任务事件流，生成SSE文本帧
+
+        snapshot_func() 返回 (version, payload)，在无法从历史补发（首次订阅、断线过久或读取落后于淘汰）时
+        作为全量快照发送；空闲时按heartbeat_seconds发送注释行心跳。
+        """
+        with self._lock:
+            cursor = self._resume_cursor(task_id, last_event_id)
+            self._channel(task_id).subscribers += 1
+        try:
+            while True:
+                if cursor is None:
+                    version, payload = snapshot_func()
+                    if payload is None:
+                        return
+                    yield self.encode(version, payload)
+                    cursor = version
+                    if payload.get("status") in TERMINAL_STATUSES:
+                        return
+
+                with self._lock:
+                    channel = self._channel(task_id)
+                    if channel.terminal_version and cursor >= channel.terminal_version:
+                        return
+                    if channel.version <= cursor:
+                        channel.cond.wait(self.heartbeat_seconds)
+                    if cursor < channel.evicted_version:
+                        # 订阅者读取过慢，未读事件已被淘汰，改发全量快照
+                        cursor = None
+                        continue
+                    pending = [item for item in channel.events if item[0] > cursor]
+                    terminal_version = channel.terminal_version
+
+                if not pending:
+                    yield ": ping\n\n"
+                    continue
+                for version, encoded in pending:
+                    yield encoded
+                    cursor = version
+                if terminal_version and cursor >= terminal_version:
+                    return
+        finally:
+            with self._lock:
+                channel = self._channels.get(task_id)
+                if channel:
+                    channel.subscribers -= 1
+                    self._release_if_idle(task_id, channel)
+
+    def release(self, task_id: str):
+        """任务结束后释放无人订阅的频道历史"""
+        with self._lock:
+            channel = self._channels.get(task_id)
+            if channel:
+                self._release_if_idle(task_id, channel)
+
+    @staticmethod
+    def encode(version: int, payload: dict) -> str:
+        return f"id: {version}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+    def _resume_cursor(self, task_id: str, last_event_id: str | None) -> int | None:
+        """Last-Event-ID之后的事件仍全部在历史中时返回续传位置，否则返回None表示需要快照"""
+        if not last_event_id:
+            return None
+        try:
+            last = int(last_event_id)
+        except (TypeError, ValueError):
+            return None
+        channel = self._channels.get(task_id)
+        if not channel or last < channel.evicted_version or last > channel.version:
+            return None
+        return last
+
+    def _release_if_idle(self, task_id: str, channel: _Channel):
+        # 未知任务或频道已释放的结束任务只订阅到快照，频道中没有事件，同样释放
+        if channel.subscribers <= 0 and (channel.terminal_version or not channel.events):
+            self._channels.pop(task_id, None)
+
+    def _channel(self, task_id: str) -> _Channel:
+        channel = self._channels.get(task_id)
+        if channel is None:
+            channel = _Channel(self._lock, self.history_size, self._version)
+            self._channels[task_id] = channel
+        return channel
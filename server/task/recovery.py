@@ -0,0 +1,103 @@
+"""中断任务恢复 - 启动时或按需将interrupted任务重新排队，从检查点继续执行"""
+import logging
+import threading
+from collections import deque
+
+from generators.models import ProjectContext
+
+logger = logging.getLogger(__name__)
+
+
+class TaskRecovery:
+    """恢复队列：同时执行的恢复任务不超过max_concurrent，其余按提交顺序排队
+
+    run_factory() 为每个恢复任务返回新的执行函数 run(task_id, context)，
+    与新建任务一样由TaskManager的线程池执行。
+    """
+
+    def __init__(self, task_manager, run_factory, max_concurrent: int = 1, max_attempts: int = 3):
+        self.task_manager = task_manager
+        self.run_factory = run_factory
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_attempts = max(0, max_attempts)
+        self._lock = threading.Lock()
+        self._queue: deque[str] = deque()
+        self._active: set[str] = set()
+
+    def resume(self, task_id: str) -> tuple[bool, str]:
+        """将中断任务加入恢复队列，返回 (是否受理, 说明)"""
+        state = self.task_manager.get_task_state(task_id)
+        if not state:
+            return False, "任务不存在"
+        if state.get("status") != "interrupted":
+            return False, f"任务状态为{state.get('status')}，只有中断的任务可以恢复"
+        if not self.task_manager.get_task_context(task_id):
+            return False, "任务上下文已丢失，无法恢复"
+        with self._lock:
+            if task_id in self._active or task_id in self._queue:
+                return True, "任务已在恢复队列中"
+            self._queue.append(task_id)
+            position = len(self._queue)
+        self.task_manager.add_log(task_id, f"任务已加入恢复队列（第{position}位）")
+        self._dispatch()
+        return True, "任务已加入恢复队列"
+
+    def resume_interrupted(self) -> list[str]:
+        """启动时恢复所有中断任务（按创建时间），跳过已达恢复次数上限的任务"""
+        states = sorted(
+            self.task_manager.list_task_states("interrupted"),
+            key=lambda state: state.get("created_at") or "",
+        )
+        queued = []
+        for state in states:
+            task_id = state["task_id"]
+            attempts = int(state.get("resume_count") or 0)
+            if attempts >= self.max_attempts:
+                logger.warning("任务 %s 已恢复%s次，不再自动恢复", task_id, attempts)
+                continue
+            accepted, message = self.resume(task_id)
+            if accepted:
+                queued.append(task_id)
+            else:
+                logger.warning("任务 %s 无法自动恢复: %s", task_id, message)
+        if queued:
+            logger.info("启动恢复中断任务%s个: %s", len(queued), ", ".join(queued))
+        return queued
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"active": sorted(self._active), "queued": list(self._queue), "max_concurrent": self.max_concurrent}
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if not self._queue or len(self._active) >= self.max_concurrent:
+                    return
+                task_id = self._queue.popleft()
+                self._active.add(task_id)
+            future = None
+            try:
+                future = self._start(task_id)
+            except Exception as e:
+                logger.error("任务 %s 恢复失败: %s", task_id, e)
+            if future is None:
+                self._finish(task_id, dispatch=False)
+                continue
+            future.add_done_callback(lambda _f, tid=task_id: self._finish(tid))
+
+    def _start(self, task_id: str):
+        # 排队期间可能已被取消
+        payload = self.task_manager.get_task_context(task_id)
+        if not payload:
+            return None
+        context = ProjectContext.from_dict(payload)
+        future = self.task_manager.resume_task(task_id, self.run_factory(), context)
+        if future is not None:
+            logger.info("任务 %s 开始恢复执行", task_id)
+        return future
+
+    def _finish(self, task_id: str, dispatch: bool = True):
+        with self._lock:
+            self._active.discard(task_id)
+        if dispatch:
+            self._dispatch()
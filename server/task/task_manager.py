@@ -1,21 +1,44 @@
-"""轻量级任务管理器 - 线程池执行 + JSON文件持久化"""
+"""轻量级任务管理器 - 线程池执行 + 可插拔持久化后端"""
 import uuid
-import json
 import logging
+import threading
+import time
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from task.event_hub import TERMINAL_STATUSES, TaskEventHub
+from task.task_store import TaskStore, create_task_store
+from utils.cancellation import cancel_task_token, release_task_token, token_for_task
+from utils.tracing import release_tracer, tracer_for_task
+
 logger = logging.getLogger(__name__)
 
 
 class TaskManager:
-    def __init__(self, max_workers=2, data_dir="./data/tasks"):
+    # SSE推送中的进度字段
+    PROGRESS_FIELDS = ("status", "current_step", "total_steps", "step_name", "progress", "message")
+    STREAM_LOG_LIMIT = 20
+
+    def __init__(
+        self,
+        max_workers=2,
+        data_dir="./data/tasks",
+        store: TaskStore | None = None,
+        store_backend="sqlite",
+        event_hub: TaskEventHub | None = None,
+    ):
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.store = store or create_task_store(store_backend, self.data_dir)
+        self.event_hub = event_hub or TaskEventHub()
+        # 保证"修改状态+发布事件"与快照读取互斥，避免增量事件被重复应用
+        self._lock = threading.RLock()
         self._cache: dict = {}
         self._futures: dict = {}
+        # 已确认将重新执行、正在准备上下文的任务
+        self._rerun_claims: set[str] = set()
         self._load_from_disk()
 
     def submit_task(self, run_func, context) -> str:
@@ -23,6 +46,7 @@ class TaskManager:
         task_id = str(uuid.uuid4())[:8]
         task_state = {
             "task_id": task_id,
+            "software_name": context.software_name,
             "status": "pending",
             "cancel_requested": False,
             "current_step": 0,
@@ -31,18 +55,90 @@ class TaskManager:
             "progress": 0,
             "message": "任务已创建，等待执行...",
             "created_at": datetime.now().isoformat(),
-            "context": context.to_dict(),
+            "resume_count": 0,
             "warnings": [],
             "errors": [],
             "output_files": {},
             "logs": [],
         }
         self._save_state(task_id, task_state)
+        self.save_task_context(task_id, context)
+        self._submit(task_id, run_func, context)
+        return task_id
 
-        future = self.executor.submit(run_func, task_id, context)
-        future.add_done_callback(lambda f: self._on_task_done(task_id, f))
+    def resume_task(self, task_id: str, run_func, context):
+        """将中断的任务重新提交执行，编排器从检查点继续；返回Future，状态不允许时返回None"""
+        state = self.get_task_state(task_id)
+        if not state or state.get("status") != "interrupted":
+            return None
+        fields = {
+            "status": "pending",
+            "cancel_requested": False,
+            "message": "任务恢复中，将从上次完成的步骤继续...",
+            "resume_count": int(state.get("resume_count") or 0) + 1,
+        }
+        with self._lock:
+            state.update(fields)
+            self._persist(self.store.update_fields, task_id, fields)
+            self._publish_progress(task_id, state)
+        return self._submit(task_id, run_func, context)
+
+    def claim_rerun(self, task_id: str) -> bool:
+        """占用已结束任务的重新执行权；成功后须调用release_rerun释放
+
+        调用方在占用期间修改检查点或上下文，再调用rerun_task提交，避免修改与执行中的任务并发。
+        """
+        state = self.get_task_state(task_id)
+        with self._lock:
+            if (
+                not state
+                or state.get("status") not in TERMINAL_STATUSES
+                or task_id in self._futures
+                or task_id in self._rerun_claims
+            ):
+                return False
+            self._rerun_claims.add(task_id)
+            return True
+
+    def release_rerun(self, task_id: str):
+        with self._lock:
+            self._rerun_claims.discard(task_id)
+
+    def rerun_task(self, task_id: str, run_func, context, message: str = "任务重新执行中..."):
+        """将已结束的任务重新提交执行（如修改功能后增量重做）；返回Future，状态不允许时返回None"""
+        state = self.get_task_state(task_id)
+        if not state:
+            return None
+        fields = {
+            "status": "pending",
+            "progress": 0,
+            "cancel_requested": False,
+            "message": message,
+        }
+        with self._lock:
+            # 上一次执行的完成回调尚未结束时不允许重新提交
+            if state.get("status") not in TERMINAL_STATUSES or task_id in self._futures:
+                return None
+            state.update(fields)
+            self._persist(self.store.update_fields, task_id, fields)
+            self._publish_progress(task_id, state)
+        return self._submit(task_id, run_func, context)
+
+    def _submit(self, task_id: str, run_func, context):
+        token_for_task(task_id)
+        tracer = tracer_for_task(task_id)
+        submitted = time.perf_counter()
+
+        def run(task_id, context):
+            # 线程池排队时间单独记录，便于判断并发数是否不足
+            if tracer is not None:
+                tracer.add_span("排队等待", "task", submitted, time.perf_counter())
+            return run_func(task_id, context)
+
+        future = self.executor.submit(run, task_id, context)
         self._futures[task_id] = future
-        return task_id
+        future.add_done_callback(lambda f: self._on_task_done(task_id, f))
+        return future
 
     def get_task_state(self, task_id: str) -> dict | None:
         """获取任务状态"""
@@ -50,94 +146,164 @@ class TaskManager:
             return self._cache[task_id]
         return self._load_state(task_id)
 
+    def list_task_states(self, status: str | None = None) -> list[dict]:
+        """已加载任务的进度记录，可按状态过滤"""
+        with self._lock:
+            states = list(self._cache.values())
+        return [state for state in states if status is None or state.get("status") == status]
+
+    def get_task_context(self, task_id: str) -> dict | None:
+        """按需读取任务上下文（含生成代码等大字段），不进入进度缓存"""
+        try:
+            return self.store.load_context(task_id)
+        except Exception as e:
+            logger.error(f"读取任务上下文失败: {e}")
+            return None
+
+    def save_task_context(self, task_id: str, context):
+        """单独持久化任务上下文"""
+        payload = context.to_dict() if hasattr(context, "to_dict") else context
+        self._persist(self.store.save_context, task_id, payload)
+
     def update_progress(self, task_id: str, step: int, name: str, progress: int, message: str):
         """更新任务进度"""
         state = self.get_task_state(task_id)
         if not state:
             return
-        state.update({
+        fields = {
             "status": "processing",
             "current_step": step,
             "step_name": name,
             "progress": progress,
             "message": message,
-        })
-        self._save_state(task_id, state)
+        }
+        with self._lock:
+            state.update(fields)
+            self._persist(self.store.update_fields, task_id, fields)
+            self._publish_progress(task_id, state)
 
     def add_log(self, task_id: str, log_message: str):
         """添加日志"""
         state = self.get_task_state(task_id)
         if not state:
             return
-        state["logs"].append({
+        entry = {
             "time": datetime.now().strftime("%H:%M:%S"),
             "message": log_message,
-        })
-        self._save_state(task_id, state)
+        }
+        with self._lock:
+            state["logs"].append(entry)
+            self._persist(self.store.append_log, task_id, entry)
+            self._publish(task_id, {"type": "log", "log": entry})
 
     def add_warning(self, task_id: str, warning: str):
         """添加警告"""
         state = self.get_task_state(task_id)
         if not state:
             return
-        state["warnings"].append(warning)
-        self._save_state(task_id, state)
+        with self._lock:
+            state["warnings"].append(warning)
+            self._persist(self.store.append_warning, task_id, warning)
+            self._publish(task_id, {"type": "warning", "warning": warning})
 
     def complete_task(self, task_id: str, output_files: dict):
         """标记任务完成"""
         state = self.get_task_state(task_id)
         if not state:
             return
-        state.update({
+        fields = {
             "status": "completed",
             "current_step": state.get("total_steps", 7),
             "progress": 100,
             "message": "生成完成",
             "output_files": output_files,
-        })
-        self._save_state(task_id, state)
+        }
+        with self._lock:
+            state.update(fields)
+            self._persist(self.store.update_fields, task_id, fields)
+            self._publish_progress(task_id, state, output_files=output_files)
+        self.event_hub.release(task_id)
 
     def mark_cancelled(self, task_id: str, message: str = "任务已取消"):
         state = self.get_task_state(task_id)
         if not state:
             return
-        state.update({
+        fields = {
             "status": "cancelled",
             "message": message,
             "cancel_requested": True,
-        })
-        self._save_state(task_id, state)
+        }
+        with self._lock:
+            state.update(fields)
+            self._persist(self.store.update_fields, task_id, fields)
+            self._publish_progress(task_id, state)
+        self.event_hub.release(task_id)
 
     def fail_task(self, task_id: str, error_message: str):
         """标记任务失败"""
         state = self.get_task_state(task_id)
         if not state:
             return
-        state.update({
-            "status": "failed",
-            "message": error_message,
-        })
-        state["errors"].append(error_message)
-        self._save_state(task_id, state)
+        with self._lock:
+            state["errors"].append(error_message)
+            fields = {
+                "status": "failed",
+                "message": error_message,
+                "errors": state["errors"],
+            }
+            state.update(fields)
+            self._persist(self.store.update_fields, task_id, fields)
+            self._publish_progress(task_id, state, error=error_message)
+        self.event_hub.release(task_id)
 
     def cancel_task(self, task_id: str) -> bool:
         """取消任务"""
         state = self.get_task_state(task_id)
         if not state:
             return False
-        if state.get("status") in ("completed", "failed", "cancelled"):
+        if state.get("status") in TERMINAL_STATUSES:
             return False
-        state["cancel_requested"] = True
-        state["message"] = "已收到取消请求，正在停止任务..."
-        self._save_state(task_id, state)
+        fields = {
+            "cancel_requested": True,
+            "message": "已收到取消请求，正在停止任务...",
+        }
+        with self._lock:
+            state.update(fields)
+            self._persist(self.store.update_fields, task_id, fields)
+            self._publish_progress(task_id, state)
+        # 立即中断执行中的AI调用、重试等待和截图
+        cancel_task_token(task_id)
 
         if task_id in self._futures:
             cancelled = self._futures[task_id].cancel()
             if cancelled:
                 self.mark_cancelled(task_id, "任务已取消")
             return True
+        # 中断后未恢复（或仍在恢复队列中）的任务没有执行线程，直接置为已取消
+        if state.get("status") == "interrupted":
+            self.mark_cancelled(task_id, "任务已取消")
         return True
 
+    def stream_snapshot(self, task_id: str) -> tuple[int, dict | None]:
+        """SSE全量快照：与增量事件版本号对齐"""
+        with self._lock:
+            state = self.get_task_state(task_id)
+            version = self.event_hub.current_version(task_id)
+            if not state:
+                return version, None
+            payload = {"type": "snapshot", "task_id": task_id}
+            payload.update({key: state.get(key) for key in self.PROGRESS_FIELDS})
+            payload.update({
+                "warnings": list(state.get("warnings", [])),
+                "logs": state.get("logs", [])[-self.STREAM_LOG_LIMIT:],
+                "output_files": state.get("output_files", {}),
+            })
+            return version, payload
+
+    def subscribe_events(self, task_id: str, last_event_id: str | None = None):
+        """订阅任务事件流（SSE文本帧生成器）"""
+        return self.event_hub.subscribe(task_id, lambda: self.stream_snapshot(task_id), last_event_id)
+
     def is_cancel_requested(self, task_id: str) -> bool:
         state = self.get_task_state(task_id)
         if not state:
@@ -154,39 +320,61 @@ class TaskManager:
         except Exception as e:
             logger.error(f"处理任务回调异常: {e}")
         finally:
-            self._futures.pop(task_id, None)
+            # 先释放令牌与追踪器再移除Future，且与rerun_task的检查互斥：
+            # 否则新一次执行可能拿到旧令牌/追踪器，随后又被这里释放
+            with self._lock:
+                release_task_token(task_id)
+                release_tracer(task_id)
+                if self._futures.get(task_id) is future:
+                    self._futures.pop(task_id)
 
     def _save_state(self, task_id: str, state: dict):
-        """持久化到JSON文件 + 更新内存缓存"""
+        """整体写入任务记录 + 更新内存缓存"""
         self._cache[task_id] = state
-        filepath = self.data_dir / f"{task_id}.json"
+        self._persist(self.store.save_task, state)
+
+    def _publish(self, task_id: str, payload: dict):
+        try:
+            self.event_hub.publish(task_id, {"task_id": task_id, **payload})
+        except Exception as e:
+            logger.error(f"发布任务事件失败: {e}")
+
+    def _publish_progress(self, task_id: str, state: dict, **extra):
+        payload = {"type": "progress"}
+        payload.update({key: state.get(key) for key in self.PROGRESS_FIELDS})
+        payload.update(extra)
+        self._publish(task_id, payload)
+
+    def _persist(self, write_func, *args):
+        """增量写入存储后端，失败只记录日志不影响任务执行"""
         try:
-            filepath.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
+            write_func(*args)
         except Exception as e:
             logger.error(f"保存任务状态失败: {e}")
 
     def _load_state(self, task_id: str) -> dict | None:
-        filepath = self.data_dir / f"{task_id}.json"
-        if filepath.exists():
-            try:
-                state = json.loads(filepath.read_text(encoding='utf-8'))
-                self._cache[task_id] = state
-                return state
-            except Exception:
-                pass
-        return None
+        try:
+            state = self.store.load_task(task_id)
+        except Exception:
+            return None
+        if state:
+            self._cache[task_id] = state
+        return state
 
     def _load_from_disk(self):
-        """启动时从磁盘恢复任务状态"""
-        for f in self.data_dir.glob("*.json"):
-            try:
-                state = json.loads(f.read_text(encoding='utf-8'))
-                tid = state.get("task_id")
-                if tid:
-                    # 恢复时将processing状态标记为interrupted
-                    if state.get("status") == "processing":
-                        state["status"] = "interrupted"
-                        state["message"] = "任务被中断，可尝试恢复"
-                    self._cache[tid] = state
-            except Exception:
-                pass
+        """启动时从存储后端恢复任务状态"""
+        try:
+            states = self.store.load_all()
+        except Exception as e:
+            logger.error(f"加载任务状态失败: {e}")
+            return
+        for state in states:
+            tid = state.get("task_id")
+            if not tid:
+                continue
+            # 上次进程中排队或执行中的任务均标记为interrupted，由TaskRecovery决定是否恢复
+            if state.get("status") in ("pending", "processing"):
+                fields = {"status": "interrupted", "message": "任务被中断，可尝试恢复"}
+                state.update(fields)
+                self._persist(self.store.update_fields, tid, fields)
+            self._cache[tid] = state
@@ -0,0 +1,441 @@
+"""任务状态存储后端 - JSON文件 / SQLite(WAL)"""
+import copy
+import json
+import logging
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 任务进度记录中的热字段（SQLite后端按列存储）
+HOT_FIELDS = (
+    "software_name",
+    "status",
+    "cancel_requested",
+    "current_step",
+    "total_steps",
+    "step_name",
+    "progress",
+    "message",
+    "created_at",
+    "resume_count",
+)
+# 以JSON文本存储的小型结构字段
+JSON_FIELDS = ("errors", "output_files")
+
+
+class TaskStore(ABC):
+    """任务存储接口：进度记录、日志、警告与上下文分别持久化
+
+    进度记录为固定结构的小字典；上下文（含generated_code）单独存放，
+    只有下载、恢复、检查点等确实需要时才通过load_context读取。
+    """
+
+    @abstractmethod
+    def save_task(self, state: dict):
+        """整体写入进度记录（创建任务时使用）"""
+
+    @abstractmethod
+    def update_fields(self, task_id: str, fields: dict):
+        """只更新任务记录中的部分字段"""
+
+    @abstractmethod
+    def append_log(self, task_id: str, entry: dict):
+        """追加一条任务日志"""
+
+    @abstractmethod
+    def append_warning(self, task_id: str, warning: str):
+        """追加一条任务警告"""
+
+    @abstractmethod
+    def save_context(self, task_id: str, context: dict):
+        """整体写入任务上下文"""
+
+    @abstractmethod
+    def load_context(self, task_id: str) -> dict | None:
+        """读取任务上下文，不存在时返回None"""
+
+    @abstractmethod
+    def load_task(self, task_id: str) -> dict | None:
+        """读取单个任务的进度记录（含日志与警告），不存在时返回None"""
+
+    @abstractmethod
+    def load_all(self) -> list[dict]:
+        """读取全部任务的进度记录，启动时使用"""
+
+    def purge_expired(self, cutoff: datetime) -> int:
+        """删除最后写入早于cutoff且未在排队/执行/待恢复的任务，返回删除条数"""
+        return 0
+
+    def close(self):
+        pass
+
+
+class JsonTaskStore(TaskStore):
+    """每个任务一个JSON文件（兼容旧版存储格式）"""
+
+    def __init__(self, data_dir: str | Path):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        # 持有独立副本，避免与TaskManager缓存共享对象导致日志重复追加
+        self._states: dict[str, dict] = {}
+        self._lock = threading.RLock()
+
+    def save_task(self, state: dict):
+        with self._lock:
+            state = copy.deepcopy(state)
+            self._states[state["task_id"]] = state
+            self._write(state)
+
+    def update_fields(self, task_id: str, fields: dict):
+        with self._lock:
+            state = self._get(task_id)
+            if state is None:
+                return
+            state.update(copy.deepcopy(fields))
+            self._write(state)
+
+    def append_log(self, task_id: str, entry: dict):
+        with self._lock:
+            state = self._get(task_id)
+            if state is None:
+                return
+            state.setdefault("logs", []).append(entry)
+            self._write(state)
+
+    def append_warning(self, task_id: str, warning: str):
+        with self._lock:
+            state = self._get(task_id)
+            if state is None:
+                return
+            state.setdefault("warnings", []).append(warning)
+            self._write(state)
+
+    def save_context(self, task_id: str, context: dict):
+        filepath = self._context_path(task_id)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            filepath.write_text(json.dumps(context, ensure_ascii=False), encoding='utf-8')
+        except Exception as e:
+            logger.error(f"保存任务上下文失败: {e}")
+
+    def load_context(self, task_id: str) -> dict | None:
+        filepath = self._context_path(task_id)
+        if filepath.exists():
+            try:
+                return json.loads(filepath.read_text(encoding='utf-8'))
+            except Exception:
+                return None
+        # 兼容旧版：上下文内嵌在任务JSON中
+        legacy_path = self.data_dir / f"{task_id}.json"
+        if legacy_path.exists():
+            try:
+                return json.loads(legacy_path.read_text(encoding='utf-8')).get("context")
+            except Exception:
+                return None
+        return None
+
+    def load_task(self, task_id: str) -> dict | None:
+        with self._lock:
+            return copy.deepcopy(self._get(task_id))
+
+    def load_all(self) -> list[dict]:
+        states: list[dict] = []
+        for f in self.data_dir.glob("*.json"):
+            try:
+                state = json.loads(f.read_text(encoding='utf-8'))
+            except Exception:
+                continue
+            if state.get("task_id"):
+                self._split_legacy_context(state)
+                with self._lock:
+                    self._states[state["task_id"]] = state
+                states.append(copy.deepcopy(state))
+        return states
+
+    def _context_path(self, task_id: str) -> Path:
+        return self.data_dir / "contexts" / f"{task_id}.json"
+
+    def _split_legacy_context(self, state: dict):
+        """旧版任务JSON内嵌context时，拆出到独立文件，进度记录只保留小字段"""
+        context = state.pop("context", None)
+        if context is None:
+            return
+        state.setdefault("software_name", context.get("software_name", ""))
+        if not self._context_path(state["task_id"]).exists():
+            self.save_context(state["task_id"], context)
+        self._write(state)
+
+    def _get(self, task_id: str) -> dict | None:
+        if task_id in self._states:
+            return self._states[task_id]
+        filepath = self.data_dir / f"{task_id}.json"
+        if not filepath.exists():
+            return None
+        try:
+            state = json.loads(filepath.read_text(encoding='utf-8'))
+        except Exception:
+            return None
+        self._split_legacy_context(state)
+        self._states[task_id] = state
+        return state
+
+    def _write(self, state: dict):
+        filepath = self.data_dir / f"{state['task_id']}.json"
+        try:
+            filepath.write_text(json.dumps(state, ensure_ascii=False, indent=2), encoding='utf-8')
+        except Exception as e:
+            logger.error(f"保存任务状态失败: {e}")
+
+
+class SqliteTaskStore(TaskStore):
+    """嵌入式SQLite(WAL)存储：小更新只写单行"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        task_id TEXT PRIMARY KEY,
+        software_name TEXT NOT NULL DEFAULT '',
+        status TEXT NOT NULL,
+        cancel_requested INTEGER NOT NULL DEFAULT 0,
+        current_step INTEGER NOT NULL DEFAULT 0,
+        total_steps INTEGER NOT NULL DEFAULT 7,
+        step_name TEXT NOT NULL DEFAULT '',
+        progress INTEGER NOT NULL DEFAULT 0,
+        message TEXT NOT NULL DEFAULT '',
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL DEFAULT '',
+        resume_count INTEGER NOT NULL DEFAULT 0,
+        errors TEXT NOT NULL DEFAULT '[]',
+        output_files TEXT NOT NULL DEFAULT '{}'
+    );
+    CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at);
+    CREATE TABLE IF NOT EXISTS task_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id TEXT NOT NULL,
+        time TEXT NOT NULL,
+        message TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_task_logs_task ON task_logs(task_id, id);
+    CREATE TABLE IF NOT EXISTS task_warnings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id TEXT NOT NULL,
+        message TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_task_warnings_task ON task_warnings(task_id, id);
+    CREATE TABLE IF NOT EXISTS task_contexts (
+        task_id TEXT PRIMARY KEY,
+        payload TEXT NOT NULL
+    );
+    """
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._migrate()
+
+    def save_task(self, state: dict):
+        task_id = state["task_id"]
+        row = self._to_row(state)
+        row["updated_at"] = self._now()
+        columns = ["task_id", *row.keys()]
+        placeholders = ", ".join("?" for _ in columns)
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO tasks ({', '.join(columns)}) VALUES ({placeholders})",
+                [task_id, *row.values()],
+            )
+            self._conn.execute("DELETE FROM task_logs WHERE task_id = ?", (task_id,))
+            self._conn.execute("DELETE FROM task_warnings WHERE task_id = ?", (task_id,))
+            self._conn.executemany(
+                "INSERT INTO task_logs (task_id, time, message) VALUES (?, ?, ?)",
+                [(task_id, log.get("time", ""), log.get("message", "")) for log in state.get("logs", [])],
+            )
+            self._conn.executemany(
+                "INSERT INTO task_warnings (task_id, message) VALUES (?, ?)",
+                [(task_id, w) for w in state.get("warnings", [])],
+            )
+
+    def update_fields(self, task_id: str, fields: dict):
+        row = self._to_row(fields)
+        if not row:
+            return
+        row["updated_at"] = self._now()
+        assignments = ", ".join(f"{k} = ?" for k in row)
+        with self._lock:
+            self._conn.execute(f"UPDATE tasks SET {assignments} WHERE task_id = ?", [*row.values(), task_id])
+
+    def append_log(self, task_id: str, entry: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO task_logs (task_id, time, message) VALUES (?, ?, ?)",
+                (task_id, entry.get("time", ""), entry.get("message", "")),
+            )
+            self._touch(task_id)
+
+    def append_warning(self, task_id: str, warning: str):
+        with self._lock:
+            self._conn.execute("INSERT INTO task_warnings (task_id, message) VALUES (?, ?)", (task_id, warning))
+            self._touch(task_id)
+
+    def save_context(self, task_id: str, context: dict):
+        payload = json.dumps(context, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO task_contexts (task_id, payload) VALUES (?, ?)",
+                (task_id, payload),
+            )
+            self._touch(task_id)
+
+    def load_context(self, task_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM task_contexts WHERE task_id = ?", (task_id,)).fetchone()
+        if not row:
+            return None
+        try:
+            return json.loads(row["payload"])
+        except Exception:
+            return None
+
+    def load_task(self, task_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+            if not row:
+                return None
+            logs = self._conn.execute(
+                "SELECT time, message FROM task_logs WHERE task_id = ? ORDER BY id", (task_id,)
+            ).fetchall()
+            warnings = self._conn.execute(
+                "SELECT message FROM task_warnings WHERE task_id = ? ORDER BY id", (task_id,)
+            ).fetchall()
+        state = self._from_row(row)
+        state["logs"] = [{"time": r["time"], "message": r["message"]} for r in logs]
+        state["warnings"] = [r["message"] for r in warnings]
+        return state
+
+    def load_all(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM tasks ORDER BY created_at").fetchall()
+            log_rows = self._conn.execute("SELECT task_id, time, message FROM task_logs ORDER BY task_id, id").fetchall()
+            warning_rows = self._conn.execute("SELECT task_id, message FROM task_warnings ORDER BY task_id, id").fetchall()
+
+        states = {row["task_id"]: self._from_row(row) for row in rows}
+        for state in states.values():
+            state["logs"] = []
+            state["warnings"] = []
+        for r in log_rows:
+            if r["task_id"] in states:
+                states[r["task_id"]]["logs"].append({"time": r["time"], "message": r["message"]})
+        for r in warning_rows:
+            if r["task_id"] in states:
+                states[r["task_id"]]["warnings"].append(r["message"])
+        return list(states.values())
+
+    def purge_expired(self, cutoff: datetime) -> int:
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            expired = [
+                r["task_id"]
+                for r in self._conn.execute(
+                    # 按最后写入时间判断：恢复或重新执行的任务可能创建很久后才排队/执行
+                    "SELECT task_id FROM tasks WHERE updated_at < ? "
+                    "AND status NOT IN ('pending', 'processing', 'interrupted')",
+                    (cutoff.isoformat(),),
+                ).fetchall()
+            ]
+            for table in ("task_logs", "task_warnings", "task_contexts", "tasks"):
+                self._conn.executemany(f"DELETE FROM {table} WHERE task_id = ?", [(tid,) for tid in expired])
+        return len(expired)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def import_legacy(self, legacy: TaskStore) -> int:
+        """首次启动时导入旧版JSON存储的任务记录与上下文，返回导入条数
+
+        只在数据库为空时执行一次（以user_version标记），之后清理掉的任务不会被重新导入。
+        """
+        with self._lock:
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] >= 1:
+                return 0
+            has_tasks = self._conn.execute("SELECT 1 FROM tasks LIMIT 1").fetchone() is not None
+        imported = 0
+        if not has_tasks:
+            for state in legacy.load_all():
+                state.setdefault("created_at", self._now())
+                try:
+                    self.save_task(state)
+                    context = legacy.load_context(state["task_id"])
+                    if context is not None:
+                        self.save_context(state["task_id"], context)
+                    imported += 1
+                except Exception as e:
+                    logger.warning("导入旧版任务记录失败: %s, %s", state.get("task_id"), e)
+        with self._lock:
+            self._conn.execute("PRAGMA user_version = 1")
+        if imported:
+            logger.info("已从旧版JSON存储导入%s个任务", imported)
+        return imported
+
+    def _migrate(self):
+        columns = {r["name"] for r in self._conn.execute("PRAGMA table_info(tasks)").fetchall()}
+        if "software_name" not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN software_name TEXT NOT NULL DEFAULT ''")
+        if "resume_count" not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN resume_count INTEGER NOT NULL DEFAULT 0")
+        if "updated_at" not in columns:
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN updated_at TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("UPDATE tasks SET updated_at = created_at")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks(updated_at)")
+
+    def _touch(self, task_id: str):
+        """刷新最后写入时间（调用方持有锁）"""
+        self._conn.execute("UPDATE tasks SET updated_at = ? WHERE task_id = ?", (self._now(), task_id))
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat()
+
+    def _to_row(self, fields: dict) -> dict:
+        row: dict = {}
+        for key in HOT_FIELDS:
+            if key in fields:
+                value = fields[key]
+                row[key] = int(bool(value)) if key == "cancel_requested" else value
+        for key in JSON_FIELDS:
+            if key in fields:
+                row[key] = json.dumps(fields[key], ensure_ascii=False)
+        return row
+
+    def _from_row(self, row) -> dict:
+        state = {"task_id": row["task_id"]}
+        for key in HOT_FIELDS:
+            state[key] = row[key]
+        state["cancel_requested"] = bool(state["cancel_requested"])
+        for key in JSON_FIELDS:
+            state[key] = json.loads(row[key]) if row[key] else ([] if key == "errors" else {})
+        return state
+
+
+def create_task_store(backend: str, data_dir: str | Path) -> TaskStore:
+    """按配置创建任务存储后端"""
+    normalized = (backend or "").strip().lower()
+    if normalized == "json":
+        return JsonTaskStore(data_dir)
+    if normalized in ("sqlite", ""):
+        store = SqliteTaskStore(Path(data_dir) / "tasks.db")
+        # 从JSON后端升级时保留已有任务，否则其状态查询与下载都会返回404
+        if any(Path(data_dir).glob("*.json")):
+            store.import_legacy(JsonTaskStore(data_dir))
+        return store
+    raise ValueError(f"不支持的任务存储后端: {backend}")
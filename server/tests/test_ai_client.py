@@ -1,11 +1,24 @@
 """AI 客户端重试与主备切换测试。"""
+import threading
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 
+from ai.adapters.tongyi_adapter import TongyiAdapter
+from ai.adapters.zhipu_adapter import ZhipuAdapter
 from ai.ai_client import AIClient, AIClientError
+from ai.circuit_breaker import CircuitBreaker, reset_circuit_breakers
+from ai.hedging import HedgePolicy
+from ai.rate_limiter import ProviderRateLimiter, RateLimitedError, parse_retry_after, reset_rate_limiters
+from ai.response_cache import ResponseCache
+from utils.cancellation import CallCancelledError
 
 
 class TestAIClient(unittest.TestCase):
+    def setUp(self):
+        reset_rate_limiters()
+        reset_circuit_breakers()
+
     @patch("ai.ai_client.time.sleep", return_value=None)
     def test_retry_success_on_primary(self, _):
         primary = MagicMock()
@@ -35,6 +48,227 @@ class TestAIClient(unittest.TestCase):
         self.assertEqual(primary.call.call_count, 1)
         self.assertEqual(fallback.call.call_count, 1)
 
+    @patch("ai.ai_client.time.sleep", return_value=None)
+    def test_no_sleep_after_last_attempt(self, mock_sleep):
+        primary = MagicMock()
+        primary.call.side_effect = RuntimeError("down")
+        with patch.object(AIClient, "_create_adapter", side_effect=[primary]):
+            client = AIClient()
+            with self.assertRaises(AIClientError):
+                client.generate("prompt", max_retries=2, use_cache=False)
+        self.assertEqual([c.args[0] for c in mock_sleep.call_args_list], [1])
+
+    @patch("ai.ai_client.time.sleep", return_value=None)
+    def test_retry_after_pauses_shared_limiter(self, mock_sleep):
+        primary = MagicMock()
+        primary.call.side_effect = [RateLimitedError("429", retry_after=7), "ok"]
+        limiter = MagicMock()
+        with patch.object(AIClient, "_create_adapter", side_effect=[primary]), patch(
+            "ai.ai_client.get_rate_limiter", return_value=limiter
+        ):
+            client = AIClient()
+            self.assertEqual(client.generate("prompt", max_retries=2, use_cache=False), "ok")
+        limiter.penalize.assert_called_once_with(7)
+        self.assertEqual(limiter.acquire.call_count, 2)
+        mock_sleep.assert_not_called()
+
+    @patch("ai.ai_client.time.sleep", return_value=None)
+    def test_open_primary_routes_straight_to_fallback(self, _):
+        primary = MagicMock()
+        primary.call.side_effect = RuntimeError("primary down")
+        fallback = MagicMock()
+        fallback.call.return_value = "fallback ok"
+
+        with patch("ai.ai_client.Config.AI_FALLBACK_PROVIDER", "zhipu"), patch(
+            "ai.ai_client.Config.AI_FALLBACK_API_KEY", "dummy"
+        ), patch("ai.circuit_breaker.Config.AI_BREAKER_MIN_CALLS", 2), patch(
+            "ai.circuit_breaker.Config.AI_BREAKER_PROBE", False
+        ), patch.object(AIClient, "_create_adapter", side_effect=[primary, fallback]):
+            client = AIClient()
+            for _ in range(2):
+                self.assertEqual(client.generate("prompt", max_retries=1, use_cache=False), "fallback ok")
+            self.assertEqual(client.primary_breaker.state, CircuitBreaker.OPEN)
+            self.assertEqual(client.generate("prompt", max_retries=1, use_cache=False), "fallback ok")
+
+        self.assertEqual(primary.call.call_count, 2)
+        self.assertEqual(fallback.call.call_count, 3)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_trips_on_error_rate_and_recovers_via_half_open_call(self):
+        breaker = CircuitBreaker("test", window_size=4, min_calls=4, error_rate=0.5, open_seconds=0.05)
+        for ok in (True, False, True):
+            breaker.record_success(0.1) if ok else breaker.record_failure(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow_request())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())
+        # 半开状态只放行一次探测调用
+        self.assertFalse(breaker.allow_request())
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.snapshot()["window_calls"], 0)
+
+    def test_slow_calls_trip_and_background_probe_closes(self):
+        probe = MagicMock()
+        breaker = CircuitBreaker(
+            "slow", window_size=3, min_calls=3, slow_call_seconds=1, slow_call_rate=0.6, open_seconds=0.05, probe=probe
+        )
+        try:
+            for _ in range(2):
+                breaker.record_success(2.0)
+            breaker.record_success(0.1)
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+            # 配置了探测时不放行真实调用
+            self.assertFalse(breaker.allow_request())
+            time.sleep(0.2)
+            probe.assert_called_once()
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        finally:
+            breaker.shutdown()
+
+    def test_streamed_call_records_time_to_first_chunk(self):
+        def streamed(prompt, on_chunk=None, **_):
+            on_chunk("{")
+            time.sleep(0.2)
+            on_chunk("}")
+            return "{}"
+
+        adapter = MagicMock()
+        adapter.call.side_effect = streamed
+        breaker = MagicMock()
+        chunks = []
+        with patch.object(AIClient, "_create_adapter", side_effect=[adapter]):
+            client = AIClient()
+        self.assertEqual(client._call_once(adapter, "p", breaker=breaker, kind="code", on_chunk=chunks.append), "{}")
+        self.assertEqual(chunks, ["{", "}"])
+        # 长输出的总耗时不计为慢调用
+        self.assertLess(breaker.record_success.call_args[0][0], 0.1)
+
+
+class TestHedging(unittest.TestCase):
+    def setUp(self):
+        reset_rate_limiters()
+        reset_circuit_breakers()
+
+    def test_policy_waits_for_samples_and_caps_extra_calls(self):
+        policy = HedgePolicy(enabled=True, percentile=0.9, min_samples=3, min_delay=0.5, max_rate=0.5)
+        self.assertIsNone(policy.delay_for("page"))
+        for latency in (1.0, 2.0, 8.0):
+            policy.record_latency("page", latency)
+        self.assertEqual(policy.delay_for("page"), 8.0)
+        self.assertIsNone(policy.delay_for(None))
+        # 两次调用积累1个额度，只允许一次对冲
+        self.assertTrue(policy.try_spend())
+        self.assertFalse(policy.try_spend())
+        self.assertEqual(policy.stats()["hedged"], 1)
+
+    def test_slow_primary_is_hedged_to_fallback_and_cancelled(self):
+        cancelled = threading.Event()
+
+        class SlowAdapter:
+            def call(self, prompt, cancel_token=None):
+                if cancel_token.wait(2):
+                    cancelled.set()
+                    raise CallCancelledError("cancelled")
+                return "slow"
+
+        class FastAdapter:
+            def call(self, prompt, cancel_token=None):
+                return "fast"
+
+        with patch("ai.ai_client.Config.AI_FALLBACK_PROVIDER", "zhipu"), patch(
+            "ai.ai_client.Config.AI_FALLBACK_API_KEY", "dummy"
+        ), patch.object(AIClient, "_create_adapter", side_effect=[SlowAdapter(), FastAdapter()]):
+            cache = MagicMock()
+            cache.get.return_value = None
+            client = AIClient(cache=cache)
+        client.hedge_policy = HedgePolicy(enabled=True, min_samples=1, min_delay=0.05, max_rate=1.0)
+        client.hedge_policy.record_latency("page", 0.01)
+
+        started = time.monotonic()
+        result = client.generate("prompt", max_retries=1, kind="page")
+
+        self.assertEqual(result, "fast")
+        # 响应按实际应答的备用提供商缓存
+        cache.put.assert_called_once_with(
+            ResponseCache.make_key(*client.fallback_id, "prompt"), "fast", *client.fallback_id
+        )
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertTrue(cancelled.wait(1))
+        self.assertEqual(client.hedge_policy.stats()["hedge_wins"], 1)
+        # 被取消的调用不计入熔断窗口
+        self.assertEqual(client.primary_breaker.snapshot()["window_calls"], 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("3"), 3.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertAlmostEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+
+    def test_in_flight_cap_and_fifo_order(self):
+        limiter = ProviderRateLimiter(max_in_flight=1)
+        order: list[int] = []
+        limiter.acquire()
+
+        def worker(idx: int):
+            with limiter.slot():
+                order.append(idx)
+
+        threads = []
+        for idx in range(3):
+            thread = threading.Thread(target=worker, args=(idx,))
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.05)
+        self.assertEqual(limiter.stats()["waiting"], 3)
+        limiter.release()
+        for thread in threads:
+            thread.join(2)
+        self.assertEqual(order, [0, 1, 2])
+
+    def test_token_bucket_and_penalty(self):
+        limiter = ProviderRateLimiter(rps=20, burst=1)
+        started = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+            limiter.release()
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+        limiter.penalize(0.2)
+        started = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+
+    def test_tokens_per_minute_blocks_until_timeout(self):
+        limiter = ProviderRateLimiter(tokens_per_minute=100)
+        limiter.acquire(estimated_tokens=80)
+        limiter.release()
+        with self.assertRaises(RuntimeError):
+            limiter.acquire(estimated_tokens=30, timeout=0.1)
+
+
+class TestAdapterHttpPool(unittest.TestCase):
+    def test_adapters_share_pooled_session(self):
+        tongyi = TongyiAdapter("sk-test", "qwen")
+        zhipu = ZhipuAdapter("key", "glm-4")
+        self.assertIs(tongyi.session, zhipu.session)
+
+    def test_zhipu_uses_connect_and_read_timeouts(self):
+        session = MagicMock()
+        response = session.post.return_value.__enter__.return_value
+        response.json.return_value = {"choices": [{"message": {"content": "ok"}}]}
+
+        with patch("ai.http_pool.Config.AI_CONNECT_TIMEOUT", 3), patch("ai.http_pool.Config.AI_READ_TIMEOUT", 30):
+            result = ZhipuAdapter("key", "glm-4", session=session).call("prompt")
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(session.post.call_args.kwargs["timeout"], (3, 30))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,51 @@
+"""应用启动顺序测试。"""
+import importlib
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from config import Config
+
+
+class TestCreateApp(unittest.TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        root = Path(self._temp.name)
+        self._patches = [
+            patch.object(Config, "OUTPUT_DIR", root / "output"),
+            patch.object(Config, "SCREENSHOT_DIR", root / "shots"),
+            patch.object(Config, "TASK_DATA_DIR", root / "tasks"),
+            patch.object(Config, "SCREENSHOT_WORKER_MODE", "process"),
+            patch.object(Config, "ENABLE_FILE_CLEANUP", True),
+            patch.object(Config, "TASK_AUTO_RESUME", True),
+        ]
+        for p in self._patches:
+            p.start()
+        self.app_module = importlib.import_module("app")
+
+    def tearDown(self):
+        for p in reversed(self._patches):
+            p.stop()
+        self._temp.cleanup()
+
+    def test_child_processes_fork_before_background_threads(self):
+        calls = MagicMock()
+        calls.screenshot.is_available.return_value = True
+        with patch(
+            "generators.screenshot_process.get_screenshot_process_worker", return_value=calls.screenshot
+        ), patch(
+            "generators.doc_render_service.get_doc_render_service", return_value=calls.doc_render
+        ), patch.object(self.app_module, "FileCleanupWorker", return_value=calls.cleanup), patch.object(
+            self.app_module, "task_recovery", calls.recovery
+        ):
+            self.app_module.create_app()
+
+        started = [name for name, _, _ in calls.mock_calls if name.endswith((".start", ".resume_interrupted"))]
+        self.assertEqual(
+            started, ["screenshot.start", "doc_render.start", "cleanup.start", "recovery.resume_interrupted"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""内容寻址产物存储测试。"""
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from config import Config
+from generators.models import ProjectContext
+from generators.orchestrator import Orchestrator
+from utils.artifact_store import ArtifactStore
+from utils.file_manager import FileManager
+
+
+class TestArtifactStore(unittest.TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.root = Path(self._temp.name)
+        self.old_data_dir = Config.TASK_DATA_DIR
+        self.old_output = Config.OUTPUT_DIR
+        Config.TASK_DATA_DIR = self.root / "tasks"
+        Config.OUTPUT_DIR = self.root / "output"
+
+    def tearDown(self):
+        Config.TASK_DATA_DIR = self.old_data_dir
+        Config.OUTPUT_DIR = self.old_output
+        self._temp.cleanup()
+
+    def test_identical_content_stored_once_and_restored(self):
+        store = ArtifactStore(self.root / "artifacts")
+        first = store.put_texts({"a.py": "print(1)\n", "b.py": "print(1)\n"})
+        second = store.put_texts({"c.py": "print(1)\n"})
+        self.assertEqual(len(set(first.values()) | set(second.values())), 1)
+        self.assertEqual(len([p for p in store.root.rglob("*") if p.is_file()]), 1)
+        self.assertIsNone(store.get_texts({"x.py": "0" * 64}))
+
+        page = self.root / "page.html"
+        page.write_text("<html></html>", encoding="utf-8")
+        manifest = store.put_files([str(page), str(self.root / "missing.png")])
+        self.assertEqual(list(manifest), [str(page)])
+        page.unlink()
+        self.assertEqual(store.restore_files(manifest), 1)
+        self.assertEqual(page.read_text(encoding="utf-8"), "<html></html>")
+
+    def test_file_digest_memo_evicts_least_recently_used(self):
+        store = ArtifactStore(self.root / "artifacts", max_file_digests=2)
+        paths = []
+        for name in ("a", "b", "c"):
+            path = self.root / f"{name}.html"
+            path.write_text(name, encoding="utf-8")
+            paths.append(path)
+        store.put_file(paths[0])
+        store.put_file(paths[1])
+        store.put_file(paths[0])
+        store.put_file(paths[2])
+        self.assertEqual([key[0] for key in store._file_digests], [str(paths[0]), str(paths[2])])
+
+    def test_checkpoint_holds_manifest_and_restores_context(self):
+        html = self.root / "output" / "t1" / "work" / "html" / "01_a.html"
+        html.parent.mkdir(parents=True)
+        html.write_text("<html>a</html>", encoding="utf-8")
+        context = ProjectContext(software_name="s", short_name="s", description="d", tech_stack_id="flask_vue")
+        context.generated_code = {f"backend/m{i}.py": "x = 1\n" * 2000 for i in range(20)}
+        context.generated_html_pages = {"A": str(html)}
+
+        orchestrator = Orchestrator(MagicMock())
+        nodes = orchestrator.build_graph()
+        orchestrator._save_checkpoint("t1", nodes, {"features", "code", "html"}, context)
+
+        path = Config.TASK_DATA_DIR / "checkpoints" / "t1_checkpoint.json"
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        self.assertNotIn("generated_code", raw["context"])
+        self.assertLess(path.stat().st_size, 10_000)
+
+        html.unlink()
+        checkpoint = orchestrator._load_checkpoint("t1")
+        self.assertEqual(checkpoint["context"]["generated_code"], context.generated_code)
+        self.assertEqual(checkpoint["completed_nodes"], ["features", "code", "html"])
+        self.assertTrue(html.exists())
+
+    def test_cleanup_removes_unreferenced_artifacts(self):
+        store = ArtifactStore(Config.TASK_DATA_DIR / "artifacts")
+        stale = store.path_for(store.put_text("old"))
+        fresh = store.path_for(store.put_text("new"))
+        past = (datetime.now() - timedelta(hours=5)).timestamp()
+        os.utime(stale, (past, past))
+
+        manager = FileManager(Config.OUTPUT_DIR, self.root / "shots", Config.TASK_DATA_DIR, retention_hours=1)
+        stats = manager.cleanup_once()
+        self.assertEqual(stats["artifact_removed"], 1)
+        self.assertFalse(stale.exists())
+        self.assertTrue(fresh.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
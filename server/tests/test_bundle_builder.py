@@ -0,0 +1,50 @@
+"""下载包构建测试。"""
+import os
+import tempfile
+import unittest
+import zipfile
+from pathlib import Path
+
+from config import Config
+from generators.bundle_builder import BundleBuilder
+
+
+class TestBundleBuilder(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_output = Config.OUTPUT_DIR
+        Config.OUTPUT_DIR = Path(self.temp_dir.name)
+        task_dir = Config.OUTPUT_DIR / "task1"
+        task_dir.mkdir()
+        self.docx = task_dir / "A_源程序.docx"
+        self.docx.write_bytes(b"PK" + b"0" * 2000)
+        self.report = task_dir / "quality_report.md"
+        self.report.write_text("# 报告\n" * 200, encoding="utf-8")
+        self.output_files = {"source": str(self.docx), "quality_report": str(self.report)}
+
+    def tearDown(self):
+        Config.OUTPUT_DIR = self.old_output
+        self.temp_dir.cleanup()
+
+    def test_stores_compressed_formats_and_deflates_text(self):
+        path = BundleBuilder().build("task1", self.output_files)
+        with zipfile.ZipFile(path) as zf:
+            infos = {info.filename: info.compress_type for info in zf.infolist()}
+        self.assertEqual(infos["A_源程序.docx"], zipfile.ZIP_STORED)
+        self.assertEqual(infos["quality_report.md"], zipfile.ZIP_DEFLATED)
+
+    def test_ensure_reuses_fresh_bundle_and_rebuilds_stale(self):
+        builder = BundleBuilder()
+        path = builder.ensure("task1", self.output_files)
+        first_mtime = path.stat().st_mtime_ns
+        self.assertEqual(builder.ensure("task1", self.output_files).stat().st_mtime_ns, first_mtime)
+
+        older = self.report.stat().st_mtime - 10
+        os.utime(path, (older, older))
+        self.assertFalse(builder.is_fresh(path, self.output_files))
+        builder.ensure("task1", self.output_files)
+        self.assertTrue(builder.is_fresh(path, self.output_files))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""任务取消令牌测试。"""
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from ai.adapters.tongyi_adapter import TongyiAdapter
+from ai.ai_client import AIClient
+from ai.circuit_breaker import reset_circuit_breakers
+from ai.rate_limiter import ProviderRateLimiter, reset_rate_limiters
+from generators.models import ProjectContext
+from task.task_manager import TaskManager
+from utils.cancellation import CallCancelledError, CancelToken, OperationCancelledError, get_task_token
+
+
+class _StallingSSEHandler(BaseHTTPRequestHandler):
+    """返回一个数据块后停顿，模拟长时间无输出的流式响应"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        self.wfile.write(b'data: {"output": {"choices": [{"message": {"content": "partial"}}]}}\n\n')
+        self.wfile.flush()
+        time.sleep(5)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCancelToken(unittest.TestCase):
+    def setUp(self):
+        reset_rate_limiters()
+        reset_circuit_breakers()
+
+    def test_callbacks_run_once_and_late_registration_fires_immediately(self):
+        token = CancelToken()
+        calls = []
+        unregister = token.on_cancel(lambda: calls.append("a"))
+        token.on_cancel(lambda: calls.append("b"))
+        unregister()
+        token.cancel("stop")
+        token.cancel("again")
+        token.on_cancel(lambda: calls.append("late"))
+        self.assertEqual(calls, ["b", "late"])
+        self.assertEqual(token.reason, "stop")
+        with self.assertRaises(OperationCancelledError):
+            token.raise_if_cancelled()
+
+    def test_tongyi_stream_is_aborted_mid_read(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StallingSSEHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        session = requests.Session()
+        try:
+            adapter = TongyiAdapter("sk-test", session=session)
+            adapter.api_url = f"http://127.0.0.1:{server.server_address[1]}/generation"
+            token = CancelToken()
+            chunks = []
+            threading.Timer(0.3, token.cancel).start()
+            started = time.monotonic()
+            with self.assertRaises(CallCancelledError):
+                adapter.call("prompt", cancel_token=token, on_chunk=chunks.append)
+            self.assertLess(time.monotonic() - started, 2)
+            self.assertEqual(chunks, ["partial"])
+        finally:
+            session.close()
+            server.shutdown()
+            server.server_close()
+
+    def test_retry_wait_and_limiter_queue_are_interrupted(self):
+        primary = MagicMock()
+        primary.call.side_effect = RuntimeError("down")
+        with patch.object(AIClient, "_create_adapter", side_effect=[primary]):
+            client = AIClient()
+        token = CancelToken()
+        threading.Timer(0.2, token.cancel).start()
+        started = time.monotonic()
+        with self.assertRaises(OperationCancelledError):
+            client.generate("prompt", max_retries=3, use_cache=False, cancel_token=token)
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertEqual(primary.call.call_count, 1)
+
+        limiter = ProviderRateLimiter(max_in_flight=1)
+        limiter.acquire()
+        token = CancelToken()
+        threading.Timer(0.1, token.cancel).start()
+        with self.assertRaises(OperationCancelledError):
+            limiter.acquire(cancel_token=token, timeout=2)
+        self.assertEqual(limiter.stats()["waiting"], 0)
+
+    def test_task_manager_cancel_signals_running_task(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            started = threading.Event()
+            observed = []
+
+            def run(task_id, context):
+                started.set()
+                observed.append(get_task_token(task_id).wait(5))
+
+            tm = TaskManager(max_workers=1, data_dir=temp_dir)
+            context = ProjectContext(software_name="系统A", short_name="系统A", description="d", tech_stack_id="flask_vue")
+            task_id = tm.submit_task(run, context)
+            self.assertTrue(started.wait(5))
+            future = tm._futures[task_id]
+            started_at = time.monotonic()
+            self.assertTrue(tm.cancel_task(task_id))
+            future.result(2)
+            self.assertLess(time.monotonic() - started_at, 1)
+            self.assertEqual(observed, [True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""文档渲染进程池测试。"""
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import Mock
+
+from config import Config
+from generators.doc_render_service import DocRenderService
+from generators.models import ProjectContext
+
+
+class TestDocRenderService(unittest.TestCase):
+    def _context(self) -> ProjectContext:
+        context = ProjectContext(software_name="系统A", short_name="系统A", description="d", tech_stack_id="flask_vue")
+        context.generated_code = {"a.py": "\n".join(f"x = {i}" for i in range(60))}
+        return context
+
+    def test_render_in_worker_process_returns_metrics(self):
+        service = DocRenderService(workers=1, timeout=60)
+        if not service.enabled:
+            self.skipTest("当前平台不支持fork")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            old_output = Config.OUTPUT_DIR
+            Config.OUTPUT_DIR = Path(temp_dir)
+            try:
+                service.start()
+                context = self._context()
+                path = service.render("source", "task_proc", context)
+                self.assertTrue(Path(path).exists())
+                self.assertTrue(Path(path).is_relative_to(Path(temp_dir)))
+                self.assertEqual(context.doc_metrics["source"]["selected_code_lines"], 60)
+            finally:
+                Config.OUTPUT_DIR = old_output
+                service.shutdown()
+
+    def test_discarded_pool_is_not_recreated(self):
+        service = DocRenderService(workers=1, timeout=60)
+        if not service.enabled:
+            self.skipTest("当前平台不支持fork")
+        service.start()
+        service._discard_executor(service._executor)
+        generator = Mock()
+        generator.generate.return_value = "in_thread.docx"
+        try:
+            self.assertEqual(service.render("manual", "task_thread", self._context(), generator), "in_thread.docx")
+            self.assertIsNone(service._executor)
+        finally:
+            service.shutdown()
+
+    def test_disabled_service_renders_in_thread(self):
+        service = DocRenderService(workers=0)
+        generator = Mock()
+        generator.generate.return_value = "in_thread.docx"
+        context = self._context()
+        self.assertEqual(service.render("manual", "task_thread", context, generator), "in_thread.docx")
+        generator.generate.assert_called_once_with("task_thread", context)
+
+
+if __name__ == "__main__":
+    unittest.main()
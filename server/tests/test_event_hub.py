@@ -0,0 +1,101 @@
+"""任务事件广播中心测试。"""
+import json
+import tempfile
+import threading
+import unittest
+
+from generators.models import ProjectContext
+from task.event_hub import TaskEventHub
+from task.task_manager import TaskManager
+
+
+def _frames_data(frames: list[str]) -> list[dict]:
+    result = []
+    for frame in frames:
+        for line in frame.splitlines():
+            if line.startswith("data: "):
+                result.append(json.loads(line[6:]))
+    return result
+
+
+class TestTaskEventHub(unittest.TestCase):
+    def test_replay_from_last_event_id(self):
+        hub = TaskEventHub(heartbeat_seconds=0.05)
+        v1 = hub.publish("t1", {"type": "log", "log": {"message": "a"}})
+        hub.publish("t1", {"type": "log", "log": {"message": "b"}})
+        hub.publish("t1", {"type": "progress", "status": "completed"})
+
+        frames = list(hub.subscribe("t1", lambda: (0, None), last_event_id=str(v1)))
+        data = _frames_data(frames)
+        self.assertEqual(data[0]["log"]["message"], "b")
+        self.assertEqual(data[-1]["status"], "completed")
+
+    def test_snapshot_when_history_evicted(self):
+        hub = TaskEventHub(history_size=2, heartbeat_seconds=0.05)
+        for i in range(5):
+            hub.publish("t1", {"type": "log", "log": {"message": str(i)}})
+        snapshot = {"type": "snapshot", "status": "completed"}
+        frames = list(hub.subscribe("t1", lambda: (hub.current_version("t1"), snapshot), last_event_id="1"))
+        self.assertEqual(_frames_data(frames), [snapshot])
+
+    def test_heartbeat_then_live_event(self):
+        hub = TaskEventHub(heartbeat_seconds=0.05)
+        stream = hub.subscribe("t1", lambda: (hub.current_version("t1"), {"type": "snapshot", "status": "processing"}))
+        self.assertEqual(_frames_data([next(stream)])[0]["type"], "snapshot")
+        self.assertEqual(next(stream), ": ping\n\n")
+        hub.publish("t1", {"type": "progress", "status": "failed"})
+        self.assertEqual(_frames_data(list(stream))[-1]["status"], "failed")
+
+    def test_snapshot_only_subscriptions_leave_no_channel(self):
+        hub = TaskEventHub(heartbeat_seconds=0.05)
+        hub.publish("done", {"type": "progress", "status": "completed"})
+        hub.release("done")
+        finished = {"type": "snapshot", "status": "completed"}
+        for task_id in ("done", "unknown"):
+            for _ in range(3):
+                payload = finished if task_id == "done" else None
+                list(hub.subscribe(task_id, lambda: (hub.current_version(task_id), payload)))
+        self.assertEqual(hub._channels, {})
+
+    def test_slow_subscriber_gets_snapshot_after_eviction(self):
+        hub = TaskEventHub(history_size=2, heartbeat_seconds=0.05)
+        state = {"type": "snapshot", "status": "processing", "progress": 0}
+        stream = hub.subscribe("t1", lambda: (hub.current_version("t1"), dict(state)))
+        self.assertEqual(_frames_data([next(stream)])[0]["progress"], 0)
+
+        for i in range(1, 6):
+            state["progress"] = i * 10
+            hub.publish("t1", {"type": "progress", "progress": i * 10})
+        self.assertEqual(_frames_data([next(stream)]), [{"type": "snapshot", "status": "processing", "progress": 50}])
+        hub.publish("t1", {"type": "progress", "status": "completed"})
+        self.assertEqual(_frames_data(list(stream))[-1]["status"], "completed")
+
+
+class TestTaskManagerEvents(unittest.TestCase):
+    def test_task_manager_publishes_deltas(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            release = threading.Event()
+            tm = TaskManager(max_workers=1, data_dir=temp_dir, event_hub=TaskEventHub(heartbeat_seconds=0.05))
+            context = ProjectContext(software_name="A", short_name="A", description="d", tech_stack_id="flask_vue")
+            task_id = tm.submit_task(lambda tid, ctx: release.wait(5), context)
+
+            stream = tm.subscribe_events(task_id)
+            snapshot = _frames_data([next(stream)])[0]
+            self.assertEqual(snapshot["type"], "snapshot")
+            self.assertNotIn("context", snapshot)
+
+            tm.add_log(task_id, "hello")
+            tm.update_progress(task_id, 1, "生成功能清单", 50, "进行中")
+            tm.complete_task(task_id, {"source": "a.docx"})
+            events = _frames_data(list(stream))
+            self.assertEqual([e["type"] for e in events], ["log", "progress", "progress"])
+            self.assertEqual(events[0]["log"]["message"], "hello")
+            self.assertEqual(events[-1]["output_files"], {"source": "a.docx"})
+
+            release.set()
+            tm.executor.shutdown(wait=True)
+            tm.store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
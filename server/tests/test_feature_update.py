@@ -0,0 +1,94 @@
+"""修改单个功能后增量重新生成测试。"""
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from config import Config
+from generators.feature_generator import FeatureGenerator
+from generators.models import ProjectContext
+from generators.orchestrator import Orchestrator
+from task.task_manager import TaskManager
+
+
+class TestFeatureUpdate(unittest.TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.old_output = Config.OUTPUT_DIR
+        self.old_data_dir = Config.TASK_DATA_DIR
+        Config.OUTPUT_DIR = Path(self._temp.name) / "output"
+        Config.TASK_DATA_DIR = Path(self._temp.name) / "tasks"
+
+    def tearDown(self):
+        Config.OUTPUT_DIR = self.old_output
+        Config.TASK_DATA_DIR = self.old_data_dir
+        self._temp.cleanup()
+
+    def _completed_checkpoint(self, task_id: str) -> Orchestrator:
+        context = ProjectContext(software_name="增量系统", short_name="增量系统", description="d", tech_stack_id="flask_vue")
+        context.feature_list = FeatureGenerator()._default_features("d")[:3]
+        context.generated_code = {"backend/app.py": "app = 1\n"}
+        orchestrator = Orchestrator(MagicMock())
+        nodes = orchestrator.build_graph()
+        orchestrator._save_checkpoint(task_id, nodes, {node.key for node in nodes}, context)
+        return orchestrator
+
+    def _completed_nodes(self, task_id: str) -> list[str]:
+        path = Config.TASK_DATA_DIR / "checkpoints" / f"{task_id}_checkpoint.json"
+        return json.loads(path.read_text(encoding="utf-8"))["completed_nodes"]
+
+    def test_only_dependent_nodes_are_invalidated(self):
+        orchestrator = self._completed_checkpoint("t1")
+
+        context, stale = orchestrator.update_feature("t1", "F02", {"operation_steps": "打开首页查看指标。"})
+        self.assertEqual(stale, ["doc_manual", "quality", "package"])
+        self.assertEqual(context.feature_list[1].operation_steps, "打开首页查看指标。")
+        self.assertEqual(
+            self._completed_nodes("t1"),
+            ["features", "code", "html", "screenshots", "doc_source", "doc_application"],
+        )
+
+        context, stale = orchestrator.update_feature("t1", "F02", {"name": "运营看板", "page_type": "CHART"})
+        self.assertEqual(stale, ["code", "html", "screenshots", "doc_source", "doc_manual", "doc_application", "quality", "package"])
+        self.assertEqual(context.feature_summary, "用户登录、运营看板、数据管理")
+        self.assertEqual(context.feature_list[1].page_type, "chart")
+        self.assertEqual(context.generated_code, {"backend/app.py": "app = 1\n"})
+        self.assertEqual(self._completed_nodes("t1"), ["features"])
+
+        self.assertEqual(orchestrator.update_feature("t1", "F02", {"name": "运营看板"})[1], [])
+        with self.assertRaises(ValueError):
+            orchestrator.update_feature("t1", "F02", {"page_type": "grid"})
+        with self.assertRaises(ValueError):
+            orchestrator.update_feature("t1", "F02", {"name": "用户登录"})
+        with self.assertRaises(LookupError):
+            orchestrator.update_feature("t1", "F09", {"name": "x"})
+
+    def test_rerun_only_accepts_finished_tasks(self):
+        tm = TaskManager(max_workers=1, data_dir=str(Config.TASK_DATA_DIR))
+        try:
+            release = threading.Event()
+            task_id = tm.submit_task(lambda tid, ctx: release.wait(5), ProjectContext("s", "s", "d", "flask_vue"))
+            self.assertFalse(tm.claim_rerun(task_id))
+            self.assertIsNone(tm.rerun_task(task_id, MagicMock(), None))
+            release.set()
+            tm.executor.shutdown(wait=True)
+            tm.complete_task(task_id, {})
+
+            # 同一时间只有一个修改请求能占用重新执行权
+            self.assertTrue(tm.claim_rerun(task_id))
+            self.assertFalse(tm.claim_rerun(task_id))
+            tm.executor = type(tm.executor)(max_workers=1)
+            rerun = MagicMock()
+            tm.rerun_task(task_id, rerun, "ctx").result(timeout=5)
+            tm.release_rerun(task_id)
+            rerun.assert_called_once_with(task_id, "ctx")
+            self.assertEqual(tm.get_task_state(task_id)["status"], "pending")
+        finally:
+            tm.executor.shutdown(wait=True)
+            tm.store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
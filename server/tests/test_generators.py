@@ -2,7 +2,7 @@
 import tempfile
 import unittest
 from pathlib import Path
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 from config import Config
 from generators.code_generator import CodeGenerator
@@ -50,8 +50,10 @@ class TestGenerators(unittest.TestCase):
                     code = CodeGenerator().generate("task1", context)
                 self.assertGreater(len(code), 0)
 
-                with patch.object(HtmlPageGenerator, "_build_page_payload") as mock_payload:
-                    mock_payload.side_effect = lambda n, d, p: {
+                with patch.object(HtmlPageGenerator, "_build_page_payloads", return_value={}), patch.object(
+                    HtmlPageGenerator, "_build_page_payload"
+                ) as mock_payload:
+                    mock_payload.side_effect = lambda n, d, p, **_: {
                         "title": n,
                         "subtitle": d,
                         "menus": ["首页", "列表", "统计"],
@@ -79,6 +81,78 @@ class TestGenerators(unittest.TestCase):
                 Config.OUTPUT_DIR = old_output
                 Config.SCREENSHOT_DIR = old_shots
 
+    def test_concurrent_feature_code_merges_in_feature_order(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            old_output, old_data_dir = Config.OUTPUT_DIR, Config.TASK_DATA_DIR
+            Config.OUTPUT_DIR = Path(temp_dir)
+            Config.TASK_DATA_DIR = Path(temp_dir) / "tasks"
+            try:
+                context = ProjectContext(
+                    software_name="并发系统",
+                    short_name="并发系统",
+                    description="d",
+                    tech_stack_id="flask_vue",
+                    target_lines=3000,
+                )
+                context.feature_list = FeatureGenerator()._default_features("d")[:3]
+                ai_outputs = {
+                    "用户登录": {"backend/shared.py": "login\n", "backend/login.py": "a\n"},
+                    "系统首页": {"backend/shared.py": "home\n"},
+                    "数据管理": {},
+                }
+
+                generator = CodeGenerator()
+                generator.concurrency = 3
+                with patch.object(
+                    CodeGenerator,
+                    "_feature_files_by_ai",
+                    side_effect=lambda ctx, name, desc, existing, **_: ai_outputs[name],
+                ):
+                    code = generator.generate("task_concurrent", context)
+            finally:
+                Config.OUTPUT_DIR, Config.TASK_DATA_DIR = old_output, old_data_dir
+
+        login, home, data = context.feature_list
+        self.assertEqual(code["backend/shared.py"], "login\n")
+        self.assertEqual(login.code_files, ["backend/shared.py", "backend/login.py"])
+        # 路径冲突被丢弃后为空，回退到模板代码
+        self.assertTrue(home.code_files)
+        self.assertNotIn("backend/shared.py", home.code_files)
+        self.assertTrue(all(path in code for path in data.code_files))
+
+    def test_batched_page_payloads_fall_back_per_missing_feature(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            old_output = Config.OUTPUT_DIR
+            Config.OUTPUT_DIR = Path(temp_dir)
+            try:
+                context = ProjectContext(
+                    software_name="批量系统",
+                    short_name="批量系统",
+                    description="d",
+                    tech_stack_id="flask_vue",
+                )
+                context.feature_list = FeatureGenerator()._default_features("d")[:3]
+                generator = HtmlPageGenerator()
+                generator.ai_client = MagicMock()
+                # 第2个功能缺失，第3个条目被截断
+                generator.ai_client.generate.return_value = (
+                    '{"pages": [{"key": "1", "title": "批量标题1"}, {"key": "9", "title": "无关"}, '
+                    '{"key": "3", "title": "截'
+                )
+                with patch.object(
+                    HtmlPageGenerator, "_build_page_payload", side_effect=lambda n, d, p, **_: {"title": f"单独{n}"}
+                ) as single:
+                    html_pages = generator.generate("task_batch", context)
+                pages = {name: Path(path).read_text(encoding="utf-8") for name, path in html_pages.items()}
+            finally:
+                Config.OUTPUT_DIR = old_output
+
+        first, second, third = context.feature_list
+        self.assertEqual(generator.ai_client.generate.call_count, 1)
+        self.assertEqual([c.args[0] for c in single.call_args_list], [second.name, third.name])
+        self.assertIn("批量标题1", pages[first.name])
+        self.assertIn(f"单独{second.name}", pages[second.name])
+
 
 if __name__ == "__main__":
     unittest.main()
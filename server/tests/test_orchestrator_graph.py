@@ -0,0 +1,154 @@
+"""编排器依赖图调度测试。"""
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from config import Config
+from generators.models import ProjectContext
+from generators.orchestrator import Orchestrator, StepFatalError
+
+
+class _FakeTaskManager:
+    def __init__(self):
+        self.logs: list[str] = []
+        self.progress: list[dict] = []
+        self.completed = None
+
+    def add_log(self, task_id: str, message: str):
+        self.logs.append(message)
+
+    def add_warning(self, task_id: str, warning: str):
+        pass
+
+    def update_progress(self, task_id: str, step: int, name: str, progress: int, message: str):
+        self.progress.append({"step": step, "progress": progress, "message": message})
+
+    def is_cancel_requested(self, task_id: str) -> bool:
+        return False
+
+    def complete_task(self, task_id: str, output_files: dict):
+        self.completed = output_files
+
+    def fail_task(self, task_id: str, error: str):
+        pass
+
+    def mark_cancelled(self, task_id: str, message: str):
+        pass
+
+
+class TestOrchestratorGraph(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.old_data_dir = Config.TASK_DATA_DIR
+        Config.TASK_DATA_DIR = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        Config.TASK_DATA_DIR = self.old_data_dir
+        self.temp_dir.cleanup()
+
+    def _context(self) -> ProjectContext:
+        return ProjectContext(software_name="系统A", short_name="系统A", description="d", tech_stack_id="flask_vue")
+
+    def _stub_steps(self, orchestrator: Orchestrator, calls: list[str], html_started: threading.Event):
+        def record(key, wait_for=None):
+            def step(task_id, context):
+                calls.append(key)
+                if key == "html":
+                    html_started.set()
+                if wait_for is not None:
+                    self.assertTrue(wait_for.wait(5), "代码与HTML步骤未并发执行")
+                if key.startswith("doc_"):
+                    orchestrator._set_output_file(context, key[4:], f"{key}.docx")
+            return step
+
+        orchestrator._step1_generate_features = record("features")
+        orchestrator._step2_generate_code = record("code", wait_for=html_started)
+        orchestrator._step3_generate_html = record("html")
+        orchestrator._step4_take_screenshots = record("screenshots")
+        orchestrator._step5_source_doc = record("doc_source")
+        orchestrator._step5_manual_doc = record("doc_manual")
+        orchestrator._step5_application_doc = record("doc_application")
+        orchestrator._step6_quality_gate = record("quality")
+        orchestrator._step7_package = lambda task_id, context: orchestrator.task_manager.complete_task(task_id, context.output_files)
+
+    def test_independent_steps_run_concurrently_with_ordered_progress(self):
+        tm = _FakeTaskManager()
+        orchestrator = Orchestrator(tm)
+        calls: list[str] = []
+        self._stub_steps(orchestrator, calls, threading.Event())
+
+        orchestrator.run("task_dag", self._context())
+
+        self.assertLess(calls.index("html"), calls.index("doc_manual"))
+        self.assertLess(calls.index("screenshots"), calls.index("doc_manual"))
+        self.assertEqual(calls[-1], "quality")
+        self.assertEqual(list(tm.completed), ["source", "manual", "application"])
+        steps = [item["step"] for item in tm.progress]
+        self.assertEqual(steps, sorted(steps))
+        self.assertEqual(sorted(set(steps)), [1, 2, 3, 4, 5, 6, 7])
+
+        checkpoint = json.loads((Config.TASK_DATA_DIR / "checkpoints" / "task_dag_checkpoint.json").read_text(encoding="utf-8"))
+        self.assertEqual(checkpoint["completed_step"], 7)
+        self.assertEqual(len(checkpoint["completed_nodes"]), 9)
+
+    def test_resume_from_legacy_and_partial_checkpoints(self):
+        checkpoint_dir = Config.TASK_DATA_DIR / "checkpoints"
+        checkpoint_dir.mkdir(parents=True)
+        context = self._context()
+        legacy = {"completed_step": 4, "context": context.to_dict()}
+        (checkpoint_dir / "task_old_checkpoint.json").write_text(json.dumps(legacy), encoding="utf-8")
+        partial = {"completed_step": 4, "completed_nodes": ["features", "code", "html", "screenshots", "doc_source"], "context": context.to_dict()}
+        (checkpoint_dir / "task_partial_checkpoint.json").write_text(json.dumps(partial), encoding="utf-8")
+
+        for task_id, expected in (
+            ("task_old", {"doc_source", "doc_manual", "doc_application", "quality"}),
+            ("task_partial", {"doc_manual", "doc_application", "quality"}),
+        ):
+            tm = _FakeTaskManager()
+            orchestrator = Orchestrator(tm)
+            calls: list[str] = []
+            done = threading.Event()
+            done.set()
+            self._stub_steps(orchestrator, calls, done)
+            orchestrator.run(task_id, self._context())
+            self.assertEqual(set(calls), expected)
+            self.assertIsNotNone(tm.completed)
+
+    def test_failed_step_stops_in_flight_siblings(self):
+        tm = _FakeTaskManager()
+        orchestrator = Orchestrator(tm)
+        calls: list[str] = []
+        html_started = threading.Event()
+        self._stub_steps(orchestrator, calls, html_started)
+
+        def failing_code(task_id, context):
+            self.assertTrue(html_started.wait(5))
+            raise StepFatalError("代码生成失败")
+
+        def slow_html(task_id, context):
+            token = orchestrator._cancel_token(task_id)
+            html_started.set()
+            token.wait(5)
+            token.raise_if_cancelled()
+            calls.append("html")
+
+        orchestrator._step2_generate_code = failing_code
+        orchestrator._step3_generate_html = slow_html
+
+        started = time.monotonic()
+        with self.assertRaises(StepFatalError):
+            orchestrator.run("task_fail_fast", self._context())
+        self.assertLess(time.monotonic() - started, 3)
+        self.assertNotIn("html", calls)
+        checkpoint = json.loads(
+            (Config.TASK_DATA_DIR / "checkpoints" / "task_fail_fast_checkpoint.json").read_text(encoding="utf-8")
+        )
+        self.assertEqual(checkpoint["completed_nodes"], ["features"])
+        self.assertIsNone(orchestrator._graph_token)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,6 +8,7 @@ from config import Config
 from generators.consistency_checker import ConsistencyReport
 from generators.models import Feature, ProjectContext
 from generators.orchestrator import Orchestrator, StepFatalError
+from generators.unit_checkpoint import UnitCheckpoint, file_digest, unit_key
 
 
 class _FakeTaskManager:
@@ -128,6 +129,56 @@ class TestOrchestratorQualityGate(unittest.TestCase):
             finally:
                 Config.OUTPUT_DIR = old_output
 
+    def test_quality_retry_recaptures_only_failing_features(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            old_output = Config.OUTPUT_DIR
+            old_data_dir = Config.TASK_DATA_DIR
+            Config.OUTPUT_DIR = Path(temp_dir)
+            Config.TASK_DATA_DIR = Path(temp_dir) / "tasks"
+            try:
+                tm = _FakeTaskManager()
+                orchestrator = Orchestrator(tm)
+                context = self._base_context()
+                context.feature_list.append(
+                    Feature(name="订单管理", description="d", page_type="list", feature_id="F02", manual_section="4.4.1", code_files=["b.py"])
+                )
+                context.doc_metrics["source"]["traceability"]["feature_to_files"]["F02"] = ["b.py"]
+                context.doc_metrics["manual"]["traceability"]["F02"] = {"manual_section": "4.4.1"}
+                context.doc_metrics["manual"]["missing_screenshots"] = ["订单管理"]
+                order_html = Path(temp_dir) / "order.html"
+                order_html.write_text("<html>order</html>", encoding="utf-8")
+                context.generated_html_pages = {"用户登录": "login.html", "订单管理": str(order_html)}
+                context.screenshots = {"用户登录": "real.png"}
+
+                def rebuild_manual(task_id, ctx):
+                    ctx.doc_metrics["manual"]["missing_screenshots"] = [f.name for f in ctx.feature_list if not f.screenshot_path]
+                    return "manual_retry.docx"
+
+                orchestrator.consistency_checker.build_quality_report_md = Mock(return_value="# report\n")
+                def recapture(task_id, pages, on_page=None, cancel_token=None):
+                    on_page("订单管理", "order.png")
+                    return {"订单管理": "order.png"}
+
+                orchestrator.screenshot_service.take_screenshots = Mock(side_effect=recapture)
+                orchestrator.manual_doc_generator.generate = Mock(side_effect=rebuild_manual)
+
+                first = orchestrator.consistency_checker.check(context)
+                self.assertEqual(first.failed_features("MAN-002"), ["订单管理"])
+                orchestrator._step6_quality_gate("task_retry_one", context)
+
+                take = orchestrator.screenshot_service.take_screenshots
+                take.assert_called_once()
+                self.assertEqual(take.call_args.args, ("task_retry_one", {"订单管理": str(order_html)}))
+                self.assertIn("cancel_token", take.call_args.kwargs)
+                self.assertEqual(context.screenshots, {"用户登录": "real.png", "订单管理": "order.png"})
+                self.assertEqual(context.output_files["manual"], "manual_retry.docx")
+                # 重截的页面记入截图子检查点，恢复时不必再截
+                key = unit_key("订单管理", file_digest(order_html))
+                self.assertEqual(UnitCheckpoint("task_retry_one", "screenshot").load(), {key: "order.png"})
+            finally:
+                Config.OUTPUT_DIR = old_output
+                Config.TASK_DATA_DIR = old_data_dir
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,67 @@
+"""AI响应缓存测试。"""
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from ai.ai_client import AIClient
+from ai.circuit_breaker import reset_circuit_breakers
+from ai.rate_limiter import reset_rate_limiters
+from ai.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        reset_rate_limiters()
+        reset_circuit_breakers()
+
+    def test_generate_hits_cache_and_bypass_flag(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ResponseCache(Path(temp_dir) / "ai_cache")
+            primary = MagicMock()
+            primary.call.return_value = "answer"
+
+            with patch.object(AIClient, "_create_adapter", side_effect=[primary]):
+                client = AIClient(cache=cache)
+                self.assertEqual(client.generate("p"), "answer")
+                self.assertEqual(client.generate("p"), "answer")
+                self.assertEqual(primary.call.call_count, 1)
+
+                client.generate("p", use_cache=False)
+                self.assertEqual(primary.call.call_count, 2)
+
+            stats = cache.stats()
+            self.assertEqual(stats["hits"], 1)
+            self.assertEqual(stats["misses"], 1)
+
+    def test_disk_entry_survives_new_instance_and_expires(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            key = ResponseCache.make_key("tongyi", "qwen", "prompt")
+            ResponseCache(temp_dir).put(key, "value", "tongyi", "qwen")
+
+            reopened = ResponseCache(temp_dir, memory_entries=0)
+            self.assertEqual(reopened.get(key), "value")
+            self.assertEqual(reopened.stats()["disk_hits"], 1)
+
+            expired = ResponseCache(temp_dir, ttl_seconds=0.01)
+            time.sleep(0.02)
+            self.assertIsNone(expired.get(key))
+
+    def test_evict_keeps_most_recent_entries(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = ResponseCache(temp_dir, max_entries=2, memory_entries=0)
+            keys = [ResponseCache.make_key("p", "m", str(i)) for i in range(3)]
+            for i, key in enumerate(keys):
+                cache.put(key, str(i))
+                stamp = time.time() - 100 + i
+                os.utime(cache._path(key), (stamp, stamp))
+
+            self.assertEqual(cache.evict(), 1)
+            self.assertIsNone(cache.get(keys[0]))
+            self.assertEqual(cache.get(keys[2]), "2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,94 @@
 """截图服务降级测试。"""
+import asyncio
 import tempfile
+import threading
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 from config import Config
+from generators.browser_pool import BrowserWorker
+from generators.screenshot_process import ScreenshotProcessError, ScreenshotProcessWorker
 from generators.screenshot_service import ScreenshotService
 
 
+class _FakeContext:
+    async def close(self):
+        pass
+
+
+class _FakePage:
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    async def goto(self, url, **kwargs):
+        self.stats["active"] += 1
+        self.stats["peak"] = max(self.stats["peak"], self.stats["active"])
+        try:
+            await asyncio.sleep(10 if "hang" in url else 0.05)
+        finally:
+            self.stats["active"] -= 1
+
+    async def wait_for_timeout(self, ms):
+        pass
+
+    async def screenshot(self, path, **kwargs):
+        Path(path).write_bytes(b"png")
+
+    async def close(self):
+        pass
+
+
+class _FakePageContext:
+    def __init__(self):
+        self.stats = {"active": 0, "peak": 0}
+
+    async def new_page(self):
+        return _FakePage(self.stats)
+
+    async def close(self):
+        pass
+
+
+class _FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        return _FakeContext()
+
+    async def close(self):
+        self.connected = False
+
+
+class _FakeBrowserWorker(BrowserWorker):
+    def __init__(self):
+        super().__init__(max_pages=2)
+        self.launched: list[_FakeBrowser] = []
+
+    @staticmethod
+    def is_available() -> bool:
+        return True
+
+    async def _launch_browser(self):
+        browser = _FakeBrowser()
+        self.launched.append(browser)
+        return browser
+
+
+class _FakePageBrowser(_FakeBrowser):
+    async def new_context(self, **kwargs):
+        return _FakePageContext()
+
+
+class _FakePageBrowserWorker(_FakeBrowserWorker):
+    async def _launch_browser(self):
+        return _FakePageBrowser()
+
+
 class TestScreenshotService(unittest.TestCase):
     def test_fallback_placeholder_when_html_missing(self):
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -21,6 +103,126 @@ class TestScreenshotService(unittest.TestCase):
             finally:
                 Config.SCREENSHOT_DIR = old_shots
 
+    def test_capture_pages_concurrently_with_isolated_timeout(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            old_shots = Config.SCREENSHOT_DIR
+            Config.SCREENSHOT_DIR = Path(temp_dir) / "shots"
+            try:
+                service = ScreenshotService(page_concurrency=2)
+                service._page_budget = lambda: 0.5
+                html_files = {f"功能{i}": str(Path(temp_dir) / f"page{i}.html") for i in range(4)}
+                html_files["功能卡死"] = str(Path(temp_dir) / "hang.html")
+                context = _FakePageContext()
+
+                async def run():
+                    return await service._capture_pages("task1", html_files, context, asyncio.Semaphore(8))
+
+                result = asyncio.run(run())
+                self.assertEqual(list(result), list(html_files))
+                self.assertEqual(context.stats["peak"], 2)
+                self.assertIn("placeholder", Path(result["功能卡死"]).name)
+                self.assertNotIn("placeholder", Path(result["功能0"]).name)
+            finally:
+                Config.SCREENSHOT_DIR = old_shots
+
+    def test_job_timeout_starts_at_slot_and_keeps_captured_pages(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            old_shots = Config.SCREENSHOT_DIR
+            Config.SCREENSHOT_DIR = Path(temp_dir) / "shots"
+            worker = _FakePageBrowserWorker()
+            worker.max_pages = 1
+            try:
+                service = ScreenshotService(browser_worker=worker, page_concurrency=1, worker_mode="thread")
+                service._page_budget = lambda: 10
+                service._capture_timeout = lambda page_count: 0.4
+                holding = threading.Event()
+
+                async def hold_slot(context, page_slots):
+                    async with page_slots:
+                        holding.set()
+                        await asyncio.sleep(0.6)
+
+                blocker = threading.Thread(target=worker.submit, args=(hold_slot,))
+                blocker.start()
+                self.assertTrue(holding.wait(5))
+                html_files = {"功能0": str(Path(temp_dir) / "page0.html"), "功能卡死": str(Path(temp_dir) / "hang.html")}
+                streamed = []
+                result = service.take_screenshots("task1", html_files, on_page=lambda n, p: streamed.append(n))
+                blocker.join(5)
+
+                # 排队等待全局名额的0.6秒不计入0.4秒的任务超时
+                self.assertEqual(streamed, ["功能0"])
+                self.assertNotIn("placeholder", Path(result["功能0"]).name)
+                self.assertIn("placeholder", Path(result["功能卡死"]).name)
+            finally:
+                worker.stop()
+                Config.SCREENSHOT_DIR = old_shots
+
+
+class TestBrowserWorker(unittest.TestCase):
+    def test_reuses_warm_browser_and_restarts_after_crash(self):
+        worker = _FakeBrowserWorker()
+
+        async def job(context, page_slots):
+            async with page_slots:
+                return isinstance(context, _FakeContext)
+
+        try:
+            self.assertTrue(worker.submit(job, timeout=5))
+            self.assertTrue(worker.submit(job, timeout=5))
+            self.assertEqual(len(worker.launched), 1)
+
+            worker.launched[0].connected = False
+            self.assertTrue(worker.submit(job, timeout=5))
+            self.assertEqual(len(worker.launched), 2)
+            self.assertEqual(worker.health_check()["restart_count"], 1)
+        finally:
+            worker.stop()
+
+
+def _fake_take_screenshots(self, task_id, html_files, on_page=None, cancel_token=None):
+    shots = {}
+    for name in html_files:
+        shots[name] = f"{task_id}_{name}.png"
+        if on_page:
+            on_page(name, shots[name])
+    return shots
+
+
+class TestScreenshotProcessWorker(unittest.TestCase):
+    def test_streams_pages_and_falls_back_in_process_after_exit(self):
+        if not ScreenshotProcessWorker.is_available():
+            self.skipTest("当前平台不支持fork")
+        worker = ScreenshotProcessWorker(max_jobs=2)
+        streamed = []
+        try:
+            # 子进程fork时继承补丁，不依赖真实浏览器
+            with patch.object(ScreenshotService, "take_screenshots", _fake_take_screenshots):
+                threads = threading.active_count()
+                worker.start()
+                # start()不在主进程留下线程，随后的文档渲染进程池仍在单线程状态下fork
+                self.assertEqual(threading.active_count(), threads)
+                result = worker.capture("t1", {"登录": "a.html", "列表": "b.html"}, timeout=10, on_page=lambda n, p: streamed.append(n))
+                self.assertEqual(result, {"登录": "t1_登录.png", "列表": "t1_列表.png"})
+                self.assertEqual(streamed, ["登录", "列表"])
+
+            worker._process.kill()
+            worker._process.join(5)
+            # 运行期间不再重新fork子进程
+            worker.start()
+            with self.assertRaises(ScreenshotProcessError):
+                worker.capture("t2", {"首页": "c.html"}, timeout=10)
+            self.assertTrue(worker.health_check()["exited"])
+
+            service = ScreenshotService(worker_mode="process")
+            with patch("generators.screenshot_process.get_screenshot_process_worker", return_value=worker), patch.object(
+                ScreenshotService, "_take_in_thread", return_value={"首页": "thread.png"}
+            ) as in_thread:
+                self.assertEqual(service.take_screenshots("t2", {"首页": "c.html"}), {"首页": "thread.png"})
+            in_thread.assert_called_once()
+        finally:
+            worker.stop()
+
 
 if __name__ == "__main__":
     unittest.main()
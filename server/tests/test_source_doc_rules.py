@@ -69,6 +69,34 @@ class TestSourceDocRules(unittest.TestCase):
         self.assertLessEqual(metrics.get("estimated_pages", 0), 70)
         self.assertTrue(metrics.get("copyright", {}).get("has_notice"))
 
+    def test_code_listing_layout(self):
+        context = ProjectContext(
+            software_name="C",
+            short_name="C",
+            description="d",
+            tech_stack_id="flask_vue",
+            target_lines=5000,
+        )
+        context.generated_code = {"a.py": "\n".join([f"\tvalue = '<{i}>' & 1" for i in range(120)])}
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            old_output = Config.OUTPUT_DIR
+            Config.OUTPUT_DIR = Path(temp_dir)
+            try:
+                from docx import Document
+
+                doc = Document(SourceDocGenerator().generate("t3", context))
+            finally:
+                Config.OUTPUT_DIR = old_output
+
+        code_paragraphs = [p for p in doc.paragraphs if p.style.name == SourceDocGenerator.CODE_STYLE_NAME]
+        self.assertEqual(len(code_paragraphs), 120)
+        self.assertEqual(code_paragraphs[0].text, "0001  \tvalue = '<0>' & 1")
+        self.assertEqual(code_paragraphs[0].style.font.name, "Courier New")
+        self.assertEqual(code_paragraphs[0].style.font.size.pt, 10.5)
+        page_breaks = [p for p in doc.paragraphs if 'w:type="page"' in p._p.xml]
+        self.assertEqual(len(page_breaks), 2)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,81 @@
+"""流式JSON解析测试。"""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from ai.stream_json import StreamingFilesParser, loads_first_object, parse_files_prefix
+from generators.code_generator import CodeGenerator, _StreamedCodeWriter
+from generators.models import ProjectContext
+
+
+class TestStreamingFilesParser(unittest.TestCase):
+    def setUp(self):
+        self.files = [
+            {"path": "backend/a.py", "content": 'def f():\n    return {"k": "}]"}\n'},
+            {"path": "frontend/b.vue", "content": "<template>\\\"{[</template>"},
+        ]
+        self.raw = "```json\n" + json.dumps({"summary": "files", "files": self.files}, ensure_ascii=False) + "\n```"
+
+    def test_entries_emitted_as_soon_as_they_close(self):
+        emitted = []
+        parser = StreamingFilesParser(on_file=lambda item: emitted.append((item["path"], len(fed))))
+        fed: list[str] = []
+        for ch in self.raw:
+            fed.append(ch)
+            parser.feed(ch)
+
+        self.assertEqual(parser.close(), self.files)
+        self.assertEqual([path for path, _ in emitted], ["backend/a.py", "frontend/b.vue"])
+        # 第一个条目在第二个条目开始前就已回调
+        self.assertLess(emitted[0][1], self.raw.index("frontend/b.vue"))
+
+    def test_truncated_response_keeps_complete_entries(self):
+        cut = self.raw.index("frontend/b.vue") + 5
+        self.assertEqual(parse_files_prefix(self.raw[:cut]), self.files[:1])
+        with self.assertRaises(json.JSONDecodeError):
+            loads_first_object(self.raw[:cut])
+
+    def test_reset_discards_partial_attempt(self):
+        parser = StreamingFilesParser()
+        parser.feed(self.raw[: self.raw.index("frontend/b.vue")])
+        parser.reset()
+        parser.feed(json.dumps({"files": self.files[1:]}))
+        self.assertEqual(parser.close(), self.files)
+
+    def test_code_generator_uses_partial_files(self):
+        cut = self.raw.index("frontend/b.vue")
+        files = CodeGenerator()._parse_ai_files(self.raw[:cut], existing_files=[])
+        self.assertEqual(list(files), ["backend/a.py"])
+        files = CodeGenerator()._parse_ai_files(self.raw, ["backend/a.py"])
+        self.assertEqual(files, {"frontend/b.vue": self.files[1]["content"]})
+
+    def test_code_generator_persists_files_while_streaming(self):
+        seen_on_disk = []
+
+        def fake_generate(prompt, max_retries=3, use_cache=True, kind=None, stream=None, cancel_token=None):
+            stream.reset()
+            split = self.raw.index("frontend/b.vue")
+            stream.feed(self.raw[:split])
+            seen_on_disk.append((code_dir / "backend/a.py").exists())
+            stream.feed(self.raw[split:])
+            return self.raw
+
+        context = ProjectContext(software_name="s", short_name="s", description="d", tech_stack_id="flask_vue")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            code_dir = Path(temp_dir) / "work" / "code"
+            writer = _StreamedCodeWriter(code_dir)
+            generator = CodeGenerator()
+            generator.ai_client = MagicMock()
+            generator.ai_client.generate.side_effect = fake_generate
+            files = generator._feature_files_by_ai(context, "f", "d", [], on_file=writer.write)
+
+        # 第一个文件在响应结束前已落盘
+        self.assertEqual(seen_on_disk, [True])
+        self.assertEqual(writer.written, files)
+        self.assertEqual(writer.lines, sum(c.count("\n") + 1 for c in files.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""中断任务恢复测试。"""
+import tempfile
+import threading
+import unittest
+
+from generators.models import ProjectContext
+from task.recovery import TaskRecovery
+from task.task_manager import TaskManager
+
+
+def _context(name: str) -> ProjectContext:
+    return ProjectContext(software_name=name, short_name=name, description="d", tech_stack_id="flask_vue")
+
+
+class TestTaskRecovery(unittest.TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.data_dir = self._temp.name
+        self.managers = []
+
+    def tearDown(self):
+        for tm in self.managers:
+            tm.executor.shutdown(wait=True)
+            tm.store.close()
+        self._temp.cleanup()
+
+    def _manager(self, max_workers=2) -> TaskManager:
+        tm = TaskManager(max_workers=max_workers, data_dir=self.data_dir)
+        self.managers.append(tm)
+        return tm
+
+    def _interrupted_tasks(self, names) -> list[str]:
+        """模拟进程退出：任务提交后未结束，新的TaskManager从存储加载"""
+        release = threading.Event()
+        tm = self._manager()
+        task_ids = [tm.submit_task(lambda tid, ctx: release.wait(5), _context(name)) for name in names]
+        release.set()
+        tm.executor.shutdown(wait=True)
+        for task_id in task_ids:
+            tm.store.update_fields(task_id, {"status": "processing"})
+        return task_ids
+
+    def test_boot_resumes_interrupted_tasks_one_at_a_time(self):
+        task_ids = self._interrupted_tasks(["系统A", "系统B"])
+        tm = self._manager()
+        self.assertEqual([tm.get_task_state(tid)["status"] for tid in task_ids], ["interrupted"] * 2)
+
+        first_running = threading.Event()
+        release_first = threading.Event()
+        finished = threading.Event()
+        seen = []
+
+        def run(task_id, context):
+            seen.append((task_id, context.software_name, len(recovery.stats()["active"])))
+            if len(seen) == 1:
+                first_running.set()
+                release_first.wait(5)
+            else:
+                finished.set()
+            tm.complete_task(task_id, {})
+
+        recovery = TaskRecovery(tm, run_factory=lambda: run, max_concurrent=1)
+        self.assertEqual(recovery.resume_interrupted(), task_ids)
+        self.assertTrue(first_running.wait(5))
+        self.assertEqual(recovery.stats()["queued"], [task_ids[1]])
+        self.assertEqual(tm.get_task_state(task_ids[1])["status"], "interrupted")
+
+        release_first.set()
+        self.assertTrue(finished.wait(5))
+        self.assertEqual([(tid, n) for tid, n, _ in seen], [(task_ids[0], "系统A"), (task_ids[1], "系统B")])
+        self.assertEqual([active for _, _, active in seen], [1, 1])
+        self.assertEqual(tm.get_task_state(task_ids[0])["resume_count"], 1)
+
+    def test_attempt_cap_and_cancel_skip_resume(self):
+        task_ids = self._interrupted_tasks(["系统A", "系统B"])
+        tm = self._manager()
+        tm.store.update_fields(task_ids[0], {"resume_count": 3})
+        tm = self._manager()
+        self.assertTrue(tm.cancel_task(task_ids[1]))
+        self.assertEqual(tm.get_task_state(task_ids[1])["status"], "cancelled")
+
+        recovery = TaskRecovery(tm, run_factory=lambda: self.fail, max_concurrent=1, max_attempts=3)
+        self.assertEqual(recovery.resume_interrupted(), [])
+        accepted, _ = recovery.resume(task_ids[1])
+        self.assertFalse(accepted)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""任务存储后端测试。"""
+import json
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from generators.models import ProjectContext
+from task.task_manager import TaskManager
+from task.task_store import TaskStore
+
+
+def _context() -> ProjectContext:
+    context = ProjectContext(
+        software_name="系统A",
+        short_name="系统A",
+        description="d",
+        tech_stack_id="flask_vue",
+    )
+    context.generated_code = {"a.py": "print(1)\n" * 100}
+    return context
+
+
+class TestTaskStore(unittest.TestCase):
+    def _run_and_reload(self, backend: str):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            started = threading.Event()
+            release = threading.Event()
+
+            def run(task_id, context):
+                started.set()
+                release.wait(5)
+
+            tm = TaskManager(max_workers=1, data_dir=temp_dir, store_backend=backend)
+            task_id = tm.submit_task(run, _context())
+            self.assertTrue(started.wait(5))
+            tm.update_progress(task_id, 2, "生成源代码", 50, "进行中")
+            tm.add_log(task_id, "日志1")
+            tm.add_log(task_id, "日志2")
+            tm.add_warning(task_id, "警告1")
+
+            reloaded = TaskManager(max_workers=1, data_dir=temp_dir, store_backend=backend)
+            state = reloaded.get_task_state(task_id)
+            context = reloaded.get_task_context(task_id)
+            self.assertEqual(context["generated_code"]["a.py"], "print(1)\n" * 100)
+            release.set()
+            tm.executor.shutdown(wait=True)
+            tm.store.close()
+            reloaded.store.close()
+            return state
+
+    def test_sqlite_store_roundtrip_marks_interrupted(self):
+        state = self._run_and_reload("sqlite")
+        self.assertEqual(state["status"], "interrupted")
+        self.assertEqual(state["current_step"], 2)
+        self.assertEqual([log["message"] for log in state["logs"]], ["日志1", "日志2"])
+        self.assertEqual(state["warnings"], ["警告1"])
+        self.assertEqual(state["software_name"], "系统A")
+        self.assertNotIn("context", state)
+
+    def test_json_store_roundtrip_without_duplicate_logs(self):
+        state = self._run_and_reload("json")
+        self.assertEqual(state["status"], "interrupted")
+        self.assertEqual([log["message"] for log in state["logs"]], ["日志1", "日志2"])
+        self.assertEqual(state["warnings"], ["警告1"])
+
+    def test_json_store_splits_legacy_embedded_context(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            legacy = {
+                "task_id": "old1",
+                "status": "completed",
+                "current_step": 7,
+                "logs": [],
+                "warnings": [],
+                "errors": [],
+                "output_files": {},
+                "context": _context().to_dict(),
+            }
+            Path(temp_dir, "old1.json").write_text(json.dumps(legacy, ensure_ascii=False), encoding="utf-8")
+
+            tm = TaskManager(max_workers=1, data_dir=temp_dir, store_backend="json")
+            state = tm.get_task_state("old1")
+            self.assertNotIn("context", state)
+            self.assertEqual(state["software_name"], "系统A")
+            self.assertIn("a.py", tm.get_task_context("old1")["generated_code"])
+            tm.executor.shutdown(wait=True)
+
+    def test_sqlite_imports_legacy_json_records_once(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            json_tm = TaskManager(max_workers=1, data_dir=temp_dir, store_backend="json")
+            task_id = json_tm.submit_task(lambda tid, ctx: None, _context())
+            json_tm.executor.shutdown(wait=True)
+            json_tm.add_log(task_id, "旧日志")
+            json_tm.complete_task(task_id, {"source": "a.docx"})
+
+            tm = TaskManager(max_workers=1, data_dir=temp_dir, store_backend="sqlite")
+            state = tm.get_task_state(task_id)
+            self.assertEqual(state["status"], "completed")
+            self.assertEqual(state["output_files"], {"source": "a.docx"})
+            self.assertIn("旧日志", [log["message"] for log in state["logs"]])
+            self.assertIn("a.py", tm.get_task_context(task_id)["generated_code"])
+
+            # 导入只在首次启动执行，清理后的任务不会被重新导入
+            tm.store.purge_expired(datetime.now() + timedelta(hours=1))
+            tm.store.close()
+            reloaded = TaskManager(max_workers=1, data_dir=temp_dir, store_backend="sqlite")
+            self.assertIsNone(reloaded.get_task_state(task_id))
+            reloaded.store.close()
+
+    def test_sqlite_purge_expired(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tm = TaskManager(max_workers=1, data_dir=temp_dir)
+            task_id = tm.submit_task(lambda tid, ctx: None, _context())
+            tm.executor.shutdown(wait=True)
+            # 排队中的任务不清理
+            self.assertEqual(tm.store.purge_expired(datetime.now() + timedelta(hours=1)), 0)
+
+            # 创建已久但最近仍有写入（如恢复后重新执行）的任务不清理
+            tm.store.update_fields(task_id, {"created_at": (datetime.now() - timedelta(days=2)).isoformat()})
+            tm.complete_task(task_id, {})
+            self.assertEqual(tm.store.purge_expired(datetime.now() - timedelta(hours=1)), 0)
+
+            removed = tm.store.purge_expired(datetime.now() + timedelta(hours=1))
+            self.assertEqual(removed, 1)
+            self.assertIsNone(tm.store.load_task(task_id))
+            tm.store.close()
+
+    def test_incomplete_backend_fails_on_creation(self):
+        class PartialStore(TaskStore):
+            def save_task(self, state: dict):
+                pass
+
+        with self.assertRaises(TypeError):
+            PartialStore()
+
+
+if __name__ == "__main__":
+    unittest.main()
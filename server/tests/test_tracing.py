@@ -0,0 +1,93 @@
+"""任务耗时追踪测试。"""
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from ai.ai_client import AIClient
+from ai.circuit_breaker import reset_circuit_breakers
+from ai.rate_limiter import reset_rate_limiters
+from config import Config
+from generators.models import ProjectContext
+from generators.orchestrator import Orchestrator
+from task.task_manager import TaskManager
+from utils.cancellation import get_task_token
+from utils.tracing import TaskTracer, get_tracer
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        reset_rate_limiters()
+        reset_circuit_breakers()
+        self._temp = tempfile.TemporaryDirectory()
+        self.old_output = Config.OUTPUT_DIR
+        self.old_data_dir = Config.TASK_DATA_DIR
+        Config.OUTPUT_DIR = Path(self._temp.name) / "output"
+        Config.TASK_DATA_DIR = Path(self._temp.name) / "tasks"
+
+    def tearDown(self):
+        Config.OUTPUT_DIR = self.old_output
+        Config.TASK_DATA_DIR = self.old_data_dir
+        self._temp.cleanup()
+
+    def test_task_trace_covers_queue_steps_and_ai_calls(self):
+        primary = MagicMock()
+        primary.call.side_effect = [RuntimeError("x"), "ok"]
+        with patch.object(AIClient, "_create_adapter", side_effect=[primary]):
+            client = AIClient()
+
+        tm = TaskManager(max_workers=1, data_dir=str(Config.TASK_DATA_DIR))
+        orchestrator = Orchestrator(tm)
+        for attr in (
+            "_step1_generate_features",
+            "_step3_generate_html",
+            "_step4_take_screenshots",
+            "_step5_source_doc",
+            "_step5_manual_doc",
+            "_step5_application_doc",
+            "_step6_quality_gate",
+        ):
+            setattr(orchestrator, attr, lambda task_id, context: None)
+        orchestrator._step2_generate_code = lambda task_id, context: client.generate(
+            "写代码", max_retries=2, use_cache=False, kind="code", cancel_token=get_task_token(task_id)
+        )
+        orchestrator._step7_package = lambda task_id, context: tm.complete_task(task_id, {})
+        try:
+            with patch.object(AIClient, "_sleep", return_value=None):
+                task_id = tm.submit_task(orchestrator.run, ProjectContext("s", "s", "d", "flask_vue"))
+                tm.executor.shutdown(wait=True)
+        finally:
+            tm.store.close()
+
+        self.assertEqual(tm.get_task_state(task_id)["status"], "completed")
+        self.assertIsNone(get_tracer(task_id))
+        trace = json.loads((Config.OUTPUT_DIR / task_id / "trace.json").read_text(encoding="utf-8"))
+        spans = {e["name"]: e for e in trace["traceEvents"] if e["ph"] == "X"}
+        self.assertTrue({"排队等待", "任务执行", "生成源代码", "打包下载"} <= set(spans))
+        ai = spans["AI调用:code"]
+        self.assertEqual(ai["args"]["retries"], 1)
+        self.assertEqual(ai["args"]["prompt_bytes"], len("写代码".encode("utf-8")))
+        self.assertEqual(ai["args"]["response_bytes"], 2)
+        step = spans["生成源代码"]
+        self.assertLessEqual(step["ts"], ai["ts"])
+        self.assertGreaterEqual(step["ts"] + step["dur"], ai["ts"] + ai["dur"])
+
+    def test_overlapping_spans_and_event_cap(self):
+        tracer = TaskTracer("t1", max_events=3)
+        now = time.perf_counter()
+        tracer.add_span("截图:A", "screenshot", now, now + 0.2, overlap=True)
+        tracer.add_span("截图:B", "screenshot", now + 0.1, now + 0.3, overlap=True)
+        with tracer.span("步骤", "step"):
+            pass
+
+        trace = tracer.to_chrome()
+        events = [e for e in trace["traceEvents"] if e["ph"] != "M"]
+        self.assertEqual(sorted((e["name"], e["ph"]) for e in events), [("截图:A", "b"), ("截图:A", "e"), ("步骤", "X")])
+        self.assertEqual(trace["otherData"]["dropped_spans"], 1)
+        self.assertIn("thread_name", [e["name"] for e in trace["traceEvents"] if e["ph"] == "M"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+"""步骤内子检查点恢复测试。"""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, Mock, patch
+
+from config import Config
+from generators.code_generator import CodeGenerator
+from generators.feature_generator import FeatureGenerator
+from generators.html_page_generator import HtmlPageGenerator
+from generators.models import ProjectContext
+from generators.orchestrator import Orchestrator
+from generators.unit_checkpoint import UnitCheckpoint, unit_key
+from utils.artifact_store import get_artifact_store
+from utils.cancellation import OperationCancelledError
+
+
+class _Crash(OperationCancelledError):
+    """模拟进程在子任务中途退出"""
+
+
+class TestUnitCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.old_output = Config.OUTPUT_DIR
+        self.old_data_dir = Config.TASK_DATA_DIR
+        Config.OUTPUT_DIR = Path(self._temp.name)
+        Config.TASK_DATA_DIR = Path(self._temp.name) / "tasks"
+        self.context = ProjectContext(software_name="恢复系统", short_name="恢复系统", description="d", tech_stack_id="flask_vue")
+        self.context.feature_list = FeatureGenerator()._default_features("d")[:3]
+
+    def tearDown(self):
+        Config.OUTPUT_DIR = self.old_output
+        Config.TASK_DATA_DIR = self.old_data_dir
+        self._temp.cleanup()
+
+    def test_torn_last_line_is_ignored(self):
+        units = UnitCheckpoint("t1", "code")
+        units.record("a", {"x.py": "1"})
+        with units.path.open("a", encoding="utf-8") as f:
+            f.write('{"key": "b", "da')
+        self.assertEqual(units.load(), {"a": {"x.py": "1"}})
+
+    def test_code_resume_only_requests_unfinished_features(self):
+        def fake_generate(prompt, calls, crash_at=None, **_):
+            calls.append(prompt)
+            if len(calls) == crash_at:
+                raise _Crash("进程退出")
+            return json.dumps({"files": [{"path": f"backend/f{len(calls)}_{crash_at}.py", "content": "x = 1\n"}]})
+
+        first_calls, second_calls = [], []
+        generator = CodeGenerator()
+        generator.concurrency = 1
+        generator.ai_client = MagicMock()
+        generator.ai_client.generate.side_effect = lambda p, **kw: fake_generate(p, first_calls, crash_at=2)
+        with self.assertRaises(_Crash):
+            generator.generate("task_code", self.context)
+
+        generator = CodeGenerator()
+        generator.concurrency = 1
+        generator.ai_client = MagicMock()
+        generator.ai_client.generate.side_effect = lambda p, **kw: fake_generate(p, second_calls)
+        code = generator.generate("task_code", self.context)
+
+        self.assertEqual(len(second_calls), 2)
+        self.assertEqual(second_calls[0], first_calls[1])
+        self.assertEqual(self.context.feature_list[0].code_files, ["backend/f1_2.py"])
+        self.assertIn("backend/f2_None.py", code)
+
+    def test_restored_feature_code_does_not_overwrite_earlier_feature(self):
+        login, home, _ = self.context.feature_list
+        # 修改首个功能后重新生成：第二个功能从子检查点恢复，其路径已被首个功能占用
+        units = UnitCheckpoint("task_collide", "code")
+        units.record(
+            unit_key(home.name, home.description, "flask_vue"),
+            get_artifact_store().put_texts({"backend/shared.py": "home\n", "backend/home.py": "h\n"}),
+        )
+        generator = CodeGenerator()
+        generator.concurrency = 1
+        with patch.object(
+            CodeGenerator,
+            "_feature_files_by_ai",
+            side_effect=lambda ctx, name, desc, existing, **_: {"backend/shared.py": f"{name}\n"},
+        ):
+            code = generator.generate("task_collide", self.context)
+
+        self.assertEqual(code["backend/shared.py"], f"{login.name}\n")
+        self.assertEqual(home.code_files, ["backend/home.py"])
+
+    def test_page_resume_skips_recorded_payloads(self):
+        first, second, third = self.context.feature_list
+        generator = HtmlPageGenerator()
+        generator.ai_client = MagicMock()
+        generator.ai_client.generate.return_value = '{"pages": [{"key": "1", "title": "批量1"}, {"key": "2", "title": "批量2"}]}'
+        with patch.object(HtmlPageGenerator, "_build_page_payload", side_effect=_Crash("进程退出")):
+            with self.assertRaises(_Crash):
+                generator.generate("task_page", self.context)
+
+        generator = HtmlPageGenerator()
+        generator.ai_client = MagicMock()
+        with patch.object(
+            HtmlPageGenerator, "_build_page_payload", side_effect=lambda n, d, p, **_: {"title": f"单独{n}"}
+        ) as single:
+            pages = generator.generate("task_page", self.context)
+
+        generator.ai_client.generate.assert_not_called()
+        self.assertEqual([c.args[0] for c in single.call_args_list], [third.name])
+        self.assertIn("批量2", Path(pages[second.name]).read_text(encoding="utf-8"))
+
+    def test_screenshot_resume_recaptures_changed_or_missing_pages(self):
+        base = Path(self._temp.name)
+        html_pages = {}
+        for name in ("A", "B", "C"):
+            html_pages[name] = str(base / f"{name}.html")
+            Path(html_pages[name]).write_text(f"<html>{name}</html>", encoding="utf-8")
+        self.context.generated_html_pages = html_pages
+        self.context.feature_list = []
+
+        def first_run(task_id, pending, on_page=None, **_):
+            for name in ("A", "B"):
+                shot = base / f"{name}.png"
+                shot.write_bytes(b"png")
+                on_page(name, str(shot))
+            on_page("C", str(base / "placeholder_C.png"))
+            raise _Crash("进程退出")
+
+        orchestrator = Orchestrator(MagicMock())
+        orchestrator.screenshot_service.take_screenshots = Mock(side_effect=first_run)
+        with self.assertRaises(_Crash):
+            orchestrator._step4_take_screenshots("task_shot", self.context)
+
+        # 页面B在恢复前被重新生成，旧截图失效
+        Path(html_pages["B"]).write_text("<html>B2</html>", encoding="utf-8")
+        orchestrator.screenshot_service.take_screenshots = Mock(
+            side_effect=lambda task_id, pending, **_: {name: f"new_{name}.png" for name in pending}
+        )
+        orchestrator._step4_take_screenshots("task_shot", self.context)
+
+        self.assertEqual(list(orchestrator.screenshot_service.take_screenshots.call_args.args[1]), ["B", "C"])
+        self.assertEqual(
+            self.context.screenshots,
+            {"A": str(base / "A.png"), "B": "new_B.png", "C": "new_C.png"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+"""内容寻址产物存储：按内容哈希保存代码、页面、截图与文档，相同内容只存一份。"""
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStore:
+    """以sha256为键的文件存储（root/ab/abcdef...），跨任务共享
+
+    写入时若内容已存在只刷新修改时间，清理线程按修改时间回收长期未被引用的产物。
+    检查点等只保存 {名称: 哈希} 清单。
+    """
+
+    def __init__(self, root: str | Path, max_file_digests: int = 4096):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        # (路径, mtime_ns, 大小) -> 哈希，避免每次保存检查点都重新读取未变化的文件
+        # 按最近使用淘汰，已结束任务的条目不会常驻内存
+        self.max_file_digests = max(0, max_file_digests)
+        self._file_digests: OrderedDict[tuple, str] = OrderedDict()
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        return bool(digest) and self.path_for(digest).is_file()
+
+    def put_bytes(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.path_for(digest)
+        if target.exists():
+            self._touch(target)
+            return digest
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{digest}.{uuid.uuid4().hex[:8]}.tmp")
+        tmp.write_bytes(data)
+        # 并发写入同一内容时后写者覆盖，内容相同不影响读取
+        os.replace(tmp, target)
+        return digest
+
+    def put_text(self, text: str) -> str:
+        return self.put_bytes(text.encode("utf-8"))
+
+    def put_file(self, path: str | Path) -> str:
+        path = Path(path)
+        stat = path.stat()
+        memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._file_digests.get(memo_key)
+            if digest:
+                self._file_digests.move_to_end(memo_key)
+        if digest and self.has(digest):
+            self._touch(self.path_for(digest))
+            return digest
+        digest = self.put_bytes(path.read_bytes())
+        self._remember_digest(memo_key, digest)
+        return digest
+
+    def _remember_digest(self, memo_key: tuple, digest: str):
+        if self.max_file_digests <= 0:
+            return
+        with self._lock:
+            self._file_digests[memo_key] = digest
+            self._file_digests.move_to_end(memo_key)
+            while len(self._file_digests) > self.max_file_digests:
+                self._file_digests.popitem(last=False)
+
+    def get_bytes(self, digest: str) -> bytes:
+        return self.path_for(digest).read_bytes()
+
+    def get_text(self, digest: str) -> str:
+        return self.get_bytes(digest).decode("utf-8")
+
+    def put_texts(self, texts: dict[str, str]) -> dict[str, str]:
+        """保存 {名称: 文本}，返回 {名称: 哈希} 清单"""
+        return {name: self.put_text(text) for name, text in texts.items()}
+
+    def get_texts(self, manifest: dict[str, str]) -> dict[str, str] | None:
+        """按清单取回文本；任一产物缺失时返回None"""
+        try:
+            return {name: self.get_text(digest) for name, digest in manifest.items()}
+        except OSError as e:
+            logger.warning("产物缺失，清单无法还原: %s", e)
+            return None
+
+    def put_files(self, paths) -> dict[str, str]:
+        """保存已存在的文件，返回 {路径: 哈希}；不存在的路径跳过"""
+        manifest: dict[str, str] = {}
+        for path in paths:
+            if not path or not Path(path).is_file():
+                continue
+            try:
+                manifest[str(path)] = self.put_file(path)
+            except OSError as e:
+                logger.warning("保存产物失败: %s, %s", path, e)
+        return manifest
+
+    def restore_files(self, manifest: dict[str, str]) -> int:
+        """将清单中已丢失的文件从存储中还原到原路径，返回还原数量"""
+        restored = 0
+        for path, digest in manifest.items():
+            target = Path(path)
+            if target.exists() or not self.has(digest):
+                continue
+            try:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(self.path_for(digest), target)
+                restored += 1
+            except OSError as e:
+                logger.warning("还原产物失败: %s, %s", path, e)
+        return restored
+
+    @staticmethod
+    def _touch(path: Path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+
+_stores_lock = threading.Lock()
+_stores: dict[Path, ArtifactStore] = {}
+
+
+def get_artifact_store() -> ArtifactStore:
+    """TASK_DATA_DIR/artifacts 下的共享产物存储"""
+    root = Path(Config.TASK_DATA_DIR) / "artifacts"
+    with _stores_lock:
+        store = _stores.get(root)
+        if store is None:
+            store = _stores[root] = ArtifactStore(root)
+        return store
@@ -0,0 +1,113 @@
+"""任务取消令牌：取消请求即时通知到AI调用、重试等待和截图等阻塞点。"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class OperationCancelledError(Exception):
+    """操作因取消请求而中止"""
+
+
+class CallCancelledError(OperationCancelledError):
+    """AI调用在返回前被取消（对冲请求中落败的一方，或任务被取消）"""
+
+
+class CancelToken:
+    """可跨线程共享的取消令牌
+
+    cancel() 幂等；on_cancel 注册的回调在取消时（或已取消时立即）执行，
+    用于中断阻塞中的读取，例如关闭HTTP流或取消浏览器任务。
+    """
+
+    def __init__(self, task_id: str = ""):
+        # 任务级令牌记录所属任务，便于AI调用等下游定位任务（如耗时追踪）
+        self.task_id = task_id
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: dict[int, object] = {}
+        self._next_id = 0
+        self.reason = ""
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "任务已取消"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            self._invoke(callback)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """等待至多timeout秒，返回是否已取消（可替代time.sleep）"""
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise OperationCancelledError(self.reason or "任务已取消")
+
+    def on_cancel(self, callback):
+        """注册取消回调，返回注销函数"""
+        with self._lock:
+            if not self._event.is_set():
+                callback_id = self._next_id
+                self._next_id += 1
+                self._callbacks[callback_id] = callback
+                return lambda: self._unregister(callback_id)
+        self._invoke(callback)
+        return lambda: None
+
+    def _unregister(self, callback_id: int):
+        with self._lock:
+            self._callbacks.pop(callback_id, None)
+
+    @staticmethod
+    def _invoke(callback):
+        try:
+            callback()
+        except Exception as e:
+            logger.debug("取消回调执行失败: %s", e)
+
+
+def link_cancel(parent: CancelToken | None, child: CancelToken):
+    """父令牌取消时一并取消子令牌，返回解除关联的函数"""
+    if parent is None:
+        return lambda: None
+    return parent.on_cancel(lambda: child.cancel(parent.reason))
+
+
+_tokens_lock = threading.Lock()
+_tokens: dict[str, CancelToken] = {}
+
+
+def token_for_task(task_id: str) -> CancelToken:
+    """获取（不存在时创建）任务的取消令牌"""
+    with _tokens_lock:
+        token = _tokens.get(task_id)
+        if token is None:
+            token = _tokens[task_id] = CancelToken(task_id)
+        return token
+
+
+def get_task_token(task_id: str) -> CancelToken | None:
+    with _tokens_lock:
+        return _tokens.get(task_id)
+
+
+def cancel_task_token(task_id: str, reason: str = "任务已取消") -> bool:
+    token = get_task_token(task_id)
+    if token is None:
+        return False
+    token.cancel(reason)
+    return True
+
+
+def release_task_token(task_id: str):
+    with _tokens_lock:
+        _tokens.pop(task_id, None)
@@ -12,11 +12,12 @@ logger = logging.getLogger(__name__)
 class FileManager:
     """文件管理器：按保留时长清理历史产物。"""
 
-    def __init__(self, output_dir: Path, screenshot_dir: Path, task_data_dir: Path, retention_hours: int):
+    def __init__(self, output_dir: Path, screenshot_dir: Path, task_data_dir: Path, retention_hours: int, task_store=None):
         self.output_dir = Path(output_dir)
         self.screenshot_dir = Path(screenshot_dir)
         self.task_data_dir = Path(task_data_dir)
         self.retention_hours = max(1, int(retention_hours))
+        self.task_store = task_store
 
     def cleanup_once(self, now: datetime | None = None) -> dict:
         """执行一次清理，返回清理统计。"""
@@ -28,6 +29,8 @@ class FileManager:
             "screenshot_removed": 0,
             "task_removed": 0,
             "checkpoint_removed": 0,
+            "context_removed": 0,
+            "artifact_removed": 0,
             "errors": 0,
         }
 
@@ -35,12 +38,24 @@ class FileManager:
         stats["screenshot_removed"] = self._cleanup_paths(self.screenshot_dir, cutoff)
 
         stats["task_removed"] = self._cleanup_files(self.task_data_dir, cutoff, "*.json")
+        if self.task_store is not None:
+            try:
+                stats["task_removed"] += self.task_store.purge_expired(cutoff)
+            except Exception as exc:
+                stats["errors"] += 1
+                logger.warning("清理任务存储失败: %s", exc)
         checkpoint_dir = self.task_data_dir / "checkpoints"
         stats["checkpoint_removed"] = self._cleanup_files(checkpoint_dir, cutoff, "*.json")
+        stats["context_removed"] = self._cleanup_files(self.task_data_dir / "contexts", cutoff, "*.json")
+
+        # 产物每次被检查点引用时刷新修改时间，超过保留时长未被引用即可回收
+        artifact_dir = self.task_data_dir / "artifacts"
+        stats["artifact_removed"] = self._cleanup_files(artifact_dir, cutoff, "*/*")
 
         self._cleanup_empty_dirs(self.output_dir)
         self._cleanup_empty_dirs(self.screenshot_dir)
         self._cleanup_empty_dirs(checkpoint_dir)
+        self._cleanup_empty_dirs(artifact_dir)
 
         return stats
 
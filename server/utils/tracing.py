@@ -0,0 +1,172 @@
+"""任务耗时追踪：记录步骤、AI调用、截图页面、文档生成与排队等待的时间区间，导出为Chrome trace文件。"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILENAME = "trace.json"
+
+
+class Span:
+    """一个耗时区间；with块结束时记录，set()补充参数（如重试次数、响应字节数）"""
+
+    def __init__(self, tracer: "TaskTracer", name: str, cat: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0.0
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add_span(self.name, self.cat, self.start, time.perf_counter(), **self.args)
+        return False
+
+
+class _NullSpan:
+    """未开启追踪时的空实现"""
+
+    def set(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class TaskTracer:
+    """单个任务的事件记录，时间戳为相对任务提交的微秒数
+
+    同一线程内的区间按调用关系嵌套；overlap=True 的区间（如同一线程上并发的截图页面）
+    以异步事件记录，避免在时间线上错误嵌套。
+    """
+
+    def __init__(self, task_id: str, max_events: int = 20000):
+        self.task_id = task_id
+        self.max_events = max_events
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._events: list[dict] = []
+        self._threads: dict[int, str] = {}
+        self._next_async_id = 0
+        self.dropped = 0
+
+    def span(self, name: str, cat: str, **args) -> Span:
+        return Span(self, name, cat, args)
+
+    def add_span(self, name: str, cat: str, start: float, end: float, overlap: bool = False, **args):
+        """记录 perf_counter 时间 [start, end] 的区间"""
+        thread = threading.current_thread()
+        ts = self._micros(start)
+        dur = max(self._micros(end) - ts, 0)
+        base = {"name": name, "cat": cat, "pid": 1, "tid": thread.ident}
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            if overlap:
+                self._next_async_id += 1
+                events = [
+                    {**base, "ph": "b", "id": self._next_async_id, "ts": ts, "args": args},
+                    {**base, "ph": "e", "id": self._next_async_id, "ts": ts + dur},
+                ]
+            else:
+                events = [{**base, "ph": "X", "ts": ts, "dur": dur, "args": args}]
+            if len(self._events) + len(events) > self.max_events:
+                self.dropped += 1
+                return
+            self._events.extend(events)
+
+    def to_chrome(self) -> dict:
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        metadata = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"task {self.task_id}"}}]
+        metadata += [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        return {
+            "traceEvents": metadata + sorted(events, key=lambda e: e["ts"]),
+            "displayTimeUnit": "ms",
+            "otherData": {"task_id": self.task_id, "dropped_spans": self.dropped},
+        }
+
+    def write(self, path: str | Path) -> str:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.to_chrome(), ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, path)
+        return str(path)
+
+    def _micros(self, value: float) -> int:
+        return int((value - self._origin) * 1_000_000)
+
+
+_tracers_lock = threading.Lock()
+_tracers: dict[str, TaskTracer] = {}
+
+
+def tracer_for_task(task_id: str) -> TaskTracer | None:
+    """获取（不存在时创建）任务的追踪器；未开启追踪时返回None"""
+    if not Config.TASK_TRACE_ENABLED:
+        return None
+    with _tracers_lock:
+        tracer = _tracers.get(task_id)
+        if tracer is None:
+            tracer = _tracers[task_id] = TaskTracer(task_id, Config.TASK_TRACE_MAX_EVENTS)
+        return tracer
+
+
+def get_tracer(task_id: str | None) -> TaskTracer | None:
+    if not task_id:
+        return None
+    with _tracers_lock:
+        return _tracers.get(task_id)
+
+
+def release_tracer(task_id: str):
+    with _tracers_lock:
+        _tracers.pop(task_id, None)
+
+
+def trace_span(task_id: str | None, name: str, cat: str, **args):
+    """任务追踪中的区间；任务未在追踪时返回空实现"""
+    tracer = get_tracer(task_id)
+    if tracer is None:
+        return NULL_SPAN
+    return tracer.span(name, cat, **args)
+
+
+def trace_path(task_id: str) -> Path:
+    """追踪文件位置，与质量报告同目录"""
+    return Config.OUTPUT_DIR / task_id / TRACE_FILENAME
+
+
+def write_trace(task_id: str) -> str | None:
+    tracer = get_tracer(task_id)
+    if tracer is None:
+        return None
+    try:
+        return tracer.write(trace_path(task_id))
+    except OSError as e:
+        logger.warning("[%s] 写入追踪文件失败: %s", task_id, e)
+        return None